@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import tempfile
+import threading
+import argparse
+import numpy as np
+import pandas as pd
+import crypto_trading_dashboard as dashboard
+
+# Micro-benchmarks des chemins chauds (indicateurs, scores, signaux, backtest, optimisation, LSTM)
+# sur des OHLCV synthétiques déterministes: aucun exchange ni API, résultats reproductibles et comparables
+# à un run de référence (--baseline) pour détecter les régressions.
+#   python crypto_benchmark.py [--quick] [--cases a,b] [--baseline bench.json] > bench.json
+
+CANDLE_COUNTS = [1000, 10000, 100000]
+PAIR_COUNTS = [10, 50, 100, 500]
+KINDS = ['random_walk', 'regime', 'gaps', 'flat']
+STABLECOINS = {'USDC', 'USDT', 'DAI', 'UST', 'EURT', 'PYUSD', 'TUSD', 'USDP'}
+REGIME_LENGTH = 500  # Bougies par régime (tendance haussière, baissière, range volatil)
+GAP_PROBABILITY = 0.005  # Probabilité d'un trou de cotation (bougies manquantes + saut de prix) par bougie
+START_TIMESTAMP = 1_600_000_000_000
+REPEAT = 3  # Mesures par cas (meilleure et médiane reportées)
+MAX_TIME = 5.0  # Au-delà (secondes cumulées), pas de mesure supplémentaire
+REGRESSION_TOLERANCE = 0.2  # Ralentissement toléré par rapport à la référence (20%)
+RSS_INTERVAL = 0.001  # Période d'échantillonnage de la RSS pendant l'exécution mesurée (secondes)
+
+# OHLCV synthétique déterministe (même seed = mêmes bougies):
+# random_walk (marche aléatoire log-normale), regime (alternance de tendances et de volatilités),
+# gaps (bougies manquantes et sauts de prix) ou flat (stablecoin autour de 1)
+def synthetic_ohlcv(n, kind='random_walk', seed=0, timeframe='1h', start_price=100.0):
+    rng = np.random.default_rng(seed)
+    step = dashboard.parse_timeframe(timeframe) * 1000
+    skips = np.ones(n, dtype=np.int64)
+    if kind == 'flat':
+        volatility = np.full(n, 0.0002)
+        close = np.round(1.0 + np.clip(rng.normal(0, 0.0002, n), -0.002, 0.002), 4)
+    else:
+        drift, volatility = np.zeros(n), np.full(n, 0.01)
+        if kind == 'regime':
+            regimes = (np.arange(n) // REGIME_LENGTH) % 3
+            drift = np.array([0.001, -0.001, 0.0])[regimes]
+            volatility = np.array([0.005, 0.008, 0.02])[regimes]
+        elif kind != 'random_walk' and kind != 'gaps':
+            raise ValueError(f"Type de série inconnu: {kind}")
+        returns = drift + volatility * rng.standard_normal(n)
+        if kind == 'gaps':
+            gaps = rng.random(n) < GAP_PROBABILITY
+            skips[gaps] += rng.integers(1, 48, gaps.sum())
+            returns[gaps] += rng.normal(0, 0.08, gaps.sum())
+        close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    wick = np.abs(rng.normal(0, volatility / 2))
+    return pd.DataFrame({
+        'timestamp': START_TIMESTAMP + step * np.cumsum(skips),
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + wick),
+        'low': np.minimum(open_, close) * (1 - wick),
+        'close': close,
+        'volume': rng.lognormal(10, 1, n)
+    }, columns=dashboard.OHLCV_COLUMNS)
+
+# Type de série d'une paire de l'univers synthétique: stablecoins plats, les autres en rotation
+def pair_kind(pair, index):
+    if pair.split('/')[0] in STABLECOINS:
+        return 'flat'
+    return KINDS[index % 3]
+
+# Univers de n paires: paires du dashboard puis paires synthétiques au-delà
+def synthetic_universe(n):
+    names = list(dashboard.pairs) + [f'SYN{i}/USD' for i in range(max(0, n - len(dashboard.pairs)))]
+    return {pair: pair_kind(pair, i) for i, pair in enumerate(names[:n])}
+
+# RSS courante du processus en octets (/proc, Linux); ailleurs pic depuis le démarrage (ru_maxrss)
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+# Pic de RSS au-dessus du niveau de départ pendant run(*args): inclut les allocations natives
+# (torch, BLAS) que tracemalloc ne voit pas
+def peak_rss_delta(run, args):
+    base = peak = current_rss()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(RSS_INTERVAL):
+            peak = max(peak, current_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        run(*args)
+    finally:
+        done.set()
+        sampler.join()
+    return max(peak, current_rss()) - base
+
+# Mesure d'un cas: une exécution d'échauffement avec pic de RSS du processus (Python, NumPy et torch),
+# puis jusqu'à `repeat` exécutions chronométrées; setup() prépare les arguments hors chrono
+def measure(run, setup, units, repeat=REPEAT, max_time=MAX_TIME):
+    peak = peak_rss_delta(run, setup())
+    times = []
+    while len(times) < repeat and sum(times) < max_time:
+        args = setup()
+        start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        'runs': len(times),
+        'best': round(best, 6),
+        'median': round(statistics.median(times), 6),
+        'throughput': round(units / best, 1),
+        'peak_rss_mb': round(peak / 2 ** 20, 2)
+    }
+
+# Cas à nombre de bougies variable, sur une paire; les cas lourds (entraînement, grille) ne tournent que sur
+# le premier type de série. Renvoie {nom: (setup, run, lourd, unité du débit)}: bougies/s, ou appels/s pour
+# les cas qui ne lisent que la dernière ligne ou fenêtre
+def candle_cases(df, kind, epochs):
+    import crypto_ml as ml
+    pair = f'{kind.upper()}/USD'
+    frames = {tf: dashboard.calculate_indicators(df.copy()) for tf in dashboard.TIMEFRAMES}
+    last_row = frames['1h'].iloc[-1]
+    levels = dashboard.frame_levels(frames['1h'])
+    higher = [frames['4h'].iloc[-1], frames['1d'].iloc[-1]]
+    ohlcv = df.values.tolist()
+    model, scaler = ml.train_lstm(df.tail(dashboard.LIMIT), epochs=epochs)
+    window = scaler.transform(df['close'].values[-50:].reshape(-1, 1))
+
+    # Indicateurs incrémentaux (démon): état chaud jusqu'à l'avant-dernière bougie, une bougie appliquée par appel
+    def warm_stream():
+        dashboard._indicator_streams.pop((pair, 'bench'), None)
+        dashboard.stream_frame(pair, 'bench', df.iloc[:-1])
+        return pair, 'bench', df
+
+    # Signaux avec ML: modèle du registre déjà entraîné (inférence + scores), l'entraînement est mesuré à part
+    def warm_ml():
+        dashboard.get_lstm_model(pair, frames['1h'], epochs=epochs)
+        return frames['1h'], frames['4h'], frames['1d'], pair, None, (0, 0)
+
+    return {
+        'calculate_indicators': (lambda: (df.copy(),), dashboard.calculate_indicators, False, 'candles'),
+        'stream_frame': (warm_stream, dashboard.stream_frame, False, 'calls'),
+        'calculate_score': (lambda: (last_row, 'ACHAT', higher, None, 0, 0, levels), dashboard.calculate_score, False, 'calls'),
+        'generate_signals': (lambda: (frames['1h'], frames['4h'], frames['1d'], pair, np.nan, (0, 0)),
+                             dashboard.generate_signals, False, 'candles'),
+        'generate_signals_ml': (warm_ml, dashboard.generate_signals, True, 'candles'),
+        'backtest_strategy': (lambda: (pair, 10000, ohlcv), dashboard.backtest_strategy, False, 'candles'),
+        'optimize_params': (lambda: (pair, None, ohlcv), dashboard.optimize_params, True, 'candles'),
+        'train_lstm': (lambda: (df, epochs), ml.train_lstm, True, 'candles'),
+        'predict_price': (lambda: (model, scaler, window), ml.predict_price, False, 'calls')
+    }
+
+# Cas à nombre de paires variable (1000 bougies par timeframe): débit en paires/s
+def pair_cases(universe, candles, epochs):
+    import crypto_ml as ml
+    raw = {pair: {tf: synthetic_ohlcv(candles, kind, seed * 3 + i, tf) for i, tf in enumerate(dashboard.TIMEFRAMES)}
+           for seed, (pair, kind) in enumerate(universe.items())}
+    frames = {pair: {tf: dashboard.calculate_indicators(df.copy()) for tf, df in dfs.items()} for pair, dfs in raw.items()}
+    daily = {pair: dfs['1d'].tail(dashboard.BACKTEST_LIMIT).values.tolist() for pair, dfs in raw.items()}
+    model, scaler = ml.train_lstm(raw[next(iter(raw))]['1h'], epochs=epochs)
+    models = {pair: (model, scaler) for pair in raw}
+    windows = {pair: dfs['1h']['close'].values[-50:] for pair, dfs in raw.items()}
+
+    def indicators(copies):
+        for dfs in copies.values():
+            for df in dfs.values():
+                dashboard.calculate_indicators(df)
+
+    def signals():
+        for pair, dfs in frames.items():
+            dashboard.generate_signals(dfs['1h'], dfs['4h'], dfs['1d'], pair, np.nan, (0, 0))
+
+    def backtests():
+        for pair, ohlcv in daily.items():
+            dashboard.backtest_strategy(pair, ohlcv=ohlcv)
+
+    return {
+        'calculate_indicators': (lambda: ({p: {tf: df.copy() for tf, df in dfs.items()} for p, dfs in raw.items()},),
+                                 indicators, False, 'pairs'),
+        'generate_signals': (lambda: (), signals, False, 'pairs'),
+        'backtest_strategy': (lambda: (), backtests, False, 'pairs'),
+        'predict_price': (lambda: (models, windows), ml.predict_prices, False, 'pairs')
+    }
+
+def run_benchmarks(args):
+    selected = set(args.cases.split(',')) if args.cases else None
+    kinds = args.kinds.split(',')
+    results = []
+    for candles in args.candles:
+        for i, kind in enumerate(kinds):
+            df = synthetic_ohlcv(candles, kind, seed=i)
+            for name, (setup, run, heavy, unit) in candle_cases(df, kind, args.epochs).items():
+                if (selected and name not in selected) or (heavy and i > 0):
+                    continue
+                results.append({'case': name, 'scale': 'candles', 'size': candles, 'kind': kind, 'unit': f'{unit}/s',
+                                **measure(run, setup, candles if unit == 'candles' else 1, args.repeat, args.max_time)})
+    for n in args.pairs:
+        for name, (setup, run, _, unit) in pair_cases(synthetic_universe(n), args.pair_candles, args.epochs).items():
+            if selected and name not in selected:
+                continue
+            results.append({'case': name, 'scale': 'pairs', 'size': n, 'kind': 'universe', 'unit': f'{unit}/s',
+                            **measure(run, setup, n, args.repeat, args.max_time)})
+    return results
+
+# Comparaison avec un run de référence: cas plus lents que la tolérance (meilleur temps)
+def find_regressions(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    key = lambda r: (r['case'], r['scale'], r['size'], r['kind'])
+    reference = {key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        ref = reference.get(key(result))
+        if ref and ref['best'] > 0 and result['best'] > ref['best'] * (1 + tolerance):
+            regressions.append({'case': result['case'], 'scale': result['scale'], 'size': result['size'],
+                                'kind': result['kind'], 'baseline': ref['best'], 'current': result['best'],
+                                'ratio': round(result['best'] / ref['best'], 2)})
+    return regressions
+
+def environment():
+    import torch
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'torch': torch.__version__, 'cpu_count': os.cpu_count(), 'machine': platform.machine()}
+
+def parse_args(argv):
+    sizes = lambda value: [int(v) for v in value.split(',')]
+    parser = argparse.ArgumentParser(description='Benchmarks hors ligne des chemins chauds du dashboard')
+    parser.add_argument('--candles', type=sizes, default=CANDLE_COUNTS)
+    parser.add_argument('--pairs', type=sizes, default=PAIR_COUNTS)
+    parser.add_argument('--pair-candles', type=int, default=dashboard.LIMIT)
+    parser.add_argument('--kinds', default=','.join(KINDS))
+    parser.add_argument('--cases', help='Cas à exécuter, séparés par des virgules (tous par défaut)')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--max-time', type=float, default=MAX_TIME)
+    parser.add_argument('--quick', action='store_true', help='Petites tailles et 1 époque (contrôle rapide)')
+    parser.add_argument('--baseline', help='Résultats JSON de référence: code de sortie 1 en cas de régression')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.candles, args.pairs, args.epochs, args.repeat = [1000], [10], 1, 1
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Registre LSTM isolé: ni lecture ni écriture dans le cache de production
+    dashboard.MODEL_DIR = tempfile.mkdtemp(prefix='crypto_bench_models_')
+    output = {'type': 'benchmark', 'environment': environment(), 'results': run_benchmarks(args)}
+    if args.baseline:
+        with open(args.baseline) as f:
+            output['regressions'] = find_regressions(output['results'], json.load(f), args.tolerance)
+    print(json.dumps(output))
+    if output.get('regressions'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+import http.client
+import urllib.error
+import urllib.request
+
+# Client léger du démon d'analyse (crypto_trading_dashboard.py serve): mêmes arguments et même sortie JSON
+# que crypto_trading_dashboard.py, sans importer pandas/torch; exécution locale si le démon n'écoute pas.
+# Démon joignable mais en échec (timeout, connexion coupée en cours de requête): erreur JSON, pas de relance locale
+DAEMON_ADDRESS = os.getenv('CRYPTO_DAEMON', '127.0.0.1:8765')
+DAEMON_TIMEOUT = float(os.getenv('CRYPTO_DAEMON_TIMEOUT', 600))  # Un scan complet peut prendre plusieurs minutes
+
+def daemon_request(path, payload):
+    request = urllib.request.Request(
+        f'http://{DAEMON_ADDRESS}{path}', data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=DAEMON_TIMEOUT) as response:
+            return response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.read().decode()
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == 'chart':
+        path, payload = '/chart', {'pair': args[1] if len(args) > 1 else None, 'format': args[2] if len(args) > 2 else None}
+    elif len(args) == 3:
+        path, payload = '/analyze', {'pair': args[0], 'entry_price': args[1], 'signal_type': args[2]}
+    else:
+        path, payload = '/scan', {}
+    try:
+        print(daemon_request(path, payload))
+    except urllib.error.URLError as e:
+        if not isinstance(e.reason, (ConnectionRefusedError, FileNotFoundError)):
+            print(json.dumps({'type': 'error', 'message': f'Démon {DAEMON_ADDRESS} injoignable: {e.reason}'}))
+            return
+        # Démon arrêté: exécution locale (démarrage à froid)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import crypto_trading_dashboard
+        crypto_trading_dashboard.main()
+    except (OSError, http.client.HTTPException) as e:
+        print(json.dumps({'type': 'error', 'message': f'Erreur du démon {DAEMON_ADDRESS}: {e}'}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import os
+import copy
+import weakref
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import Dataset
+from sklearn.preprocessing import MinMaxScaler
+
+# Modèles LSTM (torch + sklearn), importé à la demande par crypto_trading_dashboard:
+# les commandes qui n'exécutent pas de prédiction ML ne paient pas le chargement de torch
+
+# Paramètres d'entraînement et d'inférence
+LSTM_FINETUNE_EPOCHS = int(os.getenv('LSTM_FINETUNE_EPOCHS', 3))  # Époques max de fine-tuning sur les nouvelles bougies
+LSTM_FINETUNE_WINDOW = 200  # Fenêtres récentes utilisées pour le fine-tuning (au-delà: réentraînement complet)
+LSTM_PATIENCE = 1  # Époques sans amélioration de la validation avant arrêt
+LSTM_SHARED_BATCH_SIZE = 256  # Batches plus larges: les fenêtres de toutes les paires sont mélangées
+LSTM_INFERENCE = os.getenv('LSTM_INFERENCE', 'eager')  # eager, script (TorchScript) ou quantized (int8 dynamique + TorchScript)
+
+# Fenêtres glissantes sans copie: vues strided sur un seul tenseur contigu
+def sliding_windows(data, seq_length):
+    series = torch.from_numpy(np.ascontiguousarray(data, dtype=np.float32).reshape(-1))
+    x = series.unfold(0, seq_length, 1)[:-1].unsqueeze(-1)
+    y = series[seq_length:].unsqueeze(-1)
+    return x, y
+
+# Batches assemblés par indexation groupée: une allocation par batch, aucune par échantillon
+def iterate_batches(x, y, batch_size, shuffle=True):
+    order = torch.randperm(len(x)) if shuffle else torch.arange(len(x))
+    for start in range(0, len(x), batch_size):
+        idx = order[start:start + batch_size]
+        yield x[idx], y[idx]
+
+# Classe pour dataset LSTM (fenêtres en vues sur la série)
+class CryptoDataset(Dataset):
+    def __init__(self, data, seq_length):
+        self.x, self.y = sliding_windows(data, seq_length)
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, idx):
+        return self.x[idx], self.y[idx]
+
+# Modèle LSTM pour prédiction de prix
+class LSTMModel(nn.Module):
+    def __init__(self, input_size=1, hidden_size=50, num_layers=1):
+        super().__init__()
+        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+        self.linear = nn.Linear(hidden_size, 1)
+
+    def forward(self, x):
+        lstm_out, _ = self.lstm(x)
+        return self.linear(lstm_out[:, -1, :])
+
+# Entraînement LSTM (simple et rapide)
+def train_lstm(df, epochs=5, seq_length=50, batch_size=32):
+    if len(df) < seq_length + 1:
+        return None, None
+
+    scaler = MinMaxScaler()
+    scaled_data = scaler.fit_transform(df['close'].values.reshape(-1, 1))
+
+    dataset = CryptoDataset(scaled_data, seq_length)
+    model = LSTMModel()
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+
+    for epoch in range(epochs):
+        _train_epoch(model, optimizer, criterion, dataset.x, dataset.y, batch_size)
+
+    return model, scaler
+
+def _train_epoch(model, optimizer, criterion, x, y, batch_size):
+    model.train()
+    for batch_x, batch_y in iterate_batches(x, y, batch_size):
+        optimizer.zero_grad()
+        loss = criterion(model(batch_x), batch_y)
+        loss.backward()
+        optimizer.step()
+
+# Entraînement groupé multi-paires: un modèle partagé, chaque série normalisée par son propre scaler,
+# les fenêtres de toutes les paires mélangées dans les mêmes batches
+def train_lstm_shared(pair_dfs, epochs=5, seq_length=50, batch_size=LSTM_SHARED_BATCH_SIZE):
+    scalers, xs, ys = {}, [], []
+    for pair, df in pair_dfs.items():
+        if len(df) < seq_length + 1:
+            continue
+        scaler = MinMaxScaler()
+        dataset = CryptoDataset(scaler.fit_transform(df['close'].values.reshape(-1, 1)), seq_length)
+        scalers[pair] = scaler
+        xs.append(dataset.x)
+        ys.append(dataset.y)
+    if not scalers:
+        return None, {}
+
+    x, y = torch.cat(xs), torch.cat(ys)
+    model = LSTMModel()
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    for epoch in range(epochs):
+        _train_epoch(model, optimizer, criterion, x, y, batch_size)
+    return model, scalers
+
+# Prédiction avec LSTM
+def predict_price(model, scaler, last_sequence):
+    with torch.no_grad():
+        input_tensor = torch.tensor(last_sequence, dtype=torch.float32).unsqueeze(0)
+        pred = inference_model(model)(input_tensor).item()
+    return scaler.inverse_transform([[pred]])[0][0]
+
+# Artefact d'inférence CPU compilé une fois par modèle: TorchScript, éventuellement quantifié en int8
+_inference_models = weakref.WeakKeyDictionary()
+
+def inference_model(model, mode=None):
+    mode = mode or LSTM_INFERENCE
+    model.eval()
+    if mode == 'eager':
+        return model
+    cached = _inference_models.get(model)
+    if cached is not None and cached[0] == mode:
+        return cached[1]
+    if mode == 'quantized':
+        compiled = torch.jit.script(torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8))
+    elif mode == 'script':
+        compiled = torch.jit.script(model)
+    else:
+        raise ValueError(f"Mode d'inférence inconnu: {mode}")
+    _inference_models[model] = (mode, compiled)
+    return compiled
+
+# Prédiction groupée sur toutes les paires: un forward par modèle distinct (un seul en mode partagé),
+# normalisation et dénormalisation MinMax vectorisées
+def predict_prices(models, windows, mode=None):
+    groups = {}
+    for pair, (model, scaler) in models.items():
+        groups.setdefault(id(model), (model, []))[1].append(pair)
+
+    predictions = {}
+    for model, group in groups.values():
+        scale = np.array([models[p][1].scale_[0] for p in group])[:, None]
+        offset = np.array([models[p][1].min_[0] for p in group])[:, None]
+        scaled = np.stack([windows[p] for p in group]) * scale + offset
+        with torch.no_grad():
+            output = inference_model(model, mode)(torch.from_numpy(scaled.astype(np.float32)).unsqueeze(-1)).numpy()
+        predictions.update(zip(group, ((output - offset) / scale)[:, 0].tolist()))
+    return predictions
+
+# Fine-tuning d'un modèle existant sur les dernières fenêtres, avec early stopping sur la fin de la série
+def finetune_lstm(model, scaler, df, epochs=LSTM_FINETUNE_EPOCHS, seq_length=50, batch_size=32):
+    scaled_data = scaler.transform(df['close'].values[-(LSTM_FINETUNE_WINDOW + seq_length):].reshape(-1, 1))
+    dataset = CryptoDataset(scaled_data, seq_length)
+    n_val = max(1, len(dataset) // 5)
+    train_x, train_y = dataset.x[:-n_val], dataset.y[:-n_val]
+    val_x, val_y = dataset.x[-n_val:], dataset.y[-n_val:]
+
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+
+    def val_loss():
+        model.eval()
+        with torch.no_grad():
+            return criterion(model(val_x), val_y).item()
+
+    best_loss, best_state, stale = val_loss(), copy.deepcopy(model.state_dict()), 0
+    for epoch in range(epochs):
+        _train_epoch(model, optimizer, criterion, train_x, train_y, batch_size)
+        loss = val_loss()
+        if loss < best_loss:
+            best_loss, best_state, stale = loss, copy.deepcopy(model.state_dict()), 0
+        else:
+            stale += 1
+            if stale >= LSTM_PATIENCE:
+                break
+    model.load_state_dict(best_state)
+    return model
+
+# Persistance d'un modèle entraîné: poids, scaler et dernière bougie vue (écriture atomique)
+def save_model(path, model, scaler, last_timestamp):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    torch.save({'model': model.state_dict(), 'scaler': scaler, 'last_timestamp': last_timestamp}, tmp_path)
+    os.replace(tmp_path, path)
+
+def load_model(path):
+    state = torch.load(path, weights_only=False)
+    model = LSTMModel()
+    model.load_state_dict(state['model'])
+    return model, state['scaler'], state['last_timestamp']
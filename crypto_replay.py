@@ -0,0 +1,202 @@
+import os
+import gzip
+import json
+import time
+import atexit
+import asyncio
+import threading
+import requests
+
+# Enregistrement / rejeu hors ligne des appels exchange (ccxt) et HTTP (alternative.me, CoinGecko):
+#   CRYPTO_RECORD=scan.json.gz  -> appels réels, chaque réponse (ou erreur) archivée à la sortie du process
+#   CRYPTO_REPLAY=scan.json.gz  -> aucune requête réseau, réponses servies depuis l'archive
+# Les appels identiques sont rejoués dans l'ordre de leur enregistrement (la dernière réponse est répétée
+# au-delà). Un appel absent de l'archive lève ReplayMiss, traité comme une erreur d'exchange par l'appelant.
+RECORD_PATH = os.getenv('CRYPTO_RECORD')
+REPLAY_PATH = os.getenv('CRYPTO_REPLAY')
+REPLAY_LATENCY = os.getenv('CRYPTO_REPLAY_LATENCY', '0')  # Secondes par appel rejoué, ou 'recorded' (durées enregistrées)
+EXCHANGE_METHODS = ('load_markets', 'fetch_ohlcv', 'fetch_ticker', 'fetch_balance')
+ARCHIVE_VERSION = 1
+
+class ReplayMiss(Exception):
+    pass
+
+# Erreur enregistrée (exception de l'exchange ou de l'API), relevée à l'identique au rejeu
+class ReplayError(Exception):
+    pass
+
+def active():
+    return bool(RECORD_PATH or REPLAY_PATH)
+
+def call_key(source, method, args, kwargs):
+    return json.dumps([source, method, list(args), dict(sorted(kwargs.items()))], default=str, separators=(',', ':'))
+
+# Archive JSON gzip: {'version', 'clocks': {exchange: ms}, 'calls': {clé: [[réponse, durée, erreur], ...]}}
+class Archive:
+    def __init__(self, path, replaying, latency=REPLAY_LATENCY):
+        self.path = path
+        self.replaying = replaying
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.cursors = {}
+        self.clocks = {}
+        self.calls = {}
+        if replaying:
+            with gzip.open(path, 'rt') as f:
+                data = json.load(f)
+            if data.get('version') != ARCHIVE_VERSION:
+                raise ValueError(f"Version d'archive non supportée: {data.get('version')}")
+            self.clocks, self.calls = data['clocks'], data['calls']
+
+    def record(self, key, response, duration, error=None):
+        with self.lock:
+            self.calls.setdefault(key, []).append([response, round(duration, 4), error])
+
+    # Réponse suivante pour cette clé et délai simulé à appliquer avant de la servir
+    def lookup(self, key):
+        with self.lock:
+            entries = self.calls.get(key)
+            if not entries:
+                raise ReplayMiss(f"Appel absent de l'archive {self.path}: {key}")
+            index = self.cursors.get(key, 0)
+            self.cursors[key] = index + 1
+        response, duration, error = entries[min(index, len(entries) - 1)]
+        delay = duration if self.latency == 'recorded' else float(self.latency)
+        return response, delay, error
+
+    def save(self):
+        if self.replaying:
+            return
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with self.lock:
+            data = {'version': ARCHIVE_VERSION, 'clocks': self.clocks, 'calls': self.calls}
+            with gzip.open(tmp_path, 'wt') as f:
+                json.dump(data, f, default=str, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+_archive = None
+_archive_lock = threading.Lock()
+
+# Archive du process, ouverte au premier appel (sauvegardée à la sortie en mode enregistrement)
+def get_archive():
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            if not active():
+                raise RuntimeError("Ni CRYPTO_RECORD ni CRYPTO_REPLAY n'est défini")
+            _archive = Archive(REPLAY_PATH or RECORD_PATH, replaying=bool(REPLAY_PATH))
+            if not _archive.replaying:
+                atexit.register(_archive.save)
+        return _archive
+
+# Client ccxt enveloppé: les méthodes de EXCHANGE_METHODS passent par l'archive, le reste (marchés,
+# parse_timeframe, rateLimit...) est délégué au client réel, qui n'émet aucune requête au rejeu
+class ExchangeProxy:
+    def __init__(self, name, client, archive):
+        self._name = name
+        self._client = client
+        self._archive = archive
+        self.last_http_response = None
+        if not archive.replaying:
+            archive.clocks.setdefault(name, client.milliseconds())
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        if attr in EXCHANGE_METHODS:
+            return lambda *args, **kwargs: self._call(attr, args, kwargs)
+        return getattr(self._client, attr)
+
+    # Horloge figée à l'enregistrement: les calculs de fenêtres (since) restent identiques au rejeu
+    def milliseconds(self):
+        if self._archive.replaying:
+            return self._archive.clocks.get(self._name, 0)
+        return self._client.milliseconds()
+
+    def _call(self, method, args, kwargs):
+        key = call_key(self._name, method, args, kwargs)
+        if self._archive.replaying:
+            response, delay, error = self._archive.lookup(key)
+            time.sleep(delay)
+            return self._replayed(method, response, error)
+        start = time.perf_counter()
+        try:
+            response = getattr(self._client, method)(*args, **kwargs)
+        except Exception as e:
+            self._archive.record(key, None, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+            raise
+        self._archive.record(key, response, time.perf_counter() - start)
+        self.last_http_response = self._client.last_http_response
+        return response
+
+    def _replayed(self, method, response, error):
+        if error:
+            raise ReplayError(error)
+        if method == 'load_markets':
+            self._client.set_markets(response)
+            return self._client.markets
+        return response
+
+# Même enveloppe pour les clients ccxt.async_support
+class AsyncExchangeProxy(ExchangeProxy):
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        if attr in EXCHANGE_METHODS:
+            return lambda *args, **kwargs: self._call_async(attr, args, kwargs)
+        return getattr(self._client, attr)
+
+    async def _call_async(self, method, args, kwargs):
+        key = call_key(self._name, method, args, kwargs)
+        if self._archive.replaying:
+            response, delay, error = self._archive.lookup(key)
+            await asyncio.sleep(delay)
+            return self._replayed(method, response, error)
+        start = time.perf_counter()
+        try:
+            response = await getattr(self._client, method)(*args, **kwargs)
+        except Exception as e:
+            self._archive.record(key, None, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+            raise
+        self._archive.record(key, response, time.perf_counter() - start)
+        self.last_http_response = self._client.last_http_response
+        return response
+
+def wrap_exchange(name, client, asynchronous=False):
+    if not active():
+        return client
+    return (AsyncExchangeProxy if asynchronous else ExchangeProxy)(name, client, get_archive())
+
+# Réponse HTTP rejouée: sous-ensemble de requests.Response utilisé par les appelants
+class ReplayResponse:
+    def __init__(self, url, status_code, text):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} pour {self.url}', response=self)
+
+# requests.get enregistré / rejoué (le timeout ne fait pas partie de la clé)
+def http_get(url, **kwargs):
+    archive = get_archive()
+    key = call_key('http', 'get', (url,), {})
+    if archive.replaying:
+        response, delay, error = archive.lookup(key)
+        time.sleep(delay)
+        if error:
+            raise ReplayError(error)
+        return ReplayResponse(url, *response)
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, **kwargs)
+    except Exception as e:
+        archive.record(key, None, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+        raise
+    archive.record(key, [response.status_code, response.text], time.perf_counter() - start)
+    return response
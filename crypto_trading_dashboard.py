@@ -1,19 +1,25 @@
 import os
-import ccxt
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import time
+import copy
+import contextvars
+from contextlib import contextmanager, nullcontext
+import itertools
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque
+import asyncio
+import importlib
+import subprocess
+import tempfile
+import threading
 import warnings
 import json
 import sys
 import logging
-import torch
-import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
-from sklearn.preprocessing import MinMaxScaler
-import matplotlib.pyplot as plt
-from multiprocessing import Pool
+from multiprocessing import Pool, shared_memory
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
 import requests
 
 # Configurer le logging à ERROR pour éviter les logs INFO sur stderr en production
@@ -22,19 +28,167 @@ logger = logging.getLogger(__name__)
 
 warnings.filterwarnings("ignore")
 
-# Configuration des exchanges (Kraken + Binance pour fallback et arbitrage)
-exchanges = {
-    'kraken': ccxt.kraken({'enableRateLimit': True}),
-    'binance': ccxt.binance({'enableRateLimit': True})
-}
+# Dépendances lourdes (ccxt, torch/sklearn via crypto_ml, matplotlib) importées à la première utilisation:
+# l'import du module et les commandes qui n'en ont pas besoin ne paient pas leur chargement
+
+TIMINGS_ENABLED = os.getenv('CRYPTO_TIMINGS', '0') == '1' or bool(os.getenv('CRYPTO_TRACE'))  # Bloc timings dans le JSON
+TRACE_FILE = os.getenv('CRYPTO_TRACE')  # Trace des étapes au format Chrome trace (chrome://tracing, Perfetto)
+LAZY_MODULES = ['ccxt', 'torch', 'sklearn', 'matplotlib']
+DAEMON_ADDRESS = os.getenv('CRYPTO_DAEMON', '127.0.0.1:8765')  # Adresse HTTP locale du mode démon (serve)
+IMPORT_BUDGET = float(os.getenv('IMPORT_BUDGET', 1.0))  # Temps d'import max du module (secondes), vérifié par check-import et tests/test_import_time.py
+
+# Instrumentation (opt-in): temps mur/CPU par étape et par paire, compteurs, événements de trace.
+# Chaque process (parent, workers du Pool, worker de rendu) collecte les siens; le parent fusionne les instantanés.
+_metrics = None
+_metrics_lock = threading.Lock()
+# Étape englobante en cours (thread ou coroutine): seules les étapes de premier niveau sont des tâches
+_timing_depth = contextvars.ContextVar('timing_depth', default=0)
+
+def metrics_reset():
+    global _metrics, _metrics_lock
+    _metrics = {'stages': {}, 'pairs': {}, 'tasks': {}, 'workers': {}, 'counters': Counter(), 'events': []}
+    _metrics_lock = threading.Lock()
+
+def _add_timing(bucket, stage, wall, cpu, n=1):
+    entry = bucket.setdefault(stage, {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+    entry['count'] += n
+    entry['wall'] += wall
+    entry['cpu'] += cpu
+
+# cpu=False pour les étapes asynchrones: le temps CPU du thread y inclurait les autres coroutines
+@contextmanager
+def timed(stage, pair=None, cpu=True):
+    if not TIMINGS_ENABLED or _metrics is None:
+        yield
+        return
+    start, wall_start, cpu_start = time.time(), time.perf_counter(), time.thread_time()
+    depth = _timing_depth.set(_timing_depth.get() + 1)
+    try:
+        yield
+    finally:
+        _timing_depth.reset(depth)
+        wall = time.perf_counter() - wall_start
+        cpu_time = time.thread_time() - cpu_start if cpu else 0.0
+        with _metrics_lock:
+            _add_timing(_metrics['stages'], stage, wall, cpu_time)
+            if _timing_depth.get() == 0:
+                _add_timing(_metrics['tasks'], stage, wall, cpu_time)
+            if pair is not None:
+                _add_timing(_metrics['pairs'].setdefault(pair, {}), stage, wall, cpu_time)
+            if TRACE_FILE:
+                _metrics['events'].append({'name': stage, 'ph': 'X', 'ts': start * 1e6, 'dur': wall * 1e6, 'pid': os.getpid(),
+                                           'tid': threading.get_ident(), 'args': {'pair': pair} if pair else {}})
+
+def count(counter, n=1):
+    if TIMINGS_ENABLED and _metrics is not None:
+        with _metrics_lock:
+            _metrics['counters'][counter] += n
+
+# Taille en octets de la dernière réponse HTTP d'un client ccxt (texte décodé: réencodé en UTF-8)
+def response_bytes(client):
+    response = client.last_http_response or b''
+    return len(response.encode()) if isinstance(response, str) else len(response)
+
+# Instantané transmissible au parent (None si l'instrumentation est désactivée)
+def metrics_snapshot():
+    if not TIMINGS_ENABLED or _metrics is None:
+        return None
+    with _metrics_lock:
+        return {**copy.deepcopy(_metrics), 'counters': dict(_metrics['counters']), 'pid': os.getpid()}
+
+def merge_metrics(snapshot):
+    if not snapshot or _metrics is None:
+        return
+    with _metrics_lock:
+        for stage, entry in snapshot['stages'].items():
+            _add_timing(_metrics['stages'], stage, entry['wall'], entry['cpu'], entry['count'])
+        for pair, stages in snapshot['pairs'].items():
+            for stage, entry in stages.items():
+                _add_timing(_metrics['pairs'].setdefault(pair, {}), stage, entry['wall'], entry['cpu'], entry['count'])
+        # Par worker et par étape de tâche (screen_pair, process_pair, render_chart...): nombre et temps cumulé
+        for stage, entry in snapshot['tasks'].items():
+            _add_timing(_metrics['workers'].setdefault(str(snapshot['pid']), {}), stage, entry['wall'], entry['cpu'], entry['count'])
+        _metrics['counters'].update(snapshot['counters'])
+        _metrics['events'].extend(snapshot['events'])
+
+def _rounded(entries):
+    return {name: {k: round(v, 4) if isinstance(v, float) else v for k, v in entry.items()} for name, entry in entries.items()}
+
+# Bloc timings du JSON de sortie; écrit aussi le fichier de trace si CRYPTO_TRACE est défini
+def timings_block(wall, cpu):
+    if TRACE_FILE:
+        try:
+            with open(TRACE_FILE, 'w') as f:
+                json.dump({'traceEvents': _metrics['events']}, f)
+        except OSError as e:
+            logger.error(f"Erreur d'écriture de la trace {TRACE_FILE}: {e}")
+    return {
+        'total': {'wall': round(wall, 4), 'cpu': round(cpu, 4)},
+        'stages': _rounded(_metrics['stages']),
+        'pairs': {pair: _rounded(stages) for pair, stages in _metrics['pairs'].items()},
+        'workers': {pid: _rounded(stages) for pid, stages in _metrics['workers'].items()},
+        'counters': dict(_metrics['counters'])
+    }
+
+# Exécute une commande (run_*) et, si l'instrumentation est active, ajoute le bloc timings à sa sortie.
+# Un rendu en cours (run_scan) est alors attendu pour compter le worker de rendu dans le total
+def run_with_timings(run, *args):
+    if not TIMINGS_ENABLED:
+        return run(*args)
+    metrics_reset()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = run(*args)
+    output = result
+    if isinstance(result, tuple):
+        output, render = result
+        if render:
+            merge_metrics(render.result()[1])
+        result = output, None
+    output['timings'] = timings_block(time.perf_counter() - wall_start, time.process_time() - cpu_start)
+    return result
+
+# Import de torch/sklearn en tâche de fond pendant les I/O réseau; à joindre avant tout fork
+def preload_ml():
+    thread = threading.Thread(target=importlib.import_module, args=('crypto_ml',), daemon=True)
+    thread.start()
+    return thread
+
+# Vérifie dans un interpréteur neuf que l'import du module tient dans le budget sans charger de dépendance lourde
+def check_import_time(budget=IMPORT_BUDGET):
+    code = (
+        "import json, sys, time; start = time.perf_counter(); import crypto_trading_dashboard; "
+        f"print(json.dumps({{'seconds': time.perf_counter() - start, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result.update(budget=budget, ok=result['seconds'] <= budget and not result['loaded'])
+    return result
+
+# Configuration des exchanges (Kraken + Binance pour fallback et arbitrage), clients créés à la demande
+EXCHANGE_NAMES = ['kraken', 'binance']
+exchanges = {}
 
-# Ajouter API keys si disponibles (pour extensions privées)
-for ex_name, ex in exchanges.items():
-    api_key = os.getenv(f'{ex_name.upper()}_API_KEY')
-    secret = os.getenv(f'{ex_name.upper()}_SECRET')
-    if api_key and secret:
-        ex.apiKey = api_key
-        ex.secret = secret
+def get_exchange(ex_name):
+    if ex_name not in exchanges:
+        import ccxt
+        ex = getattr(ccxt, ex_name)({'enableRateLimit': True})
+        # Ajouter API keys si disponibles (pour extensions privées)
+        api_key = os.getenv(f'{ex_name.upper()}_API_KEY')
+        secret = os.getenv(f'{ex_name.upper()}_SECRET')
+        if api_key and secret:
+            ex.apiKey = api_key
+            ex.secret = secret
+        if REPLAY_ACTIVE:
+            import crypto_replay
+            ex = crypto_replay.wrap_exchange(ex_name, ex)
+        exchanges[ex_name] = ex
+    return exchanges[ex_name]
+
+# Durée d'un timeframe ccxt en secondes
+def parse_timeframe(timeframe):
+    import ccxt
+    return ccxt.Exchange.parse_timeframe(timeframe)
 
 # Liste étendue de paires USD/USDT sur Kraken
 pairs = sorted([
@@ -66,6 +220,10 @@ pairs = sorted([
 
 # Paramètres (rendus plus dynamiques pour optimisation)
 TIMEFRAMES = ['1h', '4h', '1d']
+# Bougies d'indicateurs conservées par paire (dernière ligne, niveaux en attrs et historique de prix des signaux):
+# le LSTM lit l'OHLCV brut, le graphique recalcule sa propre frame complète
+RECORD_TAILS = {'1h': 50, '4h': 1, '1d': 1}
+STREAM_ROWS = max(RECORD_TAILS.values())  # Lignes gardées par les états incrémentaux (stream_frame)
 LIMIT = 1000  # Augmenté pour backtesting et ML
 BB_PERIOD = 20
 BB_STD = 2.0
@@ -84,6 +242,46 @@ SLIPPAGE = 0.0005  # Estimation du slippage
 RISK_PER_TRADE = 0.01  # Risque max par trade (% du capital)
 CORR_THRESHOLD = 0.8  # Seuil de corrélation pour diversification
 
+# Enregistrement / rejeu des appels exchange et HTTP (crypto_replay.py): cache vierge par défaut et stock de
+# bougies désactivé, pour que les requêtes (et donc les réponses de l'archive) ne dépendent pas de l'état local
+REPLAY_ACTIVE = bool(os.getenv('CRYPTO_RECORD') or os.getenv('CRYPTO_REPLAY'))
+
+# Cache local (bougies, métadonnées...) réutilisé d'un run à l'autre
+CACHE_DIR = os.getenv('CRYPTO_CACHE_DIR') or (
+    tempfile.mkdtemp(prefix='crypto_replay_') if REPLAY_ACTIVE
+    else os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+CANDLE_STORE_DIR = os.path.join(CACHE_DIR, 'candles')
+CANDLE_STORE_ENABLED = os.getenv('CANDLE_STORE', '0' if REPLAY_ACTIVE else '1') != '0'
+MARKETS_CACHE_DIR = os.path.join(CACHE_DIR, 'markets')
+MARKETS_TTL = int(os.getenv('MARKETS_TTL', 6 * 3600))  # Durée de validité du cache des marchés (secondes)
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+INDICATOR_DTYPE = np.float32  # Précision des indicateurs comparés seulement à des seuils (OHLCV gardé en float64)
+# Indicateurs comparés entre eux ou au prix/volume, gardés en float64: un arrondi float32 inverserait ces
+# comparaisons sur les séries quasi plates (stablecoins), ema_fast < ema_slow à 1e-8 près par exemple
+EXACT_INDICATORS = {'sma', 'upper_bb', 'lower_bb', 'ema_fast', 'ema_slow', 'macd', 'macd_signal', 'stoch_k', 'stoch_d', 'volume_ema'}
+INDICATOR_COLUMNS = ['sma', 'upper_bb', 'lower_bb', 'rsi', 'ema_fast', 'ema_slow', 'macd', 'macd_signal', 'atr', 'momentum',
+                     'fib_0.236', 'fib_0.382', 'fib_0.5', 'fib_0.618', 'fib_0.764', 'stoch_k', 'stoch_d', 'volume_ema']
+BACKTEST_LIMIT = 365  # Bougies journalières pour le backtest
+FETCH_MAX_IN_FLIGHT = int(os.getenv('FETCH_MAX_IN_FLIGHT', 10))  # Requêtes OHLCV simultanées max (toutes exchanges)
+FETCH_BURST = int(os.getenv('FETCH_BURST', 1))  # Capacité du token bucket par exchange
+MODEL_DIR = os.path.join(CACHE_DIR, 'models')
+LSTM_SHARED_TRAINING = os.getenv('LSTM_SHARED_TRAINING', '0') == '1'  # Pré-entraîne un modèle commun à toutes les paires
+SCREEN_TOP_K = int(os.getenv('SCREEN_TOP_K', 20))  # Paires retenues par la présélection du scan pour ML, signaux externes et backtest (0 = toutes)
+PARAMS_FILE = os.path.join(CACHE_DIR, 'params.json')  # Paramètres optimisés par paire (commande optimize)
+PARAMS_REFERENCE_PAIR = 'BTC/USD'  # Paramètres appliqués aux paires sans optimisation propre
+CORR_CACHE_DIR = os.path.join(CACHE_DIR, 'correlation')
+CORR_WINDOW = 100  # Rendements journaliers utilisés pour la corrélation
+CHART_DIR = os.path.join(CACHE_DIR, 'charts')
+CHART_FORMAT = os.getenv('CHART_FORMAT', 'png')  # png, json (séries brutes pour le frontend) ou none
+CHART_COLUMNS = ['timestamp', 'close', 'ema_fast', 'ema_slow', 'upper_bb', 'lower_bb']
+SIGNAL_CACHE_DIR = os.path.join(CACHE_DIR, 'signals')
+SIGNAL_TTLS = {'fng': 3600, 'coingecko': 900}  # Fraîcheur par source (secondes)
+SIGNAL_STALE_TTL = 6 * 3600  # Au-delà du TTL, valeur servie pendant la revalidation en arrière-plan
+SIGNAL_NEGATIVE_TTL = 120  # Après un échec, pas de nouvelle requête pendant ce délai
+SIGNAL_TIMEOUT = float(os.getenv('SIGNAL_TIMEOUT', 5))  # Timeout des requêtes HTTP externes
+SIGNAL_MAX_IN_FLIGHT = int(os.getenv('SIGNAL_MAX_IN_FLIGHT', 4))  # Requêtes de signaux externes simultanées (rate limit CoinGecko)
+
 # Dict for CoinGecko IDs for sentiment
 symbol_to_id = {
     'BTC': 'bitcoin', 'ETH': 'ethereum', 'XRP': 'ripple', 'SOL': 'solana', 'DOGE': 'dogecoin', 'ADA': 'cardano',
@@ -103,195 +301,1152 @@ symbol_to_id = {
     'ECO': 'echelon-prime', 'RON': 'ronin', 'GT': 'gatechain-token', 'BOME': 'book-of-meme', 'MANA': 'decentraland'
 }  # Extended for more
 
-# Classe pour dataset LSTM
-class CryptoDataset(Dataset):
-    def __init__(self, data, seq_length):
-        self.data = data
-        self.seq_length = seq_length
-
-    def __len__(self):
-        return len(self.data) - self.seq_length
-
-    def __getitem__(self, idx):
-        return (
-            torch.tensor(self.data[idx:idx+self.seq_length], dtype=torch.float32),
-            torch.tensor(self.data[idx+self.seq_length], dtype=torch.float32)
-        )
-
-# Modèle LSTM pour prédiction de prix
-class LSTMModel(nn.Module):
-    def __init__(self, input_size=1, hidden_size=50, num_layers=1):
-        super().__init__()
-        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
-        self.linear = nn.Linear(hidden_size, 1)
-
-    def forward(self, x):
-        lstm_out, _ = self.lstm(x)
-        return self.linear(lstm_out[:, -1, :])
-
-# Entraînement LSTM (simple et rapide)
-def train_lstm(df, epochs=5, seq_length=50, batch_size=32):
-    if len(df) < seq_length + 1:
-        return None, None
+# Registre de modèles LSTM par paire/timeframe/hyperparamètres: poids et scaler persistés sur disque
+_lstm_registry = {}
 
-    scaler = MinMaxScaler()
-    scaled_data = scaler.fit_transform(df['close'].values.reshape(-1, 1))
+def _lstm_key(pair, timeframe, epochs, seq_length, batch_size):
+    return f"{pair.replace('/', '_')}_{timeframe}_e{epochs}_s{seq_length}_b{batch_size}"
 
-    dataset = CryptoDataset(scaled_data, seq_length)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+def _load_lstm(key):
+    if key in _lstm_registry:
+        return _lstm_registry[key]
+    path = os.path.join(MODEL_DIR, f'{key}.pt')
+    if not os.path.exists(path):
+        return None
+    import crypto_ml as ml
+    try:
+        model, scaler, last_timestamp = ml.load_model(path)
+    except (OSError, RuntimeError, KeyError, EOFError) as e:
+        logger.error(f"Erreur de chargement du modèle {key}: {e}")
+        return None
+    entry = {'model': model, 'scaler': scaler, 'last_timestamp': last_timestamp}
+    _lstm_registry[key] = entry
+    return entry
 
-    model = LSTMModel()
-    criterion = nn.MSELoss()
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+def _save_lstm(key, entry):
+    import crypto_ml as ml
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    try:
+        ml.save_model(os.path.join(MODEL_DIR, f'{key}.pt'), entry['model'], entry['scaler'], entry['last_timestamp'])
+    except OSError as e:
+        logger.error(f"Erreur d'écriture du modèle {key}: {e}")
 
-    model.train()
-    for epoch in range(epochs):
-        for x, y in dataloader:
-            optimizer.zero_grad()
-            output = model(x)
-            loss = criterion(output, y)
-            loss.backward()
-            optimizer.step()
+# Modèle à jour pour la paire: réutilisé si aucune bougie nouvelle, fine-tuné si quelques bougies
+# se sont ajoutées, réentraîné si le trou est trop grand ou si les prix sortent de l'échelle du scaler
+def get_lstm_model(pair, df, timeframe='1h', epochs=5, seq_length=50, batch_size=32):
+    import crypto_ml as ml
+    if len(df) < seq_length + 1:
+        return None, None
+    key = _lstm_key(pair, timeframe, epochs, seq_length, batch_size)
+    last_timestamp = int(df['timestamp'].iloc[-1])
+    entry = _load_lstm(key)
+    if entry is not None and entry['last_timestamp'] == last_timestamp:
+        return entry['model'], entry['scaler']
 
+    new_candles = int((df['timestamp'] > entry['last_timestamp']).sum()) if entry is not None else 0
+    if 0 < new_candles <= ml.LSTM_FINETUNE_WINDOW and len(df) > new_candles + seq_length:
+        scaled_new = entry['scaler'].transform(df['close'].values[-new_candles:].reshape(-1, 1))
+        # Tolérance de 10% hors de la plage d'entraînement avant de refitter le scaler
+        if scaled_new.min() >= -0.1 and scaled_new.max() <= 1.1:
+            with timed('finetune_lstm', pair):
+                model = ml.finetune_lstm(copy.deepcopy(entry['model']), entry['scaler'], df, seq_length=seq_length, batch_size=batch_size)
+            scaler = entry['scaler']
+        else:
+            with timed('train_lstm', pair):
+                model, scaler = ml.train_lstm(df, epochs, seq_length, batch_size)
+    else:
+        with timed('train_lstm', pair):
+            model, scaler = ml.train_lstm(df, epochs, seq_length, batch_size)
+    if model is None:
+        return None, None
+
+    entry = {'model': model, 'scaler': scaler, 'last_timestamp': last_timestamp}
+    _lstm_registry[key] = entry
+    _save_lstm(key, entry)
     return model, scaler
 
-# Prédiction avec LSTM
-def predict_price(model, scaler, last_sequence):
-    model.eval()
-    with torch.no_grad():
-        input_tensor = torch.tensor(last_sequence, dtype=torch.float32).unsqueeze(0)
-        pred = model(input_tensor).item()
-    return scaler.inverse_transform([[pred]])[0][0]
+# Modèle du registre (mémoire ou disque) déjà à jour pour la dernière bougie de df
+def lstm_model_current(pair, df, timeframe='1h', epochs=5, seq_length=50, batch_size=32):
+    entry = _load_lstm(_lstm_key(pair, timeframe, epochs, seq_length, batch_size))
+    return entry is not None and entry['last_timestamp'] == int(df['timestamp'].iloc[-1])
 
-# Fetch OHLCV avec fallback multi-exchange
-def fetch_ohlcv(pair, timeframe, limit, preferred_exchange='kraken'):
-    ex = exchanges.get(preferred_exchange)
+# Tâche du worker (scan): modèle de la paire entraîné ou fine-tuné ici, renvoyé au parent qui
+# l'enregistre (register_lstm_model) avant l'inférence groupée de lstm_predictions
+def update_lstm_model(pair, entry, timeframe='1h', epochs=5, seq_length=50, batch_size=32):
+    if TIMINGS_ENABLED:
+        metrics_reset()
+    model = None
     try:
-        return ex.fetch_ohlcv(pair, timeframe, limit=limit)
+        with timed('update_lstm_model', pair):
+            df = shared_frame(entry)
+            model, scaler = get_lstm_model(pair, df, timeframe, epochs, seq_length, batch_size)
     except Exception as e:
-        logger.error(f"Erreur sur {preferred_exchange}: {e}. Tentative sur l'autre exchange.")
-        alt_ex_name = 'binance' if preferred_exchange == 'kraken' else 'kraken'
-        alt_ex = exchanges[alt_ex_name]
+        logger.error(f"Erreur du modèle LSTM pour {pair}: {e}")
+    if model is None:
+        return pair, None, metrics_snapshot()
+    return pair, {'model': model, 'scaler': scaler, 'last_timestamp': int(df['timestamp'].iloc[-1])}, metrics_snapshot()
+
+def register_lstm_model(pair, entry, timeframe='1h', epochs=5, seq_length=50, batch_size=32):
+    _lstm_registry[_lstm_key(pair, timeframe, epochs, seq_length, batch_size)] = entry
+
+# Pré-entraînement groupé des paires absentes du registre (mode LSTM_SHARED_TRAINING): le modèle partagé
+# est référencé par chaque paire, puis copié et fine-tuné individuellement au fil des runs
+def warm_lstm_models(pair_dfs, timeframe='1h', epochs=5, seq_length=50, batch_size=32):
+    import crypto_ml as ml
+    keys = {pair: _lstm_key(pair, timeframe, epochs, seq_length, batch_size) for pair in pair_dfs}
+    cold = {pair: df for pair, df in pair_dfs.items() if _load_lstm(keys[pair]) is None}
+    if not cold:
+        return
+    with timed('train_lstm_shared'):
+        model, scalers = ml.train_lstm_shared(cold, epochs, seq_length)
+    for pair, scaler in scalers.items():
+        entry = {'model': model, 'scaler': scaler, 'last_timestamp': int(cold[pair]['timestamp'].iloc[-1])}
+        _lstm_registry[keys[pair]] = entry
+        _save_lstm(keys[pair], entry)
+
+# Prédiction ML du prochain close 1h via le registre
+def lstm_prediction(pair, df_1h, seq_length=50):
+    return lstm_predictions({pair: df_1h}, seq_length).get(pair)
+
+# Prédictions ML de tout l'univers en un appel: modèles du registre, inférence groupée
+def lstm_predictions(pair_dfs, seq_length=50):
+    import crypto_ml as ml
+    models, windows = {}, {}
+    for pair, df in pair_dfs.items():
+        model, scaler = get_lstm_model(pair, df, seq_length=seq_length)
+        if model and scaler:
+            models[pair] = (model, scaler)
+            windows[pair] = df['close'].values[-seq_length:]
+    if not models:
+        return {}
+    with timed('predict_price', next(iter(models)) if len(models) == 1 else None):
+        return ml.predict_prices(models, windows)
+
+# Stockage des bougies: une colonne binaire par champ, en ajout seul, par exchange/paire/timeframe
+def _candle_store_path(ex_name, pair, timeframe):
+    return os.path.join(CANDLE_STORE_DIR, ex_name, pair.replace('/', '_'), timeframe)
+
+def load_candles(ex_name, pair, timeframe):
+    path = _candle_store_path(ex_name, pair, timeframe)
+    meta_file = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_file):
+        return None, None
+    try:
+        with open(meta_file) as f:
+            meta = json.load(f)
+        columns = [
+            np.fromfile(os.path.join(path, f'{col}.bin'), dtype=np.int64 if col == 'timestamp' else np.float64)
+            for col in OHLCV_COLUMNS
+        ]
+    except (OSError, ValueError) as e:
+        logger.error(f"Erreur de lecture du stock de bougies {ex_name} {pair} {timeframe}: {e}")
+        return None, None
+    # Écriture interrompue entre deux colonnes: le stock est invalide, on le reconstruira
+    if len({len(col) for col in columns}) != 1 or len(columns[0]) == 0:
+        return None, None
+    return columns, meta
+
+def save_candles(ex_name, pair, timeframe, candles, limit=None):
+    path = _candle_store_path(ex_name, pair, timeframe)
+    os.makedirs(path, exist_ok=True)
+    # limit renseigné = réécriture complète après un fetch intégral
+    mode = 'wb' if limit is not None else 'ab'
+    data = np.asarray(candles, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+    try:
+        for i, col in enumerate(OHLCV_COLUMNS):
+            with open(os.path.join(path, f'{col}.bin'), mode) as f:
+                data[:, i].astype(np.int64 if col == 'timestamp' else np.float64).tofile(f)
+        if limit is not None:
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump({'limit': limit}, f)
+    except OSError as e:
+        logger.error(f"Erreur d'écriture du stock de bougies {ex_name} {pair} {timeframe}: {e}")
+
+# Fetch OHLCV incrémental: seules les bougies postérieures au stock local sont demandées à l'exchange
+def _plan_incremental_fetch(ex, ex_name, pair, timeframe, limit):
+    tf_ms = ex.parse_timeframe(timeframe) * 1000
+    now = ex.milliseconds()
+    columns, meta = load_candles(ex_name, pair, timeframe)
+    plan = {'tf_ms': tf_ms, 'now': now, 'columns': columns, 'params': {'limit': limit}}
+    # Stock absent, historique demandé plus long que le stock, trou trop grand ou stock discontinu: fetch intégral
+    if (columns is None or limit > meta.get('limit', 0) or (now - int(columns[0][-1])) // tf_ms >= limit
+            or np.any(np.diff(columns[0]) != tf_ms)):
+        plan['columns'] = None
+    else:
+        plan['params']['since'] = int(columns[0][-1]) + tf_ms
+    return plan
+
+# Réponse incrémentale qui ne prolonge pas le stock bougie à bougie (vide, ou commençant après la bougie
+# attendue: exchange limité à ses dernières bougies quel que soit since, 720 chez Kraken). Le plan passe
+# alors en fetch intégral plutôt que de recoudre le trou dans le stock
+def _breaks_store(plan, candles):
+    if plan['columns'] is None:
+        return False
+    if not candles or candles[0][0] > int(plan['columns'][0][-1]) + plan['tf_ms']:
+        plan['columns'] = None
+        plan['params'] = {'limit': plan['params']['limit']}
+        return True
+    return False
+
+def _apply_incremental_fetch(ex_name, pair, timeframe, limit, plan, candles):
+    tf_ms, now, columns = plan['tf_ms'], plan['now'], plan['columns']
+    if columns is None:
+        # La bougie en cours n'est pas stockée: elle sera redemandée au prochain run
+        save_candles(ex_name, pair, timeframe, [c for c in candles if c[0] + tf_ms <= now], limit=limit)
+        return candles
+
+    last_ts = int(columns[0][-1])
+    fresh = [c for c in candles if c[0] > last_ts]
+    closed = [c for c in fresh if c[0] + tf_ms <= now]
+    if closed:
+        save_candles(ex_name, pair, timeframe, closed)
+
+    stored = [list(c) for c in zip(*(col[-limit:].tolist() for col in columns))]
+    return (stored + fresh)[-limit:]
+
+def fetch_ohlcv_incremental(ex_name, pair, timeframe, limit):
+    ex = get_exchange(ex_name)
+    plan = _plan_incremental_fetch(ex, ex_name, pair, timeframe, limit) if CANDLE_STORE_ENABLED else None
+    while True:
+        with timed('fetch_ohlcv', pair):
+            count('exchange_calls')
+            candles = ex.fetch_ohlcv(pair, timeframe, **(plan['params'] if plan else {'limit': limit}))
+            count('bytes_received', response_bytes(ex))
+        if plan is None or not _breaks_store(plan, candles):
+            break
+    if plan is None:
+        return candles
+    return _apply_incremental_fetch(ex_name, pair, timeframe, limit, plan, candles)
+
+# Marchés chargés une fois par process, persistés sur disque avec TTL
+# refresh: ignore les marchés déjà en mémoire (index de routage périmé dans un process long)
+def load_markets_cached(ex_name, refresh=False):
+    ex = get_exchange(ex_name)
+    if ex.markets and not refresh:
+        return ex.markets
+    path = os.path.join(MARKETS_CACHE_DIR, f'{ex_name}.json')
+    try:
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < MARKETS_TTL:
+            with open(path) as f:
+                data = json.load(f)
+            ex.set_markets(data['markets'], data.get('currencies'))
+            return ex.markets
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Cache des marchés {ex_name} illisible: {e}")
+    count('exchange_calls')
+    markets = ex.load_markets()
+    count('bytes_received', response_bytes(ex))
+    try:
+        os.makedirs(MARKETS_CACHE_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'markets': markets, 'currencies': ex.currencies}, f, default=str)
+    except (OSError, TypeError) as e:
+        logger.error(f"Erreur d'écriture du cache des marchés {ex_name}: {e}")
+    return markets
+
+# Index de routage {symbole: [exchanges qui le listent]}, reconstruit après MARKETS_TTL (démon).
+# Un index vide (marchés injoignables) n'est pas gardé: le prochain appel réessaie
+_market_routes = None
+_market_routes_built = 0.0
+
+def get_market_routes():
+    global _market_routes, _market_routes_built
+    if _market_routes is None or time.time() - _market_routes_built >= MARKETS_TTL:
+        refresh = _market_routes is not None
+        routes = {}
+        for ex_name in EXCHANGE_NAMES:
+            try:
+                with timed('load_markets'):
+                    markets = load_markets_cached(ex_name, refresh=refresh)
+            except Exception as e:
+                logger.error(f"Impossible de charger les marchés {ex_name}: {e}")
+                continue
+            for symbol in markets:
+                routes.setdefault(symbol, []).append(ex_name)
+        if not routes:
+            return routes
+        _market_routes, _market_routes_built = routes, time.time()
+    return _market_routes
+
+# Exchanges à interroger pour une paire, l'exchange préféré en premier
+def route_exchanges(pair, preferred_exchange='kraken'):
+    listed = get_market_routes().get(pair)
+    if not listed:
+        # Paire absente de l'index (marchés indisponibles): ordre historique préféré puis alternatif
+        listed = [preferred_exchange, 'binance' if preferred_exchange == 'kraken' else 'kraken']
+    return sorted(listed, key=lambda ex_name: ex_name != preferred_exchange)
+
+# Fetch OHLCV avec fallback multi-exchange (uniquement sur les exchanges qui listent la paire)
+def fetch_ohlcv(pair, timeframe, limit, preferred_exchange='kraken'):
+    routes = route_exchanges(pair, preferred_exchange)
+    for i, ex_name in enumerate(routes):
         try:
-            return alt_ex.fetch_ohlcv(pair, timeframe, limit=limit)
-        except Exception as alt_e:
-            logger.error(f"Erreur sur {alt_ex_name}: {alt_e}.")
-            return []
-
-# Calcul des indicateurs (amélioré avec Stochastic, Volume EMA, supports/résistances plus robustes)
-def calculate_indicators(df):
-    if df.empty or len(df) < max(BB_PERIOD, RSI_PERIOD, EMA_SLOW, MOMENTUM_PERIOD, STOCH_PERIOD):
+            return fetch_ohlcv_incremental(ex_name, pair, timeframe, limit)
+        except Exception as e:
+            logger.error(f"Erreur sur {ex_name}: {e}. Tentative sur l'exchange suivant.")
+            count('exchange_errors')
+            count('exchange_fallbacks', int(i < len(routes) - 1))
+    return []
+
+# Token bucket partagé par exchange (débit dérivé du rateLimit ccxt)
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                count('rate_limit_waits')
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Fetch OHLCV concurrent depuis une seule boucle asyncio (même stock local et même fallback que fetch_ohlcv)
+async def _fetch_ohlcv_many_async(requests_list, preferred_exchange='kraken'):
+    get_market_routes()
+    clients = {}
+    buckets = {}
+    import ccxt.async_support as ccxt_async
+    for ex_name in EXCHANGE_NAMES:
+        ex = get_exchange(ex_name)
+        # Le throttling ccxt est remplacé par le token bucket partagé
+        clients[ex_name] = getattr(ccxt_async, ex_name)({'enableRateLimit': False, 'apiKey': ex.apiKey, 'secret': ex.secret})
+        if REPLAY_ACTIVE:
+            import crypto_replay
+            clients[ex_name] = crypto_replay.wrap_exchange(ex_name, clients[ex_name], asynchronous=True)
+        if ex.markets:
+            clients[ex_name].set_markets(ex.markets, ex.currencies)
+        buckets[ex_name] = TokenBucket(1000 / ex.rateLimit, FETCH_BURST)
+    in_flight = asyncio.Semaphore(FETCH_MAX_IN_FLIGHT)
+
+    async def fetch_one(pair, timeframe, limit):
+        routes = route_exchanges(pair, preferred_exchange)
+        for i, ex_name in enumerate(routes):
+            try:
+                plan = None
+                params = {'limit': limit}
+                if CANDLE_STORE_ENABLED:
+                    plan = _plan_incremental_fetch(get_exchange(ex_name), ex_name, pair, timeframe, limit)
+                    params = plan['params']
+                while True:
+                    async with in_flight:
+                        await buckets[ex_name].acquire()
+                        with timed('fetch_ohlcv', pair, cpu=False):
+                            count('exchange_calls')
+                            candles = await clients[ex_name].fetch_ohlcv(pair, timeframe, **params)
+                            count('bytes_received', response_bytes(clients[ex_name]))
+                    if plan is None or not _breaks_store(plan, candles):
+                        break
+                    params = plan['params']
+                if plan is None:
+                    return candles
+                return _apply_incremental_fetch(ex_name, pair, timeframe, limit, plan, candles)
+            except Exception as e:
+                logger.error(f"Erreur sur {ex_name} pour {pair} {timeframe}: {e}.")
+                count('exchange_errors')
+                count('exchange_fallbacks', int(i < len(routes) - 1))
+        return []
+
+    try:
+        results = await asyncio.gather(*(fetch_one(*req) for req in requests_list))
+    finally:
+        for client in clients.values():
+            await client.close()
+    return dict(zip(requests_list, results))
+
+# requests_list: liste de (pair, timeframe, limit) -> {(pair, timeframe, limit): ohlcv}
+def fetch_ohlcv_many(requests_list, preferred_exchange='kraken'):
+    if not requests_list:
+        return {}
+    return asyncio.run(_fetch_ohlcv_many_async(list(dict.fromkeys(requests_list)), preferred_exchange))
+
+# Agrégation OHLCV vers un timeframe supérieur (buckets UTC, comme les bougies des exchanges)
+def resample_ohlcv(df, timeframe):
+    tf_ms = parse_timeframe(timeframe) * 1000
+    base_ms = int(df['timestamp'].diff().median()) if len(df) > 1 else tf_ms
+    resampled = df.groupby(df['timestamp'] // tf_ms * tf_ms).agg(
+        open=('open', 'first'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        close=('close', 'last'),
+        volume=('volume', 'sum'),
+        count=('close', 'size')
+    )
+    # Le premier bucket est incomplet si l'historique commence en cours de période
+    if len(resampled) > 0 and resampled['count'].iloc[0] < tf_ms // base_ms:
+        resampled = resampled.iloc[1:]
+    return resampled.drop(columns='count').rename_axis('timestamp').reset_index()
+
+# Taille de la requête 1h pour couvrir `limit` bougies de chaque timeframe supérieur
+def _base_fetch_limit(limit):
+    base_s = parse_timeframe(TIMEFRAMES[0])
+    return max(limit * parse_timeframe(tf) // base_s for tf in TIMEFRAMES)
+
+# Construit les frames de tous les TIMEFRAMES depuis le 1h; renvoie aussi les timeframes à fetcher.
+# Un timeframe n'est agrégé que si le 1h couvre les `limit` bougies que son fetch aurait demandées:
+# pivots, support/résistance et conditions calculés sur le même historique que le fetch direct
+def _derive_timeframes(base_ohlcv, limit):
+    base = pd.DataFrame(base_ohlcv, columns=OHLCV_COLUMNS)
+    dfs = {TIMEFRAMES[0]: base.tail(limit).reset_index(drop=True)}
+    missing = []
+    for tf in TIMEFRAMES[1:]:
+        derived = resample_ohlcv(base, tf)
+        if len(derived) >= limit:
+            dfs[tf] = derived.tail(limit).reset_index(drop=True)
+        else:
+            missing.append(tf)
+    return dfs, missing
+
+# Récupère les OHLCV de tous les TIMEFRAMES: 4h et 1d sont agrégés depuis le 1h quand son historique les couvre
+def fetch_timeframes(pair, limit=LIMIT):
+    ohlcv = fetch_ohlcv(pair, TIMEFRAMES[0], _base_fetch_limit(limit))
+    if not ohlcv:
+        return None
+    dfs, missing = _derive_timeframes(ohlcv, limit)
+    for tf in missing:
+        # Historique 1h insuffisant: fetch direct du timeframe
+        time.sleep(0.2)
+        ohlcv = fetch_ohlcv(pair, tf, limit)
+        if not ohlcv:
+            return None
+        dfs[tf] = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+    return dfs
+
+# Version concurrente de fetch_timeframes pour tout l'univers: {pair: dfs}, paires sans données exclues
+def prefetch_timeframes(pairs_list, limit=LIMIT):
+    base_limit = _base_fetch_limit(limit)
+    base = fetch_ohlcv_many([(p, TIMEFRAMES[0], base_limit) for p in pairs_list])
+    dfs_by_pair = {}
+    missing = []
+    for p in pairs_list:
+        ohlcv = base.get((p, TIMEFRAMES[0], base_limit))
+        if not ohlcv:
+            continue
+        dfs_by_pair[p], missing_tfs = _derive_timeframes(ohlcv, limit)
+        missing.extend((p, tf, limit) for tf in missing_tfs)
+    for (p, tf, _), ohlcv in fetch_ohlcv_many(missing).items():
+        if not ohlcv:
+            dfs_by_pair.pop(p, None)
+        elif p in dfs_by_pair:
+            dfs_by_pair[p][tf] = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+    return dfs_by_pair
+
+# Index trié des niveaux pivots d'une frame: support/résistance le plus proche d'un prix par recherche binaire
+class LevelIndex:
+    def __init__(self, supports, resistances):
+        self.supports = np.sort(np.asarray(supports, dtype=np.float64))
+        self.resistances = np.sort(np.asarray(resistances, dtype=np.float64))
+
+    # Plus haut pivot bas strictement sous le prix
+    def nearest_support(self, price):
+        i = np.searchsorted(self.supports, price, side='left')
+        return self.supports[i - 1] if i > 0 else np.nan
+
+    # Plus bas pivot haut strictement au-dessus du prix
+    def nearest_resistance(self, price):
+        i = np.searchsorted(self.resistances, price, side='right')
+        return self.resistances[i] if i < len(self.resistances) else np.nan
+
+# Détection vectorisée des pivots: creux/sommets locaux sur une bougie de chaque côté
+def detect_pivot_levels(df):
+    low = df['low'].to_numpy(dtype=np.float64)
+    high = df['high'].to_numpy(dtype=np.float64)
+    if len(df) < 5:
+        return LevelIndex([], [])
+    i = np.arange(2, len(df) - 2)
+    pivot_lows = low[i][(low[i] < low[i - 1]) & (low[i] < low[i + 1])]
+    pivot_highs = high[i][(high[i] > high[i - 1]) & (high[i] > high[i + 1])]
+    return LevelIndex(pivot_lows, pivot_highs)
+
+# Index des niveaux d'une frame (recalculé si les métadonnées ont été perdues)
+def frame_levels(df):
+    levels = df.attrs.get('levels')
+    if levels is None:
+        levels = detect_pivot_levels(df)
+        df.attrs['levels'] = levels
+    return levels
+
+# Colonnes d'indicateurs au format compact, communes au calcul complet et au moteur incrémental
+def compact_indicators(columns):
+    return {name: columns[name] if name in EXACT_INDICATORS else columns[name].astype(INDICATOR_DTYPE) for name in INDICATOR_COLUMNS}
+
+# Calcul des indicateurs (amélioré avec Stochastic, Volume EMA, supports/résistances plus robustes).
+# Frame compacte: OHLCV d'origine et EXACT_INDICATORS en float64, autres indicateurs en float32 (calculés
+# en float64), intermédiaires (std, tr) non conservés, niveaux dans df.attrs (index 'levels',
+# 'support'/'resistance' au dernier prix).
+# tail: ne renvoie que les `tail` dernières bougies (indicateurs et niveaux calculés sur tout l'historique)
+def calculate_indicators(df, params=None, tail=None):
+    p = strategy_params(params)
+    if df.empty or len(df) < max(p['BB_PERIOD'], p['RSI_PERIOD'], p['EMA_SLOW'], p['MOMENTUM_PERIOD'], p['STOCH_PERIOD']):
         return None
 
     try:
-        df['sma'] = df['close'].rolling(window=BB_PERIOD).mean()
-        df['std'] = df['close'].rolling(window=BB_PERIOD).std()
-        df['upper_bb'] = df['sma'] + BB_STD * df['std']
-        df['lower_bb'] = df['sma'] - BB_STD * df['std']
-
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=RSI_PERIOD).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=RSI_PERIOD).mean()
+        close, high, low = df['close'], df['high'], df['low']
+        sma = close.rolling(window=p['BB_PERIOD']).mean()
+        std = close.rolling(window=p['BB_PERIOD']).std()
+
+        delta = close.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=p['RSI_PERIOD']).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=p['RSI_PERIOD']).mean()
         rs = gain / loss.replace(0, np.nan)
-        df['rsi'] = 100 - (100 / (1 + rs))
 
-        df['ema_fast'] = df['close'].ewm(span=EMA_FAST, adjust=False).mean()
-        df['ema_slow'] = df['close'].ewm(span=EMA_SLOW, adjust=False).mean()
+        ema_fast = close.ewm(span=p['EMA_FAST'], adjust=False).mean()
+        ema_slow = close.ewm(span=p['EMA_SLOW'], adjust=False).mean()
+        macd = ema_fast - ema_slow
 
-        df['macd'] = df['ema_fast'] - df['ema_slow']
-        df['macd_signal'] = df['macd'].ewm(span=MACD_SIGNAL, adjust=False).mean()
+        tr = np.maximum(high - low, np.maximum(abs(high - close.shift()), abs(low - close.shift())))
 
-        df['tr'] = np.maximum(
-            df['high'] - df['low'],
-            np.maximum(
-                abs(df['high'] - df['close'].shift()),
-                abs(df['low'] - df['close'].shift())
-            )
-        )
-        df['atr'] = df['tr'].rolling(window=ATR_PERIOD).mean()
-
-        df['momentum'] = df['close'] - df['close'].shift(MOMENTUM_PERIOD)
-
-        high = df['high'].rolling(window=50).max()
-        low = df['low'].rolling(window=50).min()
-        diff = high - low
-        df['fib_0.236'] = high - 0.236 * diff
-        df['fib_0.382'] = high - 0.382 * diff
-        df['fib_0.5'] = high - 0.5 * diff
-        df['fib_0.618'] = high - 0.618 * diff
-        df['fib_0.764'] = high - 0.764 * diff
-
-        # Supports et résistances
-        supports = []
-        resistances = []
-        current_price = df['close'].iloc[-1]
-        for i in range(2, len(df) - 2):
-            if df['low'].iloc[i] < df['low'].iloc[i-1] and df['low'].iloc[i] < df['low'].iloc[i+1] and df['low'].iloc[i] < current_price:
-                supports.append(df['low'].iloc[i])
-            if df['high'].iloc[i] > df['high'].iloc[i-1] and df['high'].iloc[i] > df['high'].iloc[i+1] and df['high'].iloc[i] > current_price:
-                resistances.append(df['high'].iloc[i])
-
-        support = min(supports, default=np.nan, key=lambda x: abs(x - current_price)) if supports else np.nan
-        resistance = min(resistances, default=np.nan, key=lambda x: abs(x - current_price)) if resistances else np.nan
+        high_50 = high.rolling(window=50).max()
+        low_50 = low.rolling(window=50).min()
+        diff = high_50 - low_50
+
+        # Stochastic Oscillator
+        low_min = low.rolling(window=p['STOCH_PERIOD']).min()
+        high_max = high.rolling(window=p['STOCH_PERIOD']).max()
+        stoch_k = 100 * (close - low_min) / (high_max - low_min)
+
+        indicators = {
+            'sma': sma,
+            'upper_bb': sma + p['BB_STD'] * std,
+            'lower_bb': sma - p['BB_STD'] * std,
+            'rsi': 100 - (100 / (1 + rs)),
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'macd': macd,
+            'macd_signal': macd.ewm(span=p['MACD_SIGNAL'], adjust=False).mean(),
+            'atr': tr.rolling(window=p['ATR_PERIOD']).mean(),
+            'momentum': close - close.shift(p['MOMENTUM_PERIOD']),
+            'fib_0.236': high_50 - 0.236 * diff,
+            'fib_0.382': high_50 - 0.382 * diff,
+            'fib_0.5': high_50 - 0.5 * diff,
+            'fib_0.618': high_50 - 0.618 * diff,
+            'fib_0.764': high_50 - 0.764 * diff,
+            'stoch_k': stoch_k,
+            'stoch_d': stoch_k.rolling(window=3).mean(),
+            # Volume EMA for breakout detection
+            'volume_ema': df['volume'].ewm(span=20, adjust=False).mean()
+        }
+        out = df.assign(**compact_indicators(indicators))
+
+        # Supports et résistances (pivots vectorisés, index trié par frame)
+        levels = detect_pivot_levels(df)
+        current_price = close.iloc[-1]
+        support = levels.nearest_support(current_price)
+        resistance = levels.nearest_resistance(current_price)
 
         if not np.isnan(support) and not np.isnan(resistance) and abs(support - resistance) < current_price * 0.001:
             support = np.nan if resistance < current_price else support
             resistance = np.nan if support > current_price else resistance
 
-        df['support'] = [support] * len(df)
-        df['resistance'] = [resistance] * len(df)
+        if tail is not None:
+            out = out.iloc[-tail:].copy()
+        out.attrs.update(levels=levels, support=support, resistance=resistance)
+        return out
+    except Exception as e:
+        logger.error(f"Erreur dans calculate_indicators: {e}")
+        return None
 
-        # Stochastic Oscillator
-        low_min = df['low'].rolling(window=STOCH_PERIOD).min()
-        high_max = df['high'].rolling(window=STOCH_PERIOD).max()
-        df['stoch_k'] = 100 * (df['close'] - low_min) / (high_max - low_min)
-        df['stoch_d'] = df['stoch_k'].rolling(window=3).mean()
+# Moyenne glissante incrémentale (même sommation compensée que pandas rolling().mean())
+class _RollingMean:
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_count = 0
+        self.prev_value = np.nan
+
+    def push(self, val):
+        self.values.append(val)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.comp_remove
+                t = self.sum + y
+                self.comp_remove = t - self.sum - y
+                self.sum = t
+                if np.signbit(old):
+                    self.neg_ct -= 1
+        if val == val:
+            self.nobs += 1
+            y = val - self.comp_add
+            t = self.sum + y
+            self.comp_add = t - self.sum - y
+            self.sum = t
+            if np.signbit(val):
+                self.neg_ct += 1
+            self.same_count = self.same_count + 1 if val == self.prev_value else 1
+            self.prev_value = val
+        if self.nobs < self.window:
+            return np.nan
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        result = self.sum / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+# Variance glissante incrémentale (Welford compensé, ddof=1, même algorithme que pandas rolling().std())
+class _RollingVar:
+    UNSTABLE_TOL = np.finfo(np.float64).eps * 1e3
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0.0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+
+    def push(self, val):
+        self.values.append(val)
+        unstable = False
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                prev_m2 = self.ssqdm
+                self.nobs -= 1
+                if self.nobs:
+                    prev_mean = self.mean - self.comp_remove
+                    y = old - self.comp_remove
+                    t = y - self.mean
+                    self.comp_remove = t + self.mean - y
+                    self.mean = self.mean - t / self.nobs
+                    self.ssqdm = self.ssqdm - (old - prev_mean) * (old - self.mean)
+                    unstable = prev_m2 * self.UNSTABLE_TOL > self.ssqdm
+                else:
+                    self.mean = 0.0
+                    self.ssqdm = 0.0
+        unstable = self._add(val) or unstable
+        # Annulation catastrophique possible: recalcul sur la fenêtre, comme pandas
+        if unstable:
+            self.nobs = self.mean = self.ssqdm = self.comp_add = self.comp_remove = 0.0
+            for v in self.values:
+                self._add(v)
+        if self.nobs < self.window or self.nobs <= 1:
+            return np.nan
+        return self.ssqdm / (self.nobs - 1.0)
+
+    def _add(self, val):
+        if val != val:
+            return False
+        prev_m2 = self.ssqdm
+        self.nobs += 1
+        prev_mean = self.mean - self.comp_add
+        y = val - self.comp_add
+        t = y - self.mean
+        self.comp_add = t + self.mean - y
+        self.mean = self.mean + t / self.nobs
+        self.ssqdm = self.ssqdm + (val - prev_mean) * (val - self.mean)
+        return prev_m2 * self.UNSTABLE_TOL > self.ssqdm
+
+# Min/max glissant incrémental (deque monotone, O(1) amorti)
+class _RollingExtreme:
+    def __init__(self, window, is_max):
+        self.window = window
+        self.is_max = is_max
+        self.candidates = deque()
+        self.count = 0
+
+    def push(self, val):
+        index = self.count
+        self.count += 1
+        while self.candidates and (self.candidates[-1][1] <= val if self.is_max else self.candidates[-1][1] >= val):
+            self.candidates.pop()
+        self.candidates.append((index, val))
+        if self.candidates[0][0] <= index - self.window:
+            self.candidates.popleft()
+        return self.candidates[0][1] if self.count >= self.window else np.nan
+
+# EWM incrémentale (adjust=False, même récurrence que pandas ewm().mean())
+class _Ewm:
+    def __init__(self, span):
+        self.com = (span - 1) / 2
+        self.alpha = 1. / (1. + self.com)
+        self.value = np.nan
+        self.old_wt = 1.
+
+    def push(self, val):
+        if self.value != self.value:
+            self.value = val
+            return self.value
+        self.old_wt *= 1. - self.alpha
+        if val == val:
+            if self.value != val:
+                new_wt = 1. - self.old_wt if self.com == 1 else self.alpha
+                self.value = (self.old_wt * self.value + new_wt * val) / (self.old_wt + new_wt)
+            self.old_wt = 1.
+        return self.value
+
+# Moteur d'indicateurs incrémental par paire/timeframe: O(1) par nouvelle bougie, mêmes valeurs (en float64)
+# que calculate_indicators sur la même séquence de bougies. Garde les STREAM_ROWS dernières lignes et, si
+# history est fixé, les seuls pivots des history dernières bougies (ceux que verrait le calcul complet)
+class StreamingIndicators:
+    def __init__(self, params=None, history=None):
+        self.params = p = strategy_params(params)
+        self.sma = _RollingMean(p['BB_PERIOD'])
+        self.var = _RollingVar(p['BB_PERIOD'])
+        self.gain = _RollingMean(p['RSI_PERIOD'])
+        self.loss = _RollingMean(p['RSI_PERIOD'])
+        self.ema_fast = _Ewm(p['EMA_FAST'])
+        self.ema_slow = _Ewm(p['EMA_SLOW'])
+        self.macd_signal = _Ewm(p['MACD_SIGNAL'])
+        self.atr = _RollingMean(p['ATR_PERIOD'])
+        self.fib_high = _RollingExtreme(50, True)
+        self.fib_low = _RollingExtreme(50, False)
+        self.stoch_high = _RollingExtreme(p['STOCH_PERIOD'], True)
+        self.stoch_low = _RollingExtreme(p['STOCH_PERIOD'], False)
+        self.stoch_d = _RollingMean(3)
+        self.volume_ema = _Ewm(20)
+        self.closes = deque(maxlen=p['MOMENTUM_PERIOD'] + 1)
+        self.recent_lows = deque(maxlen=4)
+        self.recent_highs = deque(maxlen=4)
+        self.supports = []
+        self.resistances = []
+        self.pivots = deque()
+        self.history = history
+        self.rows = deque(maxlen=STREAM_ROWS)
+        self.count = 0
+        self.last_timestamp = None
+        self.last_row = None
+        self._checkpoint = None
+        self._inserted = []
+        self._removed = []
+
+    # Ajoute une bougie, ou réécrit la dernière (bougie en cours) si elle a été ajoutée avec checkpoint=True
+    def update(self, timestamp, open_, high, low, close, volume, checkpoint=True):
+        if timestamp == self.last_timestamp:
+            if self._checkpoint is None:
+                raise ValueError(f"Bougie {timestamp} déjà appliquée sans point de reprise")
+            self._restore()
+        self._checkpoint = None
+        if checkpoint:
+            self._save()
+        self.count += 1
+        self.last_timestamp = timestamp
+        high, low, close, volume = np.float64(high), np.float64(low), np.float64(close), np.float64(volume)
+        prev_close = self.closes[-1] if self.closes else np.nan
+        self.closes.append(close)
+        row = {'timestamp': timestamp, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
 
-        # Volume EMA for breakout detection
-        df['volume_ema'] = df['volume'].ewm(span=20, adjust=False).mean()
+        row['sma'] = self.sma.push(close)
+        var = self.var.push(close)
+        row['std'] = 0.0 if var < 0 else np.sqrt(var)
+        row['upper_bb'] = row['sma'] + self.params['BB_STD'] * row['std']
+        row['lower_bb'] = row['sma'] - self.params['BB_STD'] * row['std']
 
-        return df
+        delta = close - prev_close
+        gain = self.gain.push(delta if delta > 0 else 0.0)
+        loss = self.loss.push(-(delta if delta < 0 else 0.0))
+        rs = gain / loss if loss != 0 else np.nan
+        row['rsi'] = 100 - (100 / (1 + rs))
+
+        row['ema_fast'] = self.ema_fast.push(close)
+        row['ema_slow'] = self.ema_slow.push(close)
+        row['macd'] = row['ema_fast'] - row['ema_slow']
+        row['macd_signal'] = self.macd_signal.push(row['macd'])
+
+        row['tr'] = np.maximum(high - low, np.maximum(abs(high - prev_close), abs(low - prev_close)))
+        row['atr'] = self.atr.push(row['tr'])
+
+        row['momentum'] = close - self.closes[0] if len(self.closes) > self.params['MOMENTUM_PERIOD'] else np.nan
+
+        fib_high = self.fib_high.push(high)
+        fib_low = self.fib_low.push(low)
+        diff = fib_high - fib_low
+        for ratio in [0.236, 0.382, 0.5, 0.618, 0.764]:
+            row[f'fib_{ratio}'] = fib_high - ratio * diff
+
+        # Pivot confirmé deux bougies plus tard (mêmes indices que detect_pivot_levels)
+        self.recent_lows.append(low)
+        self.recent_highs.append(high)
+        self._inserted = []
+        self._removed = []
+        if self.count >= 5:
+            before, pivot, after, _ = self.recent_lows
+            if pivot < before and pivot < after:
+                insort(self.supports, pivot)
+                self._inserted.append((self.supports, pivot))
+                self.pivots.append((self.count - 3, self.supports, pivot))
+            before, pivot, after, _ = self.recent_highs
+            if pivot > before and pivot > after:
+                insort(self.resistances, pivot)
+                self._inserted.append((self.resistances, pivot))
+                self.pivots.append((self.count - 3, self.resistances, pivot))
+        # Pivots sortis de la fenêtre: detect_pivot_levels ne garde que les indices >= 2 de la frame
+        while self.history is not None and self.pivots and self.pivots[0][0] < self.count - self.history + 2:
+            _, levels, value = self.pivots.popleft()
+            levels.pop(bisect_left(levels, value))
+            self._removed.append((levels, value))
+        row['support'], row['resistance'] = self.nearest_levels(close)
+
+        low_min = self.stoch_low.push(low)
+        high_max = self.stoch_high.push(high)
+        row['stoch_k'] = 100 * (close - low_min) / (high_max - low_min)
+        row['stoch_d'] = self.stoch_d.push(row['stoch_k'])
+
+        row['volume_ema'] = self.volume_ema.push(volume)
+        self.last_row = row
+        self.rows.append(row)
+        return row
+
+    def nearest_levels(self, price):
+        i = bisect_left(self.supports, price)
+        support = self.supports[i - 1] if i > 0 else np.nan
+        j = bisect_right(self.resistances, price)
+        resistance = self.resistances[j] if j < len(self.resistances) else np.nan
+        if not np.isnan(support) and not np.isnan(resistance) and abs(support - resistance) < price * 0.001:
+            support = np.nan if resistance < price else support
+            resistance = np.nan if support > price else resistance
+        return support, resistance
+
+    def levels(self):
+        return LevelIndex(self.supports, self.resistances)
+
+    # Sauvegarde de l'état avant la dernière bougie: copie superficielle des composants,
+    # fenêtres bornées par les périodes (les listes de niveaux sont annulées via _inserted)
+    def _save(self):
+        checkpoint = {}
+        for key, value in self.__dict__.items():
+            if key in ('supports', 'resistances', '_inserted', '_removed', '_checkpoint'):
+                continue
+            if isinstance(value, deque):
+                value = value.copy()
+            elif hasattr(value, 'push'):
+                value = copy.copy(value)
+                for attr, inner in vars(value).items():
+                    if isinstance(inner, deque):
+                        setattr(value, attr, inner.copy())
+            checkpoint[key] = value
+        self._checkpoint = checkpoint
+
+    def _restore(self):
+        for levels, value in self._inserted:
+            levels.pop(bisect_left(levels, value))
+        for levels, value in self._removed:
+            insort(levels, value)
+        self.__dict__.update(self._checkpoint)
+        self._inserted = []
+        self._removed = []
+
+# Paramètres de stratégie courants (globals optimisables), éventuellement surchargés
+def strategy_params(overrides=None):
+    params = {'BB_PERIOD': BB_PERIOD, 'BB_STD': BB_STD, 'RSI_PERIOD': RSI_PERIOD, 'EMA_FAST': EMA_FAST, 'EMA_SLOW': EMA_SLOW,
+              'MACD_SIGNAL': MACD_SIGNAL, 'ATR_PERIOD': ATR_PERIOD, 'MOMENTUM_PERIOD': MOMENTUM_PERIOD, 'STOCH_PERIOD': STOCH_PERIOD,
+              'MIN_ATR_MULTIPLIER': MIN_ATR_MULTIPLIER}
+    if overrides:
+        params.update(overrides)
+    return params
+
+DEFAULT_PARAMS = strategy_params()
+
+# Applique des paramètres optimisés aux globals de stratégie (hérités par les workers du Pool)
+def apply_params(params):
+    unknown = set(params) - set(strategy_params())
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {sorted(unknown)}")
+    globals().update(params)
+
+# États incrémentaux par (pair, timeframe), gardés en mémoire pour le process
+_indicator_streams = {}
+# Indicateurs servis par les états incrémentaux plutôt que recalculés (démon: activé par serve)
+WARM_INDICATORS = False
+
+# Applique à l'état de (pair, timeframe) les bougies de df postérieures à la dernière vue; renvoie la dernière ligne.
+# État reconstruit si les paramètres changent ou si df ne prolonge plus l'état (bougies manquantes ou antérieures)
+def stream_indicators(pair, timeframe, df, params=None):
+    timestamps = df['timestamp'].to_numpy()
+    stream = _indicator_streams.get((pair, timeframe))
+    if stream is not None and (stream.params != strategy_params(params) or timestamps[-1] < stream.last_timestamp
+                               or timestamps[0] > stream.last_timestamp):
+        stream = None
+    if stream is None:
+        stream = StreamingIndicators(params)
+        _indicator_streams[(pair, timeframe)] = stream
+    stream.history = len(df)
+    start = np.searchsorted(timestamps, stream.last_timestamp) if stream.last_timestamp is not None else 0
+    candles = list(zip(*(df[col].to_numpy()[start:] for col in OHLCV_COLUMNS)))
+    # Seule la dernière bougie (potentiellement en cours) garde un point de reprise
+    for i, candle in enumerate(candles):
+        stream.update(*candle, checkpoint=i == len(candles) - 1)
+    return stream.last_row
+
+# Équivalent incrémental de calculate_indicators(df, params, tail): mêmes colonnes et dtypes, niveaux des
+# len(df) dernières bougies dans attrs (tail <= STREAM_ROWS)
+def stream_frame(pair, timeframe, df, tail=1, params=None):
+    p = strategy_params(params)
+    if df.empty or len(df) < max(p['BB_PERIOD'], p['RSI_PERIOD'], p['EMA_SLOW'], p['MOMENTUM_PERIOD'], p['STOCH_PERIOD']):
+        return None
+    try:
+        stream_indicators(pair, timeframe, df, params)
+        stream = _indicator_streams[(pair, timeframe)]
+        rows = list(stream.rows)[-tail:]
+        columns = {col: np.array([row[col] for row in rows]) for col in OHLCV_COLUMNS + INDICATOR_COLUMNS}
+        out = pd.DataFrame({**{col: columns[col].astype(df[col].dtype) for col in OHLCV_COLUMNS}, **compact_indicators(columns)},
+                           index=df.index[-len(rows):])
+        support, resistance = stream.nearest_levels(stream.last_row['close'])
+        out.attrs.update(levels=stream.levels(), support=support, resistance=resistance)
+        return out
     except Exception as e:
-        logger.error(f"Erreur dans calculate_indicators: {e}")
+        logger.error(f"Erreur dans stream_frame pour {pair} {timeframe}: {e}")
         return None
 
+# Frames d'indicateurs d'une paire aux fins de tails (None si données insuffisantes): états incrémentaux
+# chauds en mode démon, calcul complet sinon
+def indicator_frames(pair, dfs, tails=RECORD_TAILS, params=None):
+    frames = {}
+    for tf in TIMEFRAMES:
+        if WARM_INDICATORS:
+            with timed('stream_indicators', pair):
+                frames[tf] = stream_frame(pair, tf, dfs[tf], tails[tf], params)
+        else:
+            with timed('calculate_indicators', pair):
+                frames[tf] = calculate_indicators(dfs[tf], params, tail=tails[tf])
+        if frames[tf] is None:
+            return None
+    return frames
+
 # Get sentiment using Fear and Greed Index
 def get_sentiment(pair):
-    try:
-        response = requests.get('https://api.alternative.me/fng/')
-        response.raise_for_status()
-        data = response.json()
-        value = int(data['data'][0]['value'])
-        return (value - 50) / 50.0  # -1 to 1, general for crypto market
-    except Exception as e:
-        logger.error(f"Erreur dans get_sentiment: {e}")
+    # Indice Fear & Greed global au marché: une seule entrée de cache pour toutes les paires
+    with timed('sentiment'):
+        value = cached_signal('fng', SIGNAL_TTLS['fng'], lambda: int(_http_json('https://api.alternative.me/fng/')['data'][0]['value']))
+    if value is None:
         return 0
+    return (value - 50) / 50.0  # -1 to 1, general for crypto market
 
 # Get news impact using CoinGecko sentiment votes
 def get_news_impact(pair):
     base = pair.split('/')[0]
     if base in symbol_to_id:
         id = symbol_to_id[base]
-        try:
-            response = requests.get(f'https://api.coingecko.com/api/v3/coins/{id}')
-            response.raise_for_status()
-            data = response.json()
-            sentiment_up = data.get('sentiment_votes_up_percentage', 50)
+        with timed('news', pair):
+            sentiment_up = cached_signal(
+                f'coingecko_{id}', SIGNAL_TTLS['coingecko'],
+                lambda: _http_json(f'https://api.coingecko.com/api/v3/coins/{id}').get('sentiment_votes_up_percentage', 50)
+            )
+        if sentiment_up is not None:
             return (sentiment_up - 50) / 50.0 * 10  # Scaled to +10/-10
-        except Exception as e:
-            logger.error(f"Erreur dans get_news_impact for {pair}: {e}")
     return 0
 
-# Calcul du score (amélioré avec ML, sentiment, news, stochastic, volume)
-def calculate_score(last_row, signal_type, higher_timeframes=None, ml_prediction=None, sentiment=0, news_impact=0):
+# Prefetch des signaux externes de paires en tâche de fond, pendant le fetch OHLCV (candidats de la
+# présélection pour un scan): une requête Fear & Greed et une par coin CoinGecko (paires de même base partagées)
+def prefetch_signals(pairs_list):
+    executor = ThreadPoolExecutor(max_workers=SIGNAL_MAX_IN_FLIGHT)
+    sentiment = executor.submit(get_sentiment, pairs_list[0]) if pairs_list else None
+    news = {}
+    for pair in pairs_list:
+        base = pair.split('/')[0]
+        if base not in news:
+            news[base] = executor.submit(get_news_impact, pair)
+    executor.shutdown(wait=False)
+    return {pair: (sentiment, news[pair.split('/')[0]]) for pair in pairs_list}
+
+# Attend la fin du prefetch: {pair: (sentiment, news_impact)}
+def collect_signals(futures):
+    return {pair: (sentiment.result(), news.result()) for pair, (sentiment, news) in futures.items()}
+
+def _http_json(url):
+    count('http_calls')
+    if REPLAY_ACTIVE:
+        import crypto_replay
+        response = crypto_replay.http_get(url, timeout=SIGNAL_TIMEOUT)
+    else:
+        response = requests.get(url, timeout=SIGNAL_TIMEOUT)
+    count('bytes_received', len(response.content))
+    response.raise_for_status()
+    return response.json()
+
+# Cache disque des signaux externes partagé entre process (workers du Pool compris):
+# TTL par source, valeur périmée servie pendant la revalidation, cache négatif après échec
+def _signal_cache_path(key):
+    return os.path.join(SIGNAL_CACHE_DIR, f'{key}.json')
+
+def _read_signal(key):
+    try:
+        with open(_signal_cache_path(key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_signal(key, entry):
+    path = _signal_cache_path(key)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        os.makedirs(SIGNAL_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError) as e:
+        logger.error(f"Erreur d'écriture du cache de signal {key}: {e}")
+
+# Verrou inter-process par clé (fichier exclusif): une seule requête en vol par signal
+def _acquire_signal_lock(key):
+    path = _signal_cache_path(key) + '.lock'
+    try:
+        os.makedirs(SIGNAL_CACHE_DIR, exist_ok=True)
+        # Verrou abandonné par un process interrompu
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) > 2 * SIGNAL_TIMEOUT:
+            os.remove(path)
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except OSError:
+        return False
+
+def _release_signal_lock(key):
+    try:
+        os.remove(_signal_cache_path(key) + '.lock')
+    except OSError:
+        pass
+
+def _refresh_signal(key, fetch, entry):
+    try:
+        try:
+            value = fetch()
+        except Exception as e:
+            logger.error(f"Erreur du signal externe {key}: {e}")
+            entry = dict(entry or {}, failed_at=time.time())
+            _write_signal(key, entry)
+            return entry
+        entry = {'value': value, 'fetched_at': time.time()}
+        _write_signal(key, entry)
+        return entry
+    finally:
+        _release_signal_lock(key)
+
+def cached_signal(key, ttl, fetch):
+    entry = _read_signal(key)
+    now = time.time()
+    age = now - entry['fetched_at'] if entry and 'value' in entry else None
+    if age is not None and age < ttl:
+        return entry['value']
+    if entry and now - entry.get('failed_at', 0) < SIGNAL_NEGATIVE_TTL:
+        return entry['value'] if age is not None and age < ttl + SIGNAL_STALE_TTL else None
+    if age is not None and age < ttl + SIGNAL_STALE_TTL:
+        if _acquire_signal_lock(key):
+            threading.Thread(target=_refresh_signal, args=(key, fetch, entry)).start()
+        return entry['value']
+
+    if _acquire_signal_lock(key):
+        entry = _refresh_signal(key, fetch, entry)
+    else:
+        # Un autre process interroge déjà la source: on attend son résultat
+        deadline = now + SIGNAL_TIMEOUT
+        while time.time() < deadline:
+            time.sleep(0.05)
+            fresh = _read_signal(key)
+            if fresh and max(fresh.get('fetched_at', 0), fresh.get('failed_at', 0)) >= now:
+                entry = fresh
+                break
+    if entry and 'value' in entry and now - entry['fetched_at'] < ttl + SIGNAL_STALE_TTL:
+        return entry['value']
+    return None
+
+FIB_LEVELS = ['fib_0.236', 'fib_0.382', 'fib_0.5', 'fib_0.618', 'fib_0.764']
+# Colonnes des lignes de score_rows: colonnes de la frame puis support/résistance les plus proches du prix
+SCORE_COLUMNS = ['close', 'rsi', 'sma', 'lower_bb', 'upper_bb', 'ema_fast', 'ema_slow', 'atr', 'macd', 'macd_signal',
+                 'momentum', 'stoch_k', 'stoch_d', 'volume', 'volume_ema'] + FIB_LEVELS + ['support', 'resistance']
+SCORE_SIDES = ['ACHAT', 'VENTE']
+
+# Dernière ligne d'une frame dans l'ordre de SCORE_COLUMNS (float64), niveaux lus dans l'index de la frame
+def score_values(df):
+    row = df.to_numpy(dtype=np.float64)[-1, df.columns.get_indexer(SCORE_COLUMNS[:-2])]
+    levels = frame_levels(df)
+    return np.append(row, [levels.nearest_support(row[0]), levels.nearest_resistance(row[0])])
+
+# Scores ACHAT/VENTE vectorisés sur un ensemble de lignes (toutes paires et timeframes confondus).
+# values: tableau (lignes, SCORE_COLUMNS), voir score_values.
+# higher_timeframes: tableaux de même forme alignés par position sur values, lignes NaN = pas de confirmation.
+# ml_prediction, sentiment, news_impact: scalaires ou tableaux alignés sur values (NaN = pas de prédiction ML).
+# Renvoie un tableau (lignes, SCORE_SIDES)
+def score_rows(values, higher_timeframes=None, ml_prediction=None, sentiment=0, news_impact=0):
+    v = dict(zip(SCORE_COLUMNS, np.asarray(values, dtype=np.float64).T))
+    price = v['close']
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fib = np.column_stack([np.abs(price - v[level]) / price for level in FIB_LEVELS])
+        fib_proximity = np.where(np.isnan(fib), np.inf, fib).min(axis=1)
+        common = np.select([fib_proximity < 0.02, fib_proximity < 0.05], [15, 8], 0)
+        common += np.select([v['atr'] > price * 0.01, v['atr'] > price * 0.005], [15, 8], 0)
+        common += np.where(v['volume'] > v['volume_ema'] * 1.5, 5, 0)  # Volume breakout
+
+        bb_ok = ~np.isnan(v['lower_bb']) & ~np.isnan(v['upper_bb'])
+        ema_ok = ~np.isnan(v['ema_fast']) & ~np.isnan(v['ema_slow'])
+        macd_ok = ~np.isnan(v['macd']) & ~np.isnan(v['macd_signal'])
+        stoch_ok = ~np.isnan(v['stoch_k']) & ~np.isnan(v['stoch_d'])
+
+        confirm_buy = np.zeros(len(price), dtype=int)
+        confirm_sell = np.zeros(len(price), dtype=int)
+        for tf_values in (() if higher_timeframes is None else higher_timeframes):
+            h = dict(zip(SCORE_COLUMNS, np.asarray(tf_values, dtype=np.float64).T))
+            confirm_buy += (h['rsi'] < 35) & (h['ema_fast'] > h['ema_slow']) & (h['macd'] > h['macd_signal'])
+            confirm_sell += (h['rsi'] > 65) & (h['ema_fast'] < h['ema_slow']) & (h['macd'] < h['macd_signal'])
+
+        buy = common + np.select([v['rsi'] < 30, v['rsi'] < 35], [15, 8], 0)
+        buy += np.where(bb_ok, np.select([price <= v['lower_bb'], price <= v['sma']], [15, 8], 0), 0)
+        buy += np.where(ema_ok, np.select([v['ema_fast'] > v['ema_slow'], v['ema_fast'] >= v['ema_slow'] * 0.995], [15, 8], 0), 0)
+        buy += np.where(np.abs(price - v['support']) / price < 0.01, 15, 0)
+        buy += np.where(macd_ok, np.select([v['macd'] > v['macd_signal'], v['macd'] > 0], [10, 5], 0), 0)
+        buy += np.where(v['momentum'] > 0, 5, 0)
+        buy += np.where(confirm_buy >= 2, 10, 0)
+        buy += np.where(stoch_ok & (v['stoch_k'] < 20) & (v['stoch_k'] > v['stoch_d']), 10, 0)
+
+        sell = common + np.select([v['rsi'] > 70, v['rsi'] > 65], [15, 8], 0)
+        sell += np.where(bb_ok, np.select([price >= v['upper_bb'], price >= v['sma']], [15, 8], 0), 0)
+        sell += np.where(ema_ok, np.select([v['ema_fast'] < v['ema_slow'], v['ema_fast'] <= v['ema_slow'] * 1.005], [15, 8], 0), 0)
+        sell += np.where(np.abs(price - v['resistance']) / price < 0.01, 15, 0)
+        sell += np.where(macd_ok, np.select([v['macd'] < v['macd_signal'], v['macd'] < 0], [10, 5], 0), 0)
+        sell += np.where(v['momentum'] < 0, 5, 0)
+        sell += np.where(confirm_sell >= 2, 10, 0)
+        sell += np.where(stoch_ok & (v['stoch_k'] > 80) & (v['stoch_k'] < v['stoch_d']), 10, 0)
+
+        buy = buy.astype(np.float64)
+        sell = sell.astype(np.float64)
+        # Bonus prédiction ML
+        if ml_prediction is not None:
+            pred_diff = (np.asarray(ml_prediction, dtype=np.float64) - price) / price
+            buy += np.where(pred_diff > 0.01, 20 * np.minimum(pred_diff / 0.05, 1), 0)
+            sell += np.where(pred_diff < -0.01, 20 * np.minimum(np.abs(pred_diff) / 0.05, 1), 0)
+
+    # Sentiment et news
+    buy = buy + np.asarray(sentiment, dtype=np.float64) * 10 + np.asarray(news_impact, dtype=np.float64)
+    sell = sell + np.asarray(sentiment, dtype=np.float64) * 10 + np.asarray(news_impact, dtype=np.float64)
+    return np.column_stack([np.clip(buy, 0, 100), np.clip(sell, 0, 100)])
+
+# Calcul du score d'une seule ligne (amélioré avec ML, sentiment, news, stochastic, volume).
+# Chemin scalaire, mêmes règles que score_rows (tests/test_scoring.py)
+def calculate_score(last_row, signal_type, higher_timeframes=None, ml_prediction=None, sentiment=0, news_impact=0, levels=None):
     if higher_timeframes is None:
         higher_timeframes = []
 
     score = 0
-    price = last_row['close']
+    row = last_row.to_dict()
+    price = row['close']
 
     try:
-        rsi = last_row['rsi']
+        # Niveaux: index de la frame si fourni, sinon métadonnées de la frame d'origine (ou champs de la ligne)
+        if levels is not None:
+            support, resistance = levels.nearest_support(price), levels.nearest_resistance(price)
+        else:
+            support = row.get('support', last_row.attrs.get('support', np.nan))
+            resistance = row.get('resistance', last_row.attrs.get('resistance', np.nan))
+
+        rsi = row['rsi']
         if not np.isnan(rsi):
             if signal_type == 'ACHAT':
                 if rsi < 30:
@@ -304,66 +1459,65 @@ def calculate_score(last_row, signal_type, higher_timeframes=None, ml_prediction
                 elif rsi > 65:
                     score += 8
 
-        if not np.isnan(last_row['lower_bb']) and not np.isnan(last_row['upper_bb']):
+        if not np.isnan(row['lower_bb']) and not np.isnan(row['upper_bb']):
             if signal_type == 'ACHAT':
-                if price <= last_row['lower_bb']:
+                if price <= row['lower_bb']:
                     score += 15
-                elif price <= last_row['sma']:
+                elif price <= row['sma']:
                     score += 8
             else:
-                if price >= last_row['upper_bb']:
+                if price >= row['upper_bb']:
                     score += 15
-                elif price >= last_row['sma']:
+                elif price >= row['sma']:
                     score += 8
 
-        if not np.isnan(last_row['ema_fast']) and not np.isnan(last_row['ema_slow']):
+        if not np.isnan(row['ema_fast']) and not np.isnan(row['ema_slow']):
             if signal_type == 'ACHAT':
-                if last_row['ema_fast'] > last_row['ema_slow']:
+                if row['ema_fast'] > row['ema_slow']:
                     score += 15
-                elif last_row['ema_fast'] >= last_row['ema_slow'] * 0.995:
+                elif row['ema_fast'] >= row['ema_slow'] * 0.995:
                     score += 8
             else:
-                if last_row['ema_fast'] < last_row['ema_slow']:
+                if row['ema_fast'] < row['ema_slow']:
                     score += 15
-                elif last_row['ema_fast'] <= last_row['ema_slow'] * 1.005:
+                elif row['ema_fast'] <= row['ema_slow'] * 1.005:
                     score += 8
 
-        fib_levels = ['fib_0.236', 'fib_0.382', 'fib_0.5', 'fib_0.618', 'fib_0.764']
-        fib_proximities = [abs(price - last_row[level]) / price for level in fib_levels if not np.isnan(last_row[level])]
+        fib_proximities = [abs(price - row[level]) / price for level in FIB_LEVELS if not np.isnan(row[level])]
         fib_proximity = min(fib_proximities, default=np.inf)
         if fib_proximity < 0.02:
             score += 15
         elif fib_proximity < 0.05:
             score += 8
 
-        atr = last_row['atr']
+        atr = row['atr']
         if not np.isnan(atr):
-            if atr > last_row['close'] * 0.01:
+            if atr > price * 0.01:
                 score += 15
-            elif atr > last_row['close'] * 0.005:
+            elif atr > price * 0.005:
                 score += 8
 
-        if signal_type == 'ACHAT' and not np.isnan(last_row['support']):
-            if abs(price - last_row['support']) / price < 0.01:
+        if signal_type == 'ACHAT' and not np.isnan(support):
+            if abs(price - support) / price < 0.01:
                 score += 15
-        elif signal_type == 'VENTE' and not np.isnan(last_row['resistance']):
-            if abs(price - last_row['resistance']) / price < 0.01:
+        elif signal_type == 'VENTE' and not np.isnan(resistance):
+            if abs(price - resistance) / price < 0.01:
                 score += 15
 
-        if not np.isnan(last_row['macd']) and not np.isnan(last_row['macd_signal']):
-            if signal_type == 'ACHAT' and last_row['macd'] > last_row['macd_signal']:
+        if not np.isnan(row['macd']) and not np.isnan(row['macd_signal']):
+            if signal_type == 'ACHAT' and row['macd'] > row['macd_signal']:
                 score += 10
-            elif signal_type == 'VENTE' and last_row['macd'] < last_row['macd_signal']:
+            elif signal_type == 'VENTE' and row['macd'] < row['macd_signal']:
                 score += 10
-            elif signal_type == 'ACHAT' and last_row['macd'] > 0:
+            elif signal_type == 'ACHAT' and row['macd'] > 0:
                 score += 5
-            elif signal_type == 'VENTE' and last_row['macd'] < 0:
+            elif signal_type == 'VENTE' and row['macd'] < 0:
                 score += 5
 
-        if not np.isnan(last_row['momentum']):
-            if signal_type == 'ACHAT' and last_row['momentum'] > 0:
+        if not np.isnan(row['momentum']):
+            if signal_type == 'ACHAT' and row['momentum'] > 0:
                 score += 5
-            elif signal_type == 'VENTE' and last_row['momentum'] < 0:
+            elif signal_type == 'VENTE' and row['momentum'] < 0:
                 score += 5
 
         confirmation_count = 0
@@ -376,13 +1530,13 @@ def calculate_score(last_row, signal_type, higher_timeframes=None, ml_prediction
             score += 10
 
         # Ajouts: Stochastic et Volume
-        if not np.isnan(last_row['stoch_k']) and not np.isnan(last_row['stoch_d']):
-            if signal_type == 'ACHAT' and last_row['stoch_k'] < 20 and last_row['stoch_k'] > last_row['stoch_d']:
+        if not np.isnan(row['stoch_k']) and not np.isnan(row['stoch_d']):
+            if signal_type == 'ACHAT' and row['stoch_k'] < 20 and row['stoch_k'] > row['stoch_d']:
                 score += 10
-            elif signal_type == 'VENTE' and last_row['stoch_k'] > 80 and last_row['stoch_k'] < last_row['stoch_d']:
+            elif signal_type == 'VENTE' and row['stoch_k'] > 80 and row['stoch_k'] < row['stoch_d']:
                 score += 10
 
-        if not np.isnan(last_row['volume_ema']) and last_row['volume'] > last_row['volume_ema'] * 1.5:
+        if not np.isnan(row['volume_ema']) and row['volume'] > row['volume_ema'] * 1.5:
             score += 5  # Volume breakout
 
         # ML prediction bonus
@@ -402,27 +1556,27 @@ def calculate_score(last_row, signal_type, higher_timeframes=None, ml_prediction
         logger.error(f"Erreur dans calculate_score: {e}")
         return 0
 
-# Générer des signaux (assouplis pour générer plus souvent)
-def generate_signals(df_1h, df_4h, df_1d, pair):
-    if df_1h is None or df_4h is None or df_1d is None:
-        return [], {'pair': pair, 'score': 0}
-    
-    signals = []
-    last_row_1h = df_1h.iloc[-1]
-    last_row_1d = df_1d.iloc[-1]
+# Scores des trois timeframes d'une paire en un seul appel de score_rows: {timeframe: {signal: score}},
+# confirmations 4h/1d sur la seule ligne 1h (0 partout en cas d'erreur, comme calculate_score)
+def score_timeframes(df_1h, df_4h, df_1d, ml_prediction=None, sentiment=0, news_impact=0):
+    values = np.array([score_values(df) for df in (df_1h, df_4h, df_1d)])
+    higher = np.full((2,) + values.shape, np.nan)
+    higher[:, 0] = values[1:]
+    try:
+        scores = score_rows(values, higher, ml_prediction, sentiment, news_impact)
+    except Exception as e:
+        logger.error(f"Erreur dans score_timeframes: {e}")
+        scores = np.zeros((len(TIMEFRAMES), len(SCORE_SIDES)))
+    return {tf: dict(zip(SCORE_SIDES, tf_scores)) for tf, tf_scores in zip(TIMEFRAMES, scores)}
+
+# Score pondéré 1h/4h/1d d'un type de signal
+def weighted_score(scores, signal_type):
+    return scores['1h'][signal_type] * 0.5 + scores['4h'][signal_type] * 0.3 + scores['1d'][signal_type] * 0.2
+
+# Conditions purement indicateurs de la dernière bougie 1h (niveaux 1d): strictes et moyennes de
+# generate_signals, forcées de force_trade. Sans ML ni signaux externes (présélection du scan)
+def signal_conditions(last_row_1h, support_1d, resistance_1d):
     price = last_row_1h['close']
-    
-    # ML prediction
-    model, scaler = train_lstm(df_1h)
-    ml_pred = None
-    if model and scaler:
-        last_seq = scaler.transform(df_1h['close'].tail(50).values.reshape(-1, 1))
-        if len(last_seq) == 50:
-            ml_pred = predict_price(model, scaler, last_seq)
-    
-    sentiment = get_sentiment(pair)
-    news_impact = get_news_impact(pair)
-    
     fib_levels_buy = ['fib_0.618', 'fib_0.5', 'fib_0.764']
     fib_levels_sell = ['fib_0.236', 'fib_0.382', 'fib_0.5']
     fib_proximity_buy = min([abs(price - last_row_1h[level]) / price for level in fib_levels_buy 
@@ -438,7 +1592,7 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
         (last_row_1h['macd'] > last_row_1h['macd_signal']) and
         (last_row_1h['momentum'] > 0) and
         (fib_proximity_buy < 0.03) and
-        (not np.isnan(last_row_1d['support']) and abs(price - last_row_1d['support']) / price < 0.02) and
+        (not np.isnan(support_1d) and abs(price - support_1d) / price < 0.02) and
         (last_row_1h['stoch_k'] < 30) and
         (last_row_1h['volume'] > last_row_1h['volume_ema'])
     )
@@ -449,7 +1603,7 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
         (last_row_1h['macd'] < last_row_1h['macd_signal']) and
         (last_row_1h['momentum'] < 0) and
         (fib_proximity_sell < 0.03) and
-        (not np.isnan(last_row_1d['resistance']) and abs(price - last_row_1d['resistance']) / price < 0.02) and
+        (not np.isnan(resistance_1d) and abs(price - resistance_1d) / price < 0.02) and
         (last_row_1h['stoch_k'] > 70) and
         (last_row_1h['volume'] > last_row_1h['volume_ema'])
     )
@@ -476,6 +1630,58 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
         (last_row_1h['volume'] > last_row_1h['volume_ema'] * 1.2)
     )
     
+    # Assouplir forced: RSI <45, fib <0.15, support <0.03
+    buy_forced = (
+        (price <= last_row_1h['sma'] * 1.05) and
+        (last_row_1h['rsi'] < 45) and
+        (last_row_1h['ema_fast'] >= last_row_1h['ema_slow'] * 0.99) and
+        (last_row_1h['macd'] >= 0) and
+        (last_row_1h['momentum'] > 0) and
+        (fib_proximity_buy < 0.15) and
+        (not np.isnan(support_1d) and abs(price - support_1d) / price < 0.03) and
+        (last_row_1h['atr'] > last_row_1h['close'] * 0.004) and
+        (last_row_1h['stoch_k'] < 40)
+    )
+    sell_forced = (
+        (price >= last_row_1h['sma'] * 0.95) and
+        (last_row_1h['rsi'] > 55) and
+        (last_row_1h['ema_fast'] <= last_row_1h['ema_slow'] * 1.01) and
+        (last_row_1h['macd'] <= 0) and
+        (last_row_1h['momentum'] < 0) and
+        (fib_proximity_sell < 0.15) and
+        (not np.isnan(resistance_1d) and abs(price - resistance_1d) / price < 0.03) and
+        (last_row_1h['atr'] > last_row_1h['close'] * 0.004) and
+        (last_row_1h['stoch_k'] > 60)
+    )
+    
+    return {
+        'buy_strict': buy_strict,
+        'sell_strict': sell_strict,
+        'buy_medium': buy_medium,
+        'sell_medium': sell_medium,
+        'buy_forced': buy_forced,
+        'sell_forced': sell_forced
+    }
+
+# Générer des signaux (assouplis pour générer plus souvent)
+def generate_signals(df_1h, df_4h, df_1d, pair, ml_prediction=None, external_signals=None):
+    if df_1h is None or df_4h is None or df_1d is None:
+        return [], {'pair': pair, 'score': 0}
+    
+    signals = []
+    last_row_1h = df_1h.iloc[-1]
+    price = last_row_1h['close']
+    levels_1d = frame_levels(df_1d)
+    support_1d = levels_1d.nearest_support(price)
+    resistance_1d = levels_1d.nearest_resistance(price)
+    
+    # ML prediction
+    ml_pred = ml_prediction if ml_prediction is not None else lstm_prediction(pair, df_1h)
+    
+    sentiment, news_impact = external_signals if external_signals is not None else (get_sentiment(pair), get_news_impact(pair))
+    
+    conditions = signal_conditions(last_row_1h, support_1d, resistance_1d)
+    
     atr = last_row_1h['atr'] if not np.isnan(last_row_1h['atr']) else last_row_1h['close'] * 0.005
     atr = max(atr, last_row_1h['close'] * 0.005) * MIN_ATR_MULTIPLIER
     target_buy = price * (1 + TARGET_MOVE) - price * (FEE_RATE + SLIPPAGE)
@@ -483,20 +1689,12 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
     stop_loss_buy = price - atr
     stop_loss_sell = price + atr
     
-    if not np.isnan(last_row_1d['support']) and abs(target_buy - last_row_1d['support']) / price < 0.005:
-        target_buy = last_row_1d['support'] * 0.98
-    if not np.isnan(last_row_1d['resistance']) and abs(target_sell - last_row_1d['resistance']) / price < 0.005:
-        target_sell = last_row_1d['resistance'] * 1.02
+    if not np.isnan(support_1d) and abs(target_buy - support_1d) / price < 0.005:
+        target_buy = support_1d * 0.98
+    if not np.isnan(resistance_1d) and abs(target_sell - resistance_1d) / price < 0.005:
+        target_sell = resistance_1d * 1.02
     
-    higher_timeframes = [
-        {'rsi': df_4h.iloc[-1]['rsi'], 'ema_fast': df_4h.iloc[-1]['ema_fast'], 
-         'ema_slow': df_4h.iloc[-1]['ema_slow'], 'macd': df_4h.iloc[-1]['macd'], 
-         'macd_signal': df_4h.iloc[-1]['macd_signal'], 'momentum': df_4h.iloc[-1]['momentum']} if len(df_4h) > 0 else None,
-        {'rsi': df_1d.iloc[-1]['rsi'], 'ema_fast': df_1d.iloc[-1]['ema_fast'], 
-         'ema_slow': df_1d.iloc[-1]['ema_slow'], 'macd': df_1d.iloc[-1]['macd'], 
-         'macd_signal': df_1d.iloc[-1]['macd_signal'], 'momentum': df_1d.iloc[-1]['momentum']} if len(df_1d) > 0 else None
-    ]
-    higher_timeframes = [tf for tf in higher_timeframes if tf is not None]
+    scores = score_timeframes(df_1h, df_4h, df_1d, ml_pred, sentiment, news_impact)
     
     signal_data = {
         'pair': pair,
@@ -505,8 +1703,8 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
         'stop_loss': None,
         'rsi': round(last_row_1h['rsi'], 2) if not np.isnan(last_row_1h['rsi']) else None,
         'atr': round(atr, 2) if not np.isnan(atr) else None,
-        'support': round(last_row_1d['support'], 2) if not np.isnan(last_row_1d['support']) else None,
-        'resistance': round(last_row_1d['resistance'], 2) if not np.isnan(last_row_1d['resistance']) else None,
+        'support': round(support_1d, 2) if not np.isnan(support_1d) else None,
+        'resistance': round(resistance_1d, 2) if not np.isnan(resistance_1d) else None,
         'momentum': round(last_row_1h['momentum'], 2) if not np.isnan(last_row_1h['momentum']) else None,
         'stoch_k': round(last_row_1h['stoch_k'], 2) if not np.isnan(last_row_1h['stoch_k']) else None,
         'confidence': None,
@@ -518,10 +1716,8 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
         'price_history': df_1h[['timestamp', 'close']].tail(50).to_dict(orient='records')
     }
     
-    if buy_strict:
-        score = calculate_score(last_row_1h, 'ACHAT', higher_timeframes, ml_pred, sentiment, news_impact) * 0.5 + \
-                (calculate_score(df_4h.iloc[-1], 'ACHAT', None, ml_pred, sentiment, news_impact) * 0.3 if len(df_4h) > 0 else 0) + \
-                (calculate_score(df_1d.iloc[-1], 'ACHAT', None, ml_pred, sentiment, news_impact) * 0.2 if len(df_1d) > 0 else 0)
+    if conditions['buy_strict']:
+        score = weighted_score(scores, 'ACHAT')
         signals.append({
             **signal_data,
             'signal': 'ACHAT',
@@ -531,10 +1727,8 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
             'reason': 'Conditions strictes (Bollinger bas, RSI < 35, EMA haussier, MACD haussier, Momentum positif, Fibonacci + support 1d, confirmé 4h/1d, avec ML, sentiment et news)',
             'score': round(score, 1)
         })
-    if sell_strict:
-        score = calculate_score(last_row_1h, 'VENTE', higher_timeframes, ml_pred, sentiment, news_impact) * 0.5 + \
-                (calculate_score(df_4h.iloc[-1], 'VENTE', None, ml_pred, sentiment, news_impact) * 0.3 if len(df_4h) > 0 else 0) + \
-                (calculate_score(df_1d.iloc[-1], 'VENTE', None, ml_pred, sentiment, news_impact) * 0.2 if len(df_1d) > 0 else 0)
+    if conditions['sell_strict']:
+        score = weighted_score(scores, 'VENTE')
         signals.append({
             **signal_data,
             'signal': 'VENTE',
@@ -544,10 +1738,8 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
             'reason': 'Conditions strictes (Bollinger haut, RSI > 65, EMA baissier, MACD baissier, Momentum négatif, Fibonacci + résistance 1d, confirmé 4h/1d, avec ML, sentiment et news)',
             'score': round(score, 1)
         })
-    if buy_medium:
-        score = calculate_score(last_row_1h, 'ACHAT', higher_timeframes, ml_pred, sentiment, news_impact) * 0.5 + \
-                (calculate_score(df_4h.iloc[-1], 'ACHAT', None, ml_pred, sentiment, news_impact) * 0.3 if len(df_4h) > 0 else 0) + \
-                (calculate_score(df_1d.iloc[-1], 'ACHAT', None, ml_pred, sentiment, news_impact) * 0.2 if len(df_1d) > 0 else 0)
+    if conditions['buy_medium']:
+        score = weighted_score(scores, 'ACHAT')
         signals.append({
             **signal_data,
             'signal': 'ACHAT',
@@ -557,10 +1749,8 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
             'reason': 'Conditions moyennes (prix sous SMA, RSI < 40, EMA neutre, MACD positif, Momentum positif, Fibonacci proche, partiellement confirmé 4h/1d, avec ML, sentiment et news)',
             'score': round(score, 1)
         })
-    if sell_medium:
-        score = calculate_score(last_row_1h, 'VENTE', higher_timeframes, ml_pred, sentiment, news_impact) * 0.5 + \
-                (calculate_score(df_4h.iloc[-1], 'VENTE', None, ml_pred, sentiment, news_impact) * 0.3 if len(df_4h) > 0 else 0) + \
-                (calculate_score(df_1d.iloc[-1], 'VENTE', None, ml_pred, sentiment, news_impact) * 0.2 if len(df_1d) > 0 else 0)
+    if conditions['sell_medium']:
+        score = weighted_score(scores, 'VENTE')
         signals.append({
             **signal_data,
             'signal': 'VENTE',
@@ -573,7 +1763,7 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
     
     # Ajout d'un niveau low si score >40 et pas de signal (basé sur EMA trend et momentum)
     if not signals:
-        score = calculate_score(last_row_1h, 'ACHAT' if last_row_1h['rsi'] < 50 else 'VENTE', higher_timeframes, ml_pred, sentiment, news_impact)
+        score = scores['1h']['ACHAT' if last_row_1h['rsi'] < 50 else 'VENTE']
         if score > 40:
             signal_type = 'ACHAT' if last_row_1h['rsi'] < 50 else 'VENTE'
             target = target_buy if signal_type == 'ACHAT' else target_sell
@@ -590,7 +1780,7 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
     
     return signals, {
         **signal_data,
-        'score': round(calculate_score(last_row_1h, 'ACHAT' if last_row_1h['rsi'] < 50 else 'VENTE', higher_timeframes, ml_pred, sentiment, news_impact), 1),
+        'score': round(scores['1h']['ACHAT' if last_row_1h['rsi'] < 50 else 'VENTE'], 1),
         'ema_trend': last_row_1h['ema_fast'] > last_row_1h['ema_slow'],
         'macd': round(last_row_1h['macd'], 2) if not np.isnan(last_row_1h['macd']) else None,
         'macd_signal': round(last_row_1h['macd_signal'], 2) if not np.isnan(last_row_1h['macd_signal']) else None,
@@ -598,45 +1788,34 @@ def generate_signals(df_1h, df_4h, df_1d, pair):
     }
 
 # Analyser un trade soumis
-def analyze_trade(pair, entry_price, signal_type, df_1h, df_4h, df_1d):
+def analyze_trade(pair, entry_price, signal_type, df_1h, df_4h, df_1d, ml_prediction=None):
     if df_1h is None or df_4h is None or df_1d is None:
         return {'type': 'error', 'message': 'Données insuffisantes pour l’analyse'}
     
     try:
         last_row_1h = df_1h.iloc[-1]
-        last_row_1d = df_1d.iloc[-1]
         current_price = last_row_1h['close']
+        levels_1d = frame_levels(df_1d)
+        support_1d = levels_1d.nearest_support(current_price)
+        resistance_1d = levels_1d.nearest_resistance(current_price)
         atr = last_row_1h['atr'] if not np.isnan(last_row_1h['atr']) else last_row_1h['close'] * 0.005
         atr = max(atr, last_row_1h['close'] * 0.005) * MIN_ATR_MULTIPLIER
         
         # ML prediction for analysis
-        model, scaler = train_lstm(df_1h)
-        ml_pred = None
-        if model and scaler:
-            last_seq = scaler.transform(df_1h['close'].tail(50).values.reshape(-1, 1))
-            if len(last_seq) == 50:
-                ml_pred = predict_price(model, scaler, last_seq)
+        ml_pred = ml_prediction if ml_prediction is not None else lstm_prediction(pair, df_1h)
         
         sentiment = get_sentiment(pair)
         news_impact = get_news_impact(pair)
         
-        higher_timeframes = [
-            {'rsi': df_4h.iloc[-1]['rsi'], 'ema_fast': df_4h.iloc[-1]['ema_fast'], 
-             'ema_slow': df_4h.iloc[-1]['ema_slow'], 'macd': df_4h.iloc[-1]['macd'], 
-             'macd_signal': df_4h.iloc[-1]['macd_signal'], 'momentum': df_4h.iloc[-1]['momentum']} if len(df_4h) > 0 else None,
-            {'rsi': df_1d.iloc[-1]['rsi'], 'ema_fast': df_1d.iloc[-1]['ema_fast'], 
-             'ema_slow': df_1d.iloc[-1]['ema_slow'], 'macd': df_1d.iloc[-1]['macd'], 
-             'macd_signal': df_1d.iloc[-1]['macd_signal'], 'momentum': df_1d.iloc[-1]['momentum']} if len(df_1d) > 0 else None
-        ]
-        higher_timeframes = [tf for tf in higher_timeframes if tf is not None]
+        scores = score_timeframes(df_1h, df_4h, df_1d, ml_pred, sentiment, news_impact)
         
-        score = calculate_score(last_row_1h, signal_type, higher_timeframes, ml_pred, sentiment, news_impact)
+        score = scores['1h'][signal_type]
         
         recommendation = 'Indécis'
         reason = []
         
         if signal_type == 'ACHAT':
-            if not np.isnan(last_row_1d['support']) and abs(current_price - last_row_1d['support']) / current_price < 0.01:
+            if not np.isnan(support_1d) and abs(current_price - support_1d) / current_price < 0.01:
                 score += 10
                 reason.append('Prix proche d’un support journalier solide')
             if last_row_1h['ema_fast'] > last_row_1h['ema_slow'] and last_row_1h['macd'] > last_row_1h['macd_signal']:
@@ -662,7 +1841,7 @@ def analyze_trade(pair, entry_price, signal_type, df_1h, df_4h, df_1d):
                 recommendation = 'Modifier'
                 reason.append('Conditions mitigées, envisager d’ajuster le stop-loss')
         else:  # VENTE
-            if not np.isnan(last_row_1d['resistance']) and abs(current_price - last_row_1d['resistance']) / current_price < 0.01:
+            if not np.isnan(resistance_1d) and abs(current_price - resistance_1d) / current_price < 0.01:
                 score += 10
                 reason.append('Prix proche d’une résistance journalière solide')
             if last_row_1h['ema_fast'] < last_row_1h['ema_slow'] and last_row_1h['macd'] < last_row_1h['macd_signal']:
@@ -695,8 +1874,8 @@ def analyze_trade(pair, entry_price, signal_type, df_1h, df_4h, df_1d):
                 'reason': '; '.join(reason),
                 'score': round(min(score, 100), 1),
                 'current_price': round(current_price, 2),
-                'support': round(last_row_1d['support'], 2) if not np.isnan(last_row_1d['support']) else None,
-                'resistance': round(last_row_1d['resistance'], 2) if not np.isnan(last_row_1d['resistance']) else None,
+                'support': round(support_1d, 2) if not np.isnan(support_1d) else None,
+                'resistance': round(resistance_1d, 2) if not np.isnan(resistance_1d) else None,
                 'rsi': round(last_row_1h['rsi'], 2) if not np.isnan(last_row_1h['rsi']) else None,
                 'atr': round(atr, 2) if not np.isnan(atr) else None,
                 'momentum': round(last_row_1h['momentum'], 2) if not np.isnan(last_row_1h['momentum']) else None,
@@ -710,8 +1889,15 @@ def analyze_trade(pair, entry_price, signal_type, df_1h, df_4h, df_1d):
         logger.error(f"Erreur lors de l’analyse du trade: {e}")
         return {'type': 'error', 'message': f'Erreur lors de l’analyse du trade: {str(e)}'}
 
-# Forcer un trade (assoupli: score >50 au lieu de >60)
-def force_trade(fallback_data):
+# Support et résistance 1d présents et suffisamment écartés autour du prix
+def _has_distinct_levels(levels, price, ref_price):
+    support = levels.nearest_support(price)
+    resistance = levels.nearest_resistance(price)
+    return not np.isnan(support) and not np.isnan(resistance) and abs(support - resistance) / ref_price > 0.005  # Assoupli >0.005
+
+# Forcer un trade (assoupli: score >50 au lieu de >60).
+# ml_predictions: prédictions déjà calculées par paire (scan), sinon prédiction LSTM sur la frame 1h
+def force_trade(fallback_data, ml_predictions=None):
     if not fallback_data:
         return None
     
@@ -721,8 +1907,7 @@ def force_trade(fallback_data):
     
     valid_fallbacks = [
         (f, df1, df2, df3) for f, df1, df2, df3 in valid_fallbacks
-        if f['score'] > 50 and not np.isnan(df3.iloc[-1]['support']) and not np.isnan(df3.iloc[-1]['resistance'])
-        and abs(df3.iloc[-1]['support'] - df3.iloc[-1]['resistance']) / f['price'] > 0.005  # Assoupli >0.005
+        if f['score'] > 50 and _has_distinct_levels(frame_levels(df3), df1.iloc[-1]['close'], f['price'])
     ]
     if not valid_fallbacks:
         return None
@@ -732,48 +1917,18 @@ def force_trade(fallback_data):
     df_1h, df_4h, df_1d = best_fallback[1], best_fallback[2], best_fallback[3]
     
     last_row_1h = df_1h.iloc[-1]
-    last_row_1d = df_1d.iloc[-1]
     price = last_row_1h['close']
+    levels_1d = frame_levels(df_1d)
+    support_1d = levels_1d.nearest_support(price)
+    resistance_1d = levels_1d.nearest_resistance(price)
     
     # ML prediction for force
-    model, scaler = train_lstm(df_1h)
-    ml_pred = None
-    if model and scaler:
-        last_seq = scaler.transform(df_1h['close'].tail(50).values.reshape(-1, 1))
-        if len(last_seq) == 50:
-            ml_pred = predict_price(model, scaler, last_seq)
+    ml_pred = ml_predictions[pair] if ml_predictions and pair in ml_predictions else lstm_prediction(pair, df_1h)
     
     sentiment = get_sentiment(pair)
     news_impact = get_news_impact(pair)
     
-    fib_proximity_buy = min([abs(price - last_row_1h[level]) / price for level in ['fib_0.618', 'fib_0.5', 'fib_0.764'] 
-                             if not np.isnan(last_row_1h[level])], default=np.inf)
-    fib_proximity_sell = min([abs(price - last_row_1h[level]) / price for level in ['fib_0.236', 'fib_0.382', 'fib_0.5'] 
-                              if not np.isnan(last_row_1h[level])], default=np.inf)
-    
-    # Assouplir forced: RSI <45, fib <0.15, support <0.03
-    buy_forced = (
-        (price <= last_row_1h['sma'] * 1.05) and
-        (last_row_1h['rsi'] < 45) and
-        (last_row_1h['ema_fast'] >= last_row_1h['ema_slow'] * 0.99) and
-        (last_row_1h['macd'] >= 0) and
-        (last_row_1h['momentum'] > 0) and
-        (fib_proximity_buy < 0.15) and
-        (not np.isnan(last_row_1d['support']) and abs(price - last_row_1d['support']) / price < 0.03) and
-        (last_row_1h['atr'] > last_row_1h['close'] * 0.004) and
-        (last_row_1h['stoch_k'] < 40)
-    )
-    sell_forced = (
-        (price >= last_row_1h['sma'] * 0.95) and
-        (last_row_1h['rsi'] > 55) and
-        (last_row_1h['ema_fast'] <= last_row_1h['ema_slow'] * 1.01) and
-        (last_row_1h['macd'] <= 0) and
-        (last_row_1h['momentum'] < 0) and
-        (fib_proximity_sell < 0.15) and
-        (not np.isnan(last_row_1d['resistance']) and abs(price - last_row_1d['resistance']) / price < 0.03) and
-        (last_row_1h['atr'] > last_row_1h['close'] * 0.004) and
-        (last_row_1h['stoch_k'] > 60)
-    )
+    conditions = signal_conditions(last_row_1h, support_1d, resistance_1d)
     
     atr = last_row_1h['atr'] if not np.isnan(last_row_1h['atr']) else last_row_1h['close'] * 0.005
     atr = max(atr, last_row_1h['close'] * 0.005) * MIN_ATR_MULTIPLIER
@@ -782,20 +1937,12 @@ def force_trade(fallback_data):
     stop_loss_buy = price - atr
     stop_loss_sell = price + atr
     
-    if not np.isnan(last_row_1d['support']) and abs(target_buy - last_row_1d['support']) / price < 0.005:
-        target_buy = last_row_1d['support'] * 0.98
-    if not np.isnan(last_row_1d['resistance']) and abs(target_sell - last_row_1d['resistance']) / price < 0.005:
-        target_sell = last_row_1d['resistance'] * 1.02
+    if not np.isnan(support_1d) and abs(target_buy - support_1d) / price < 0.005:
+        target_buy = support_1d * 0.98
+    if not np.isnan(resistance_1d) and abs(target_sell - resistance_1d) / price < 0.005:
+        target_sell = resistance_1d * 1.02
     
-    higher_timeframes = [
-        {'rsi': df_4h.iloc[-1]['rsi'], 'ema_fast': df_4h.iloc[-1]['ema_fast'], 
-         'ema_slow': df_4h.iloc[-1]['ema_slow'], 'macd': df_4h.iloc[-1]['macd'], 
-         'macd_signal': df_4h.iloc[-1]['macd_signal'], 'momentum': df_4h.iloc[-1]['momentum']} if len(df_4h) > 0 else None,
-        {'rsi': df_1d.iloc[-1]['rsi'], 'ema_fast': df_1d.iloc[-1]['ema_fast'], 
-         'ema_slow': df_1d.iloc[-1]['ema_slow'], 'macd': df_1d.iloc[-1]['macd'], 
-         'macd_signal': df_1d.iloc[-1]['macd_signal'], 'momentum': df_1d.iloc[-1]['momentum']} if len(df_1d) > 0 else None
-    ]
-    higher_timeframes = [tf for tf in higher_timeframes if tf is not None]
+    scores = score_timeframes(df_1h, df_4h, df_1d, ml_pred, sentiment, news_impact)
     
     signal_data = {
         'pair': pair,
@@ -804,8 +1951,8 @@ def force_trade(fallback_data):
         'stop_loss': None,
         'rsi': round(last_row_1h['rsi'], 2) if not np.isnan(last_row_1h['rsi']) else None,
         'atr': round(atr, 2) if not np.isnan(atr) else None,
-        'support': round(last_row_1d['support'], 2) if not np.isnan(last_row_1d['support']) else None,
-        'resistance': round(last_row_1d['resistance'], 2) if not np.isnan(last_row_1d['resistance']) else None,
+        'support': round(support_1d, 2) if not np.isnan(support_1d) else None,
+        'resistance': round(resistance_1d, 2) if not np.isnan(resistance_1d) else None,
         'momentum': round(last_row_1h['momentum'], 2) if not np.isnan(last_row_1h['momentum']) else None,
         'stoch_k': round(last_row_1h['stoch_k'], 2) if not np.isnan(last_row_1h['stoch_k']) else None,
         'confidence': 'Faible',
@@ -817,10 +1964,8 @@ def force_trade(fallback_data):
         'price_history': df_1h[['timestamp', 'close']].tail(50).to_dict(orient='records')
     }
     
-    if buy_forced:
-        score = calculate_score(last_row_1h, 'ACHAT', higher_timeframes, ml_pred, sentiment, news_impact) * 0.5 + \
-                (calculate_score(df_4h.iloc[-1], 'ACHAT', None, ml_pred, sentiment, news_impact) * 0.3 if len(df_4h) > 0 else 0) + \
-                (calculate_score(df_1d.iloc[-1], 'ACHAT', None, ml_pred, sentiment, news_impact) * 0.2 if len(df_1d) > 0 else 0)
+    if conditions['buy_forced']:
+        score = weighted_score(scores, 'ACHAT')
         signal_data.update({
             'signal': 'ACHAT',
             'target': round(target_buy, 2),
@@ -829,10 +1974,8 @@ def force_trade(fallback_data):
             'score': round(score, 1)
         })
         return signal_data
-    elif sell_forced:
-        score = calculate_score(last_row_1h, 'VENTE', higher_timeframes, ml_pred, sentiment, news_impact) * 0.5 + \
-                (calculate_score(df_4h.iloc[-1], 'VENTE', None, ml_pred, sentiment, news_impact) * 0.3 if len(df_4h) > 0 else 0) + \
-                (calculate_score(df_1d.iloc[-1], 'VENTE', None, ml_pred, sentiment, news_impact) * 0.2 if len(df_1d) > 0 else 0)
+    elif conditions['sell_forced']:
+        score = weighted_score(scores, 'VENTE')
         signal_data.update({
             'signal': 'VENTE',
             'target': round(target_sell, 2),
@@ -844,67 +1987,257 @@ def force_trade(fallback_data):
     
     return None
 
-# Backtest simple (data-driven validation)
-def backtest_strategy(pair, capital=10000):
-    ohlcv = fetch_ohlcv(pair, '1d', 365)
+# Backtest (data-driven validation): OHLCV journalier récupéré puis simulé par backtest_frame
+def backtest_strategy(pair, capital=10000, ohlcv=None, params=None):
+    if ohlcv is None:
+        ohlcv = fetch_ohlcv(pair, '1d', BACKTEST_LIMIT)
     if not ohlcv:
-        return {'final_capital': capital, 'win_rate': 0, 'num_trades': 0, 'sharpe_ratio': 0}
-    
-    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    df = calculate_indicators(df)
-    if df is None:
-        return {'final_capital': capital, 'win_rate': 0, 'num_trades': 0, 'sharpe_ratio': 0}
+        return _empty_backtest(capital)
     
+    with timed('backtest_strategy', pair):
+        df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+        df = calculate_indicators(df, params)
+        if df is None:
+            return _empty_backtest(capital)
+        return backtest_frame(df, capital, params)
+
+def _empty_backtest(capital):
+    return {'final_capital': capital, 'win_rate': 0, 'num_trades': 0, 'sharpe_ratio': 0, 'max_drawdown': 0, 'exposure': 0}
+
+# Backtest vectorisé sur une frame d'indicateurs (tout timeframe): entrées par masques NumPy, ACHAT (long)
+# ou VENTE (short) comme les signaux live, sorties au premier TP/SL touché sur le chemin high/low ou au
+# signal opposé
+def backtest_frame(df, capital=10000, params=None):
+    p = strategy_params(params)
+    start = max(p['RSI_PERIOD'], p['EMA_SLOW'], p['STOCH_PERIOD'])
+    n = len(df)
+    if n <= start:
+        return _empty_backtest(capital)
+
+    open_, high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ['open', 'high', 'low', 'close'])
+    rsi, macd, macd_signal, stoch_k, volume, volume_ema, atr = (
+        df[col].to_numpy(dtype=np.float64) for col in ['rsi', 'macd', 'macd_signal', 'stoch_k', 'volume', 'volume_ema', 'atr']
+    )
+    with np.errstate(invalid='ignore'):
+        buy = (rsi < 35) & (macd > macd_signal) & (stoch_k < 30) & (volume > volume_ema)
+        sell = (rsi > 65) & (macd < macd_signal) & (stoch_k > 70) & (volume > volume_ema)
+    buy[:start] = False
+    sell[:start] = False
+    # Mêmes niveaux que les signaux live: objectif TARGET_MOVE net de frais, stop à ATR * MIN_ATR_MULTIPLIER
+    costs = close * (FEE_RATE + SLIPPAGE)
+    stop_distance = np.maximum(np.where(np.isnan(atr), close * 0.005, atr), close * 0.005) * p['MIN_ATR_MULTIPLIER']
+    levels = {
+        1: (close * (1 + TARGET_MOVE) - costs, close - stop_distance, sell),  # ACHAT: objectif, stop, signal de sortie
+        -1: (close * (1 - TARGET_MOVE) + costs, close + stop_distance, buy)   # VENTE
+    }
+
+    equity = np.full(n, float(capital))
+    in_position = np.zeros(n, dtype=bool)
     trades = []
-    position = 0
-    entry_price = 0
-    
-    for i in range(max(RSI_PERIOD, EMA_SLOW, STOCH_PERIOD), len(df)):
-        last_row = df.iloc[i]
-        buy_condition = last_row['rsi'] < 35 and last_row['macd'] > last_row['macd_signal'] and last_row['stoch_k'] < 30 and last_row['volume'] > last_row['volume_ema']
-        sell_condition = last_row['rsi'] > 65 and last_row['macd'] < last_row['macd_signal'] and last_row['stoch_k'] > 70 and last_row['volume'] > last_row['volume_ema']
-        
-        if buy_condition and position == 0:
-            position = capital / last_row['close']
-            entry_price = last_row['close']
-        elif sell_condition and position > 0:
-            exit_price = last_row['close']
-            profit = position * (exit_price - entry_price) - capital * FEE_RATE * 2
-            trades.append(profit)
-            capital += profit
-            position = 0
-    
+    i = start
+    while i < n:
+        entries = np.flatnonzero(buy[i:] | sell[i:])
+        if len(entries) == 0:
+            break
+        i += entries[0]
+        side = 1 if buy[i] else -1
+        take_profit, stop_loss, opposite = levels[side]
+        entry_price = close[i] * (1 + side * SLIPPAGE)
+        position = capital / entry_price
+        if side == 1:
+            hit_sl = low[i + 1:] <= stop_loss[i]
+            hit_tp = high[i + 1:] >= take_profit[i]
+        else:
+            hit_sl = high[i + 1:] >= stop_loss[i]
+            hit_tp = low[i + 1:] <= take_profit[i]
+        exits = np.flatnonzero(hit_sl | hit_tp | opposite[i + 1:])
+        if len(exits) == 0:
+            # Position encore ouverte en fin de période: valorisée au marché, non comptée comme trade
+            equity[i:] = capital + side * position * (close[i:] - entry_price)
+            in_position[i:] = True
+            break
+        k = exits[0]
+        j = i + 1 + k
+        # Stop prioritaire si TP et SL sont touchés sur la même bougie; gap d'ouverture exécuté à l'open
+        if hit_sl[k]:
+            exit_price = (min(stop_loss[i], open_[j]) if side == 1 else max(stop_loss[i], open_[j])) * (1 - side * SLIPPAGE)
+        elif hit_tp[k]:
+            exit_price = max(take_profit[i], open_[j]) if side == 1 else min(take_profit[i], open_[j])
+        else:
+            exit_price = close[j] * (1 - side * SLIPPAGE)
+        equity[i:j] = capital + side * position * (close[i:j] - entry_price)
+        in_position[i:j] = True
+        profit = side * position * (exit_price - entry_price) - capital * FEE_RATE * 2
+        trades.append(profit)
+        capital += profit
+        equity[j:] = capital
+        i = j + 1
+
+    peak = np.maximum.accumulate(equity)
+    max_drawdown = float(np.max((peak - equity) / peak))
+    exposure = float(in_position[start:].mean())
     num_trades = len(trades)
     if num_trades == 0:
-        return {'final_capital': capital, 'win_rate': 0, 'num_trades': 0, 'sharpe_ratio': 0}
-    
-    win_rate = sum(1 for t in trades if t > 0) / num_trades
-    returns = pd.Series(trades)
-    sharpe_ratio = returns.mean() / returns.std() * np.sqrt(252) if returns.std() != 0 else 0
+        return {**_empty_backtest(capital), 'max_drawdown': round(max_drawdown, 4), 'exposure': round(exposure, 2)}
+
+    trades = np.array(trades)
+    win_rate = np.count_nonzero(trades > 0) / num_trades
+    std = trades.std(ddof=1) if num_trades > 1 else 0
+    sharpe_ratio = trades.mean() / std * np.sqrt(252) if std != 0 else 0
     
-    return {'final_capital': round(capital, 2), 'win_rate': round(win_rate, 2), 'num_trades': num_trades, 'sharpe_ratio': round(sharpe_ratio, 2)}
+    return {'final_capital': round(capital, 2), 'win_rate': round(win_rate, 2), 'num_trades': num_trades, 'sharpe_ratio': round(sharpe_ratio, 2),
+            'max_drawdown': round(max_drawdown, 4), 'exposure': round(exposure, 2)}
+
+# Grilles d'optimisation: la grille par défaut reprend la recherche historique, la grille étendue couvre EMA/ATR/stochastique
+OPTIMIZE_GRID = {'BB_STD': [1.5, 2.0, 2.5], 'RSI_PERIOD': [10, 14, 20]}
+OPTIMIZE_GRID_EXTENDED = {
+    'BB_STD': [1.5, 2.0, 2.5],
+    'RSI_PERIOD': [10, 14, 20],
+    'EMA_FAST': [8, 12],
+    'EMA_SLOW': [21, 26, 34],
+    'STOCH_PERIOD': [9, 14],
+    'MIN_ATR_MULTIPLIER': [1.5, 2.0, 3.0]
+}
+
+# Frame OHLCV partagée par les workers de l'optimisation (transmise une seule fois par worker)
+_optimize_df = None
+
+def _init_optimize_worker(df):
+    global _optimize_df
+    _optimize_df = df
+
+def _evaluate_params(params):
+    df = calculate_indicators(_optimize_df, params)
+    if df is None:
+        return _empty_backtest(10000)
+    return backtest_frame(df, params=params)
+
+# Optimisation par grid search: données récupérées une fois, points de grille répartis sur un pool de processus
+def optimize_params(pair, grid=None, ohlcv=None, processes=None):
+    grid = grid or OPTIMIZE_GRID
+    best_params = {name: strategy_params()[name] for name in grid}
+    if ohlcv is None:
+        ohlcv = fetch_ohlcv(pair, '1d', BACKTEST_LIMIT)
+    if not ohlcv:
+        return best_params
+
+    names = list(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    candidates = [c for c in candidates if strategy_params(c)['EMA_FAST'] < strategy_params(c)['EMA_SLOW']]
+    df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+    processes = min(processes or os.cpu_count(), len(candidates))
+    if processes > 1:
+        with Pool(processes=processes, initializer=_init_optimize_worker, initargs=(df,)) as pool:
+            results = pool.map(_evaluate_params, candidates)
+    else:
+        _init_optimize_worker(df)
+        results = [_evaluate_params(c) for c in candidates]
 
-# Optimisation basique (grid search for params)
-def optimize_params(pair):
-    global BB_STD, RSI_PERIOD
-    current_bb_std = BB_STD
-    current_rsi_period = RSI_PERIOD
     best_sharpe = -np.inf
-    best_params = {'BB_STD': current_bb_std, 'RSI_PERIOD': current_rsi_period}
-    for bb_std in [1.5, 2.0, 2.5]:
-        for rsi_period in [10, 14, 20]:
-            BB_STD = bb_std
-            RSI_PERIOD = rsi_period
-            backtest = backtest_strategy(pair)
-            if backtest['sharpe_ratio'] > best_sharpe:
-                best_sharpe = backtest['sharpe_ratio']
-                best_params = {'BB_STD': bb_std, 'RSI_PERIOD': rsi_period}
-    BB_STD = current_bb_std
-    RSI_PERIOD = current_rsi_period
+    for params, backtest in zip(candidates, results):
+        if backtest['sharpe_ratio'] > best_sharpe:
+            best_sharpe = backtest['sharpe_ratio']
+            best_params = params
     return best_params
 
+# Paramètres optimisés persistés: {pair: {params, optimized_at, window}}, rafraîchis par la commande optimize
+def load_stored_params():
+    try:
+        with open(PARAMS_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Paramètres optimisés illisibles: {e}")
+        return {}
+
+# Paramètres complets d'une paire: les siens, sinon ceux de la paire de référence, sinon les valeurs par défaut
+def load_params(pair=None, stored=None):
+    stored = load_stored_params() if stored is None else stored
+    record = stored.get(pair) or stored.get(PARAMS_REFERENCE_PAIR)
+    return {**DEFAULT_PARAMS, **(record['params'] if record else {})}
+
+# Optimise une paire sur une année de bougies journalières et enregistre le résultat avec sa fenêtre de données
+def optimize_pair(pair, grid=None):
+    ohlcv = fetch_ohlcv(pair, '1d', BACKTEST_LIMIT)
+    if not ohlcv:
+        return None
+    record = {
+        'params': optimize_params(pair, grid, ohlcv),
+        'optimized_at': int(time.time()),
+        'window': {'timeframe': '1d', 'start': int(ohlcv[0][0]), 'end': int(ohlcv[-1][0]), 'candles': len(ohlcv)}
+    }
+    stored = load_stored_params()
+    stored[pair] = record
+    tmp_path = f'{PARAMS_FILE}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(stored, f, indent=2)
+        os.replace(tmp_path, PARAMS_FILE)
+    except OSError as e:
+        logger.error(f"Erreur d'écriture des paramètres optimisés: {e}")
+    return record
+
+# Corrélation des rendements journaliers: closes alignés sur les timestamps, un seul np.corrcoef
+def correlation_matrix(daily_dfs, window=CORR_WINDOW):
+    closes = pd.DataFrame({p: df.set_index('timestamp')['close'] for p, df in daily_dfs.items()}).sort_index().tail(window + 1)
+    closes = closes.dropna(axis=1)  # Paires sans historique complet sur la fenêtre: exclues
+    if closes.shape[1] < 2 or len(closes) < 3:
+        return list(closes.columns), np.full((closes.shape[1], closes.shape[1]), np.nan)
+    returns = np.diff(np.log(closes.to_numpy(dtype=np.float64)), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return list(closes.columns), np.corrcoef(returns, rowvar=False)
+
+# Clusters de paires corrélées (composantes connexes du graphe corr > seuil):
+# une paire a un pair corrélé si et seulement si son cluster compte plus d'un membre
+def correlation_clusters(pairs_list, corr, threshold=CORR_THRESHOLD):
+    parent = list(range(len(pairs_list)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(corr > threshold, k=1))):
+        parent[find(i)] = find(j)
+    roots = [str(find(i)) for i in range(len(pairs_list))]
+    return {'clusters': dict(zip(pairs_list, roots)), 'sizes': dict(Counter(roots))}
+
+# Index de clusters persisté par jour (date UTC de la dernière bougie journalière), recalculé si l'univers change
+def load_correlation_index(daily_dfs, threshold=CORR_THRESHOLD):
+    daily_dfs = {p: df for p, df in daily_dfs.items() if df is not None and not df.empty}
+    if not daily_dfs:
+        return {'clusters': {}, 'sizes': {}}
+    last_ts = max(int(df['timestamp'].iloc[-1]) for df in daily_dfs.values())
+    day = pd.Timestamp(last_ts, unit='ms').strftime('%Y-%m-%d')
+    path = os.path.join(CORR_CACHE_DIR, f'{day}.json')
+    try:
+        with open(path) as f:
+            index = json.load(f)
+        if index.get('threshold') == threshold and index.get('universe') == sorted(daily_dfs):
+            return index
+    except (OSError, ValueError):
+        pass
+
+    index = correlation_clusters(*correlation_matrix(daily_dfs), threshold)
+    index.update({'threshold': threshold, 'universe': sorted(daily_dfs)})
+    try:
+        os.makedirs(CORR_CACHE_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(index, f)
+    except OSError as e:
+        logger.error(f"Erreur d'écriture de l'index de corrélation: {e}")
+    return index
+
+def has_correlated_peers(index, pair):
+    cluster = index['clusters'].get(pair)
+    return cluster is not None and index['sizes'][cluster] > 1
+
 # Plot chart for visualization
-def plot_signals(df, pair):
+def plot_signals(df, pair, path=None):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize=(12, 6))
     ax.plot(df['timestamp'], df['close'], label='Close')
     ax.plot(df['timestamp'], df['ema_fast'], label='EMA Fast')
@@ -913,118 +2246,342 @@ def plot_signals(df, pair):
     ax.plot(df['timestamp'], df['lower_bb'], label='Lower BB', linestyle='--')
     ax.set_title(f'{pair} Price Chart with Indicators')
     ax.legend()
-    plt.savefig(f'{pair.replace("/", "_")}_chart.png')
+    plt.savefig(path or f'{pair.replace("/", "_")}_chart.png', format='png')
     plt.close()
 
+# Graphiques rendus à la demande, en cache par paire et timestamp de la dernière bougie.
+# Format 'none' (graphiques désactivés): aucun rendu, chemin None
+def chart_path(pair, df, fmt=None):
+    return os.path.join(CHART_DIR, f"{pair.replace('/', '_')}_{int(df['timestamp'].iloc[-1])}.{fmt or CHART_FORMAT}")
+
+def render_chart(df, pair, fmt=None):
+    fmt = fmt or CHART_FORMAT
+    if fmt == 'none':
+        return None
+    if fmt not in ('png', 'json'):
+        raise ValueError(f"Format de graphique inconnu: {fmt}")
+    path = chart_path(pair, df, fmt)
+    if os.path.exists(path):
+        return path
+    os.makedirs(CHART_DIR, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with timed('plot_signals', pair):
+        if fmt == 'png':
+            plot_signals(df, pair, tmp_path)
+        else:
+            series = df[CHART_COLUMNS].astype(object).where(df[CHART_COLUMNS].notna(), None)
+            with open(tmp_path, 'w') as f:
+                json.dump({'pair': pair, 'series': series.to_dict(orient='list')}, f)
+    os.replace(tmp_path, path)
+    return path
+
+# Tâche du worker de rendu: (chemin, instantané de ses métriques)
+def _render_job(df, pair, fmt):
+    if TIMINGS_ENABLED:
+        metrics_reset()
+    with timed('render_chart', pair):
+        path = render_chart(df, pair, fmt)
+    return path, metrics_snapshot()
+
+# Worker de rendu dédié: matplotlib et l'écriture disque restent hors du chemin de scan.
+# Renvoie le chemin final immédiatement et le futur du rendu (None si déjà en cache ou désactivé),
+# dont le résultat est (chemin, instantané des métriques du worker). df None: pas de frame à tracer
+_render_executor = None
+
+def get_render_executor():
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ProcessPoolExecutor(max_workers=1)
+    return _render_executor
+
+def submit_chart(df, pair, fmt=None):
+    fmt = fmt or CHART_FORMAT
+    if fmt == 'none' or df is None:
+        return None, None
+    path = chart_path(pair, df, fmt)
+    if os.path.exists(path):
+        return path, None
+    return path, get_render_executor().submit(_render_job, df[CHART_COLUMNS].copy(), pair, fmt)
+
+# OHLCV brut dans un bloc de mémoire partagée (float64, une matrice par clé): les workers du scan le lisent
+# par son nom sans que les frames passent par le pipe du Pool.
+# Renvoie le bloc et l'index {clé: (nom du bloc, première ligne, nombre de lignes)}
+def share_ohlcv(frames):
+    offsets, rows = {}, 0
+    for key, data in frames.items():
+        offsets[key] = (rows, len(data))
+        rows += len(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(rows, 1) * len(OHLCV_COLUMNS) * 8)
+    block = np.ndarray((rows, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=shm.buf)
+    for key, (start, n) in offsets.items():
+        if n:
+            data = frames[key]
+            block[start:start + n] = data[OHLCV_COLUMNS].to_numpy(dtype=np.float64) if isinstance(data, pd.DataFrame) else data
+    return shm, {key: (shm.name, start, n) for key, (start, n) in offsets.items()}
+
+_shared_blocks = {}
+SHARED_BLOCKS_PER_WORKER = 2  # Univers et backtests d'un scan
+
+# Bloc partagé attaché une seule fois par worker (univers du screening, puis backtests des candidats).
+# Les workers du Pool du démon servent plusieurs scans: les blocs des scans précédents, déjà libérés
+# par le parent, sont détachés au fur et à mesure (frames locales copiées, aucune vue ne les retient)
+def _shared_block(name):
+    if name not in _shared_blocks:
+        while len(_shared_blocks) >= SHARED_BLOCKS_PER_WORKER:
+            old = _shared_blocks.pop(next(iter(_shared_blocks)))[0]
+            old.close()
+        shm = shared_memory.SharedMemory(name=name)
+        rows = shm.size // (len(OHLCV_COLUMNS) * 8)
+        _shared_blocks[name] = (shm, np.ndarray((rows, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=shm.buf))
+    return _shared_blocks[name][1]
+
+# Copie locale d'une entrée d'un bloc partagé (timestamps rendus entiers, comme les réponses ccxt)
+def shared_frame(entry):
+    name, start, n = entry
+    df = pd.DataFrame(_shared_block(name)[start:start + n], columns=OHLCV_COLUMNS)
+    df['timestamp'] = df['timestamp'].astype(np.int64)
+    return df
+
+# Étape 1 du scan (worker): indicateurs d'une paire depuis le bloc partagé, fins de frames seulement
+def screen_pair(pair, dfs, params=None):
+    if TIMINGS_ENABLED:
+        metrics_reset()
+    try:
+        with timed('screen_pair', pair):
+            if params is not None:
+                apply_params(params)
+            frames = indicator_frames(pair, {tf: shared_frame(dfs[tf]) for tf in TIMEFRAMES}, params=params)
+        if frames is None:
+            return None
+        record = {'pair': pair, 'frames': frames, 'metrics': metrics_snapshot()}
+        # Démon: états construits ici renvoyés au parent, qui les mettra à jour aux scans suivants
+        if WARM_INDICATORS:
+            record['streams'] = {tf: _indicator_streams[(pair, tf)] for tf in TIMEFRAMES}
+        return record
+    except Exception as e:
+        logger.error(f"Erreur de présélection pour {pair}: {e}")
+        return None
+
+# Présélection de tout l'univers sur les seuls indicateurs: scores sans ML ni signaux externes en un appel
+# de score_rows (dernières lignes de toutes les paires empilées) et conditions de signal_conditions. Les paires
+# remplissant une condition passent en premier, puis par score (meilleur des scores pondérés et du score
+# de fallback). Renvoie les top_k paires dans l'ordre de l'univers (toutes si top_k <= 0)
+def screen_pairs(records, top_k=SCREEN_TOP_K):
+    if not records:
+        return []
+    # (paires, timeframes, SCORE_COLUMNS); confirmations 4h/1d de la seule ligne 1h de chaque paire
+    values = np.array([[score_values(record['frames'][tf]) for tf in TIMEFRAMES] for record in records])
+    higher = np.full((2,) + values.shape, np.nan)
+    higher[:, :, 0] = values[:, 1:].swapaxes(0, 1)
+    shape = (-1, len(SCORE_COLUMNS))
+    scores = score_rows(values.reshape(shape), higher.reshape((2,) + shape)).reshape(len(records), len(TIMEFRAMES), len(SCORE_SIDES))
+    weighted = scores[:, 0] * 0.5 + scores[:, 1] * 0.3 + scores[:, 2] * 0.2
+    rsi = values[:, 0, SCORE_COLUMNS.index('rsi')]
+    fallback = scores[np.arange(len(records)), 0, np.where(rsi < 50, 0, 1)]
+    ranking = {}
+    for record, row_1h, pair_weighted, pair_fallback in zip(records, values[:, 0], weighted, fallback):
+        last_row_1h = dict(zip(SCORE_COLUMNS, row_1h))
+        levels_1d = frame_levels(record['frames']['1d'])
+        price = last_row_1h['close']
+        flag = any(signal_conditions(last_row_1h, levels_1d.nearest_support(price), levels_1d.nearest_resistance(price)).values())
+        ranking[record['pair']] = (flag, max(pair_weighted[0], pair_weighted[1], pair_fallback))
+    if top_k <= 0 or top_k >= len(ranking):
+        return list(ranking)
+    selected = set(sorted(ranking, key=ranking.get, reverse=True)[:top_k])
+    return [pair for pair in ranking if pair in selected]
+
+# Résultat compact d'une paire pour le parent: signaux, fallback, backtest, prédiction ML utilisée,
+# fins de frames d'indicateurs (RECORD_TAILS, niveaux dans attrs) et métriques du worker
+def pair_record(pair, signals, fallback, backtest, ml_prediction, dfs):
+    return {
+        'pair': pair,
+        'signals': signals,
+        'fallback': fallback,
+        'backtest': backtest,
+        'ml_prediction': ml_prediction,
+        'frames': dfs,
+        'metrics': metrics_snapshot()
+    }
+
 # Function for multiprocessing
-def process_pair(pair):
+# dfs: frames OHLCV par timeframe, ou entrées de chaque timeframe (et du backtest) dans les blocs partagés du scan.
+# frames: frames d'indicateurs déjà calculées par l'étape 1 du scan (pas de nouveau calcul dans le worker);
+# la prédiction ML est alors celle de l'inférence groupée du parent (None: pas de modèle pour la paire)
+def process_pair(pair, dfs=None, backtest_ohlcv=None, ml_prediction=None, external_signals=None, params=None, frames=None):
+    if TIMINGS_ENABLED:
+        metrics_reset()
     try:
-        dfs = {}
-        for tf in TIMEFRAMES:
-            ohlcv = fetch_ohlcv(pair, tf, LIMIT)
-            if not ohlcv:
-                return None
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df = calculate_indicators(df)
-            if df is None:
-                return None
-            dfs[tf] = df
-            time.sleep(0.2)
-        signals, fallback = generate_signals(dfs['1h'], dfs['4h'], dfs['1d'], pair)
-        backtest = backtest_strategy(pair)
-        plot_signals(dfs['1h'], pair)  # Generate chart
-        return signals, fallback, backtest, dfs['1h'], dfs['4h'], dfs['1d']
+        with timed('process_pair', pair):
+            # Paramètres propres à la paire, appliqués aux globals du worker
+            if params is not None:
+                apply_params(params)
+            if dfs is None and frames is None:
+                dfs = fetch_timeframes(pair)
+                if dfs is None:
+                    return None
+            if dfs and 'backtest' in dfs:
+                backtest_ohlcv = shared_frame(dfs['backtest']).values.tolist()
+            if frames is None:
+                if isinstance(dfs['1h'], tuple):
+                    dfs = {tf: shared_frame(dfs[tf]) for tf in TIMEFRAMES}
+                frames = indicator_frames(pair, dfs, params=params)
+                if frames is None:
+                    return None
+                if ml_prediction is None:
+                    ml_prediction = lstm_prediction(pair, dfs['1h'])
+            signals, fallback = generate_signals(frames['1h'], frames['4h'], frames['1d'], pair, ml_prediction, external_signals)
+            backtest = backtest_strategy(pair, ohlcv=backtest_ohlcv)
+        return pair_record(pair, signals, fallback, backtest, ml_prediction, frames)
     except Exception as e:
         logger.error(f"Erreur pour {pair}: {e}")
         return None
 
-# Main
-def main():
-    # Optimise params on BTC/USD for example
-    optimized_params = optimize_params('BTC/USD')
-    global BB_STD, RSI_PERIOD
-    BB_STD = optimized_params['BB_STD']
-    RSI_PERIOD = optimized_params['RSI_PERIOD']
-    
-    args = sys.argv[1:]
-    if len(args) == 3:
-        pair, entry_price, signal_type = args
-        try:
-            entry_price = float(entry_price)
-            signal_type = signal_type.upper()
-            if signal_type not in ['ACHAT', 'VENTE']:
-                print(json.dumps({'type': 'error', 'message': 'Type de signal invalide (doit être ACHAT ou VENTE)'}))
-                return
-            if pair not in pairs:
-                print(json.dumps({'type': 'error', 'message': f'Paire {pair} non supportée'}))
-                return
-            ohlcv_1h = fetch_ohlcv(pair, '1h', LIMIT)
-            ohlcv_4h = fetch_ohlcv(pair, '4h', LIMIT)
-            ohlcv_1d = fetch_ohlcv(pair, '1d', LIMIT)
-            df_1h = pd.DataFrame(ohlcv_1h, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df_4h = pd.DataFrame(ohlcv_4h, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df_1d = pd.DataFrame(ohlcv_1d, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df_1h = calculate_indicators(df_1h)
-            df_4h = calculate_indicators(df_4h)
-            df_1d = calculate_indicators(df_1d)
-            if df_1h is None or df_4h is None or df_1d is None:
-                print(json.dumps({'type': 'error', 'message': 'Données insuffisantes pour l’analyse'}))
-                return
-            result = analyze_trade(pair, entry_price, signal_type, df_1h, df_4h, df_1d)
-            print(json.dumps(result))
-        except Exception as e:
-            print(json.dumps({'type': 'error', 'message': f'Erreur lors de l’analyse du trade: {str(e)}'}))
-        return
-    
-    # Valider paires
-    valid_pairs = []
-    for p in pairs:
-        for ex in exchanges.values():
-            try:
-                markets = ex.load_markets()
-                if p in markets:
-                    valid_pairs.append(p)
-                    break
-            except:
-                pass
+# Rendu à la demande: chart PAIR [png|json]
+def run_chart(pair, fmt=None):
+    if pair not in pairs or fmt not in (None, 'png', 'json'):
+        return {'type': 'error', 'message': 'Usage: chart PAIR [png|json]'}
+    # Graphiques désactivés: ni fetch ni rendu
+    if (fmt or CHART_FORMAT) == 'none':
+        return {'type': 'chart', 'pair': pair, 'path': None}
+    apply_params(load_params(pair))
+    dfs = fetch_timeframes(pair)
+    with timed('calculate_indicators', pair):
+        df_1h = calculate_indicators(dfs['1h']) if dfs is not None else None
+    if df_1h is None:
+        return {'type': 'error', 'message': 'Données insuffisantes pour le graphique'}
+    return {'type': 'chart', 'pair': pair, 'path': render_chart(df_1h, pair, fmt)}
+
+# Analyse d'un trade ouvert (PAIR ENTRY_PRICE ACHAT|VENTE)
+def run_analysis(pair, entry_price, signal_type):
+    try:
+        entry_price = float(entry_price)
+        signal_type = str(signal_type).upper()
+        if signal_type not in ['ACHAT', 'VENTE']:
+            return {'type': 'error', 'message': 'Type de signal invalide (doit être ACHAT ou VENTE)'}
+        if pair not in pairs:
+            return {'type': 'error', 'message': f'Paire {pair} non supportée'}
+        apply_params(load_params(pair))
+        # Sentiment/news et import de torch pendant le fetch OHLCV: analyze_trade lit le cache
+        preload_ml()
+        signal_futures = prefetch_signals([pair])
+        dfs = fetch_timeframes(pair)
+        collect_signals(signal_futures)
+        if dfs is None:
+            return {'type': 'error', 'message': 'Données insuffisantes pour l’analyse'}
+        frames = indicator_frames(pair, dfs)
+        if frames is None:
+            return {'type': 'error', 'message': 'Données insuffisantes pour l’analyse'}
+        # LSTM sur l'historique 1h brut: les frames d'indicateurs n'en gardent que la fin
+        return analyze_trade(pair, entry_price, signal_type, frames['1h'], frames['4h'], frames['1d'], lstm_prediction(pair, dfs['1h']))
+    except Exception as e:
+        return {'type': 'error', 'message': f'Erreur lors de l’analyse du trade: {str(e)}'}
+
+# Pool de workers du démon, réutilisé d'un scan à l'autre (None hors démon)
+_scan_pool = None
+
+# Scan de tout l'univers: meilleur signal, et futur du rendu de son graphique (None si aucun)
+def run_scan():
+    # Valider paires (index de routage construit depuis le cache des marchés)
+    routes = get_market_routes()
+    valid_pairs = [p for p in pairs if routes.get(p)]
     if not valid_pairs:
-        print(json.dumps({'type': 'error', 'message': 'Aucune paire valide disponible'}))
-        return
+        return {'type': 'error', 'message': 'Aucune paire valide disponible'}, None
     
-    # Multiprocessing for pairs
-    with Pool(processes=os.cpu_count()) as pool:
-        results = pool.map(process_pair, valid_pairs)
+    # Paramètres de référence dans le parent (force_trade), paramètres propres à chaque paire dans les workers
+    stored_params = load_stored_params()
+    apply_params(load_params(stored=stored_params))
+
+    # Fetch concurrent de l'OHLCV de tout l'univers, puis calcul en multiprocessing sans I/O réseau
+    ml_import = preload_ml()
+    dfs_by_pair = prefetch_timeframes(valid_pairs)
+    # Modules ML chargés une fois dans le parent, hérités par les workers
+    ml_import.join()
+    # OHLCV en mémoire partagée à l'aller, enregistrements compacts (pair_record) au retour
+    shm, index = share_ohlcv({(p, tf): df for p, dfs in dfs_by_pair.items() for tf, df in dfs.items()})
+    backtest_shm = None
+    try:
+        # Pool du démon forké au démarrage (serve), Pool propre au scan sinon
+        with nullcontext(_scan_pool) if _scan_pool is not None else Pool(processes=os.cpu_count()) as pool:
+            # Étape 1: indicateurs de tout l'univers et présélection des SCREEN_TOP_K candidats. En mode démon,
+            # les paires aux états incrémentaux chauds sont mises à jour ici, les autres par les workers
+            warm = [p for p in dfs_by_pair if WARM_INDICATORS and all((p, tf) in _indicator_streams for tf in TIMEFRAMES)]
+            records = {}
+            for record in pool.starmap(screen_pair, [
+                (p, {tf: index[(p, tf)] for tf in TIMEFRAMES}, load_params(p, stored_params)) for p in dfs_by_pair if p not in warm
+            ]):
+                if record:
+                    merge_metrics(record.pop('metrics'))
+                    _indicator_streams.update({(record['pair'], tf): stream for tf, stream in record.pop('streams', {}).items()})
+                    records[record['pair']] = record
+            for p in warm:
+                frames = indicator_frames(p, dfs_by_pair[p], params=load_params(p, stored_params))
+                if frames is not None:
+                    records[p] = {'pair': p, 'frames': frames}
+            with timed('screen'):
+                screened = [records[p] for p in dfs_by_pair if p in records]
+                candidates = screen_pairs(screened)
+            count('screened_pairs', len(screened))
+            count('candidate_pairs', len(candidates))
+
+            # Étape 2, candidats seulement: signaux externes et backtest (réseau), ML puis signaux complets
+            # sur les frames d'indicateurs de l'étape 1
+            signal_futures = prefetch_signals(candidates)
+            backtest_ohlcv = fetch_ohlcv_many([(p, '1d', BACKTEST_LIMIT) for p in candidates])
+            # ML: modèles à jour (entraînement, fine-tuning) dans les workers, puis une seule inférence groupée
+            # ici sur les fenêtres de tous les candidats (un forward pour le modèle commun de LSTM_SHARED_TRAINING)
+            candidate_1h = {p: dfs_by_pair[p]['1h'] for p in candidates}
+            if LSTM_SHARED_TRAINING:
+                warm_lstm_models(candidate_1h)
+            for p, entry, metrics in pool.starmap(update_lstm_model, [
+                (p, index[(p, '1h')]) for p, df in candidate_1h.items() if not lstm_model_current(p, df)
+            ]):
+                merge_metrics(metrics)
+                if entry is not None:
+                    register_lstm_model(p, entry)
+            ml_predictions = lstm_predictions(candidate_1h)
+            external_signals = collect_signals(signal_futures)
+            backtest_shm, backtest_index = share_ohlcv({p: backtest_ohlcv[(p, '1d', BACKTEST_LIMIT)] for p in candidates})
+            results = pool.starmap(process_pair, [
+                (p, {'backtest': backtest_index[p]}, None, ml_predictions.get(p), external_signals[p],
+                 load_params(p, stored_params), records[p]['frames'])
+                for p in candidates
+            ])
+    finally:
+        for block in (shm, backtest_shm):
+            if block is not None:
+                block.close()
+                block.unlink()
     
     all_signals = []
     fallback_data = []
     backtest_results = []
     
-    for res in results:
-        if res:
-            signals, fallback, backtest, df1h, df4h, df1d = res
-            all_signals.extend(signals)
-            fallback_data.append((fallback, df1h, df4h, df1d))
-            backtest_results.append(backtest)
-    
-    # Correlation for diversification
-    closes = {}
-    for pair in valid_pairs:
-        ohlcv = fetch_ohlcv(pair, '1d', 100)
-        if ohlcv:
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            closes[pair] = df['close']
+    for record in results:
+        if record:
+            merge_metrics(record['metrics'])
+            all_signals.extend(record['signals'])
+            fallback_data.append((record['fallback'], *(record['frames'][tf] for tf in TIMEFRAMES)))
+            backtest_results.append(record['backtest'])
+            ml_predictions[record['pair']] = record['ml_prediction']
+
+    # Frame 1h complète recalculée pour le seul graphique rendu (mêmes paramètres que dans le worker),
+    # None si les graphiques sont désactivés ou la paire absente
+    def chart_frame(pair):
+        if CHART_FORMAT == 'none' or pair not in dfs_by_pair:
+            return None
+        return calculate_indicators(dfs_by_pair[pair]['1h'], load_params(pair, stored_params))
     
-    if closes:
-        corr_matrix = pd.DataFrame(closes).corr()
-        for sig in all_signals:
-            correlated = [p for p in valid_pairs if p != sig['pair'] and corr_matrix.loc[sig['pair'], p] > CORR_THRESHOLD]
-            if correlated:
-                sig['score'] *= 0.8  # Penalize high corr
+    # Correlation for diversification (rendements journaliers déjà en mémoire, index de clusters du jour)
+    with timed('correlation'):
+        corr_index = load_correlation_index({p: dfs['1d'] for p, dfs in dfs_by_pair.items()})
+    for sig in all_signals:
+        if has_correlated_peers(corr_index, sig['pair']):
+            sig['score'] *= 0.8  # Penalize high corr
     
     if all_signals:
         best_signal = max(all_signals, key=lambda x: x['score'])
     else:
-        best_signal = force_trade(fallback_data)
+        best_signal = force_trade(fallback_data, ml_predictions)
     
     if best_signal:
         # Position sizing (Kelly criterion approximation)
@@ -1036,10 +2593,14 @@ def main():
         position_size = capital * RISK_PER_TRADE * max(kelly, 0.1)  # Min 0.1 to avoid zero
         best_signal['position_size'] = round(position_size, 2)
         
-        print(json.dumps({
+        # Graphique du seul signal émis, rendu pendant l'écriture du résultat
+        chart, render = submit_chart(chart_frame(best_signal['pair']), best_signal['pair'])
+        if chart:
+            best_signal['chart'] = chart
+        return {
             'type': 'best_signal',
             'result': best_signal
-        }))
+        }, render
     else:
         if fallback_data:
             best_fallback = max(fallback_data, key=lambda x: x[0]['score'])
@@ -1048,7 +2609,8 @@ def main():
                 signal_type = 'ACHAT' if best_fallback[0]['rsi'] < 50 else 'VENTE'
                 target = best_fallback[0]['price'] * (1 + TARGET_MOVE) if signal_type == 'ACHAT' else best_fallback[0]['price'] * (1 - TARGET_MOVE)
                 stop_loss = best_fallback[0]['price'] - best_fallback[0]['atr'] if signal_type == 'ACHAT' else best_fallback[0]['price'] + best_fallback[0]['atr']
-                print(json.dumps({
+                chart, render = submit_chart(chart_frame(best_fallback[0]['pair']), best_fallback[0]['pair'])
+                return {
                     'type': 'best_signal',
                     'result': {
                         'pair': best_fallback[0]['pair'],
@@ -1063,11 +2625,118 @@ def main():
                         'confidence': 'Très Faible',
                         'score': round(score, 1),
                         'reason': 'Fallback final: Score minimal atteint, basé sur RSI global',
-                        'price_history': best_fallback[0].get('price_history', [])
+                        'price_history': best_fallback[0].get('price_history', []),
+                        **({'chart': chart} if chart else {})
                     }
-                }))
+                }, render
+    return {'type': 'error', 'message': 'Aucun trade possible (vérifiez les données ou paires)'}, None
+
+
+# Mode démon: clients exchanges, marchés, registre LSTM et caches restent chauds entre les requêtes.
+# POST JSON sur /analyze {pair, entry_price, signal_type}, /scan {} ou /chart {pair, format}:
+# la réponse est exactement la sortie JSON de la commande équivalente. Requêtes traitées une à une.
+class DaemonHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply({'type': 'health', 'status': 'ok'})
+        else:
+            self._reply({'type': 'error', 'message': f'Route inconnue: {self.path}'}, 404)
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError:
+            self._reply({'type': 'error', 'message': 'Requête JSON invalide'}, 400)
+            return
+        render = None
+        try:
+            if self.path == '/analyze':
+                output = run_with_timings(run_analysis, body.get('pair'), body.get('entry_price'), body.get('signal_type'))
+            elif self.path == '/scan':
+                output, render = run_with_timings(run_scan)
+            elif self.path == '/chart':
+                output = run_with_timings(run_chart, body.get('pair'), body.get('format'))
+            else:
+                self._reply({'type': 'error', 'message': f'Route inconnue: {self.path}'}, 404)
                 return
-        print(json.dumps({'type': 'error', 'message': 'Aucun trade possible (vérifiez les données ou paires)'}))
+        except Exception as e:
+            logger.error(f"Erreur du démon sur {self.path}: {e}")
+            output = {'type': 'error', 'message': str(e)}
+        self._reply(output)
+        # Graphique du scan rendu après la réponse, comme en ligne de commande: attendu avant la requête suivante.
+        # Le fichier n'apparaît à son chemin (result.chart) qu'une fois complet, le client peut l'attendre
+        if render:
+            try:
+                render.result()
+            except Exception as e:
+                logger.error(f"Erreur de rendu du graphique: {e}")
+
+    def _reply(self, output, status=200):
+        data = json.dumps(output).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+# Workers (rendu puis Pool du scan) forkés une fois au démarrage, avant les threads des requêtes (prefetch,
+# revalidation des signaux, threads de torch): un fork ultérieur copierait des verrous tenus par ces threads.
+# Seul le thread de gestion du worker de rendu, en attente, tourne au fork du Pool. Modules ML importés
+# avant, hérités par les workers
+def serve(address=DAEMON_ADDRESS):
+    global WARM_INDICATORS, _scan_pool
+    WARM_INDICATORS = True
+    host, port = address.rsplit(':', 1)
+    importlib.import_module('crypto_ml')
+    # Premier submit: le worker de rendu est forké maintenant
+    get_render_executor().submit(int).result()
+    _scan_pool = Pool(processes=os.cpu_count())
+    try:
+        get_market_routes()
+        server = HTTPServer((host, int(port)), DaemonHandler)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+    finally:
+        _scan_pool.terminate()
+        _scan_pool = None
+        _render_executor.shutdown()
+
+# Main
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == 'check-import':
+        result = check_import_time(float(args[1]) if len(args) > 1 else IMPORT_BUDGET)
+        print(json.dumps({'type': 'import_check', **result}))
+        sys.exit(0 if result['ok'] else 1)
+    if args and args[0] == 'serve':
+        serve(args[1] if len(args) > 1 else DAEMON_ADDRESS)
+        return
+    if args and args[0] == 'optimize':
+        # Job planifié: optimize [--extended] [PAIR ...] (BTC/USD par défaut), hors du chemin d'analyse
+        grid = OPTIMIZE_GRID_EXTENDED if '--extended' in args else OPTIMIZE_GRID
+        targets = [a for a in args[1:] if a != '--extended'] or [PARAMS_REFERENCE_PAIR]
+        unknown = [p for p in targets if p not in pairs]
+        if unknown:
+            print(json.dumps({'type': 'error', 'message': f'Paires non supportées: {unknown}'}))
+            return
+        print(json.dumps({'type': 'optimize', 'results': {p: optimize_pair(p, grid) for p in targets}}))
+        return
+
+    if args and args[0] == 'chart':
+        print(json.dumps(run_with_timings(run_chart, args[1] if len(args) > 1 else None, args[2] if len(args) > 2 else None)))
+        return
+    if len(args) == 3:
+        print(json.dumps(run_with_timings(run_analysis, *args)))
+        return
+    output, render = run_with_timings(run_scan)
+    print(json.dumps(output))
+    if render:
+        render.result()
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,7 @@ import psycopg2
 from flask import Flask, render_template, request, jsonify
 import time
 import os
+import sys
 from urllib.parse import urlparse
 import psycopg2.extras
 from ccxt.base.errors import NetworkError, ExchangeError
@@ -19,6 +20,12 @@ exchange = ccxt.krakenfutures({
     'enableRateLimit': True
 })
 
+# Enregistrement / rejeu hors ligne des appels Kraken (CRYPTO_RECORD / CRYPTO_REPLAY, voir crypto_replay.py)
+if os.getenv('CRYPTO_RECORD') or os.getenv('CRYPTO_REPLAY'):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import crypto_replay
+    exchange = crypto_replay.wrap_exchange('krakenfutures', exchange)
+
 # Charger les marchés
 markets_loaded = False
 try:
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Modules du dépôt importables depuis tests/, caches (bougies, modèles, signaux) dans un répertoire jetable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('CRYPTO_CACHE_DIR', tempfile.mkdtemp(prefix='crypto_tests_'))
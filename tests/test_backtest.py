@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import crypto_trading_dashboard as dashboard
+
+START = max(dashboard.RSI_PERIOD, dashboard.EMA_SLOW, dashboard.STOCH_PERIOD)
+BUY = {'rsi': 30, 'macd': 1, 'macd_signal': 0, 'stoch_k': 20, 'volume': 2}
+SELL = {'rsi': 70, 'macd': -1, 'macd_signal': 0, 'stoch_k': 80, 'volume': 2}
+
+# Frame neutre (aucun signal) autour de 100, barres modifiées par {index: {colonne: valeur}}
+def frame(n=40, bars=None):
+    df = pd.DataFrame({'open': 100.0, 'high': 100.5, 'low': 99.5, 'close': 100.0, 'rsi': 50.0, 'macd': 0.0, 'macd_signal': 0.0,
+                       'stoch_k': 50.0, 'volume': 1.0, 'volume_ema': 1.0, 'atr': 1.0}, index=range(n))
+    for i, values in (bars or {}).items():
+        for col, value in values.items():
+            df.loc[i, col] = value
+    return df
+
+# Référence scalaire bougie par bougie: entrée à la clôture du signal, sortie au stop (prioritaire), à l'objectif
+# ou au signal opposé; la bougie de sortie n'ouvre pas de nouvelle position
+def reference_backtest(df, capital=10000):
+    rows = df.to_dict('records')
+    n = len(rows)
+    equity = [float(capital)] * n
+    exposed = [False] * n
+    trades = []
+    position = None
+    i = START
+    while i < n:
+        r = rows[i]
+        if position is None:
+            is_buy = r['rsi'] < 35 and r['macd'] > r['macd_signal'] and r['stoch_k'] < 30 and r['volume'] > r['volume_ema']
+            is_sell = r['rsi'] > 65 and r['macd'] < r['macd_signal'] and r['stoch_k'] > 70 and r['volume'] > r['volume_ema']
+            if is_buy or is_sell:
+                side = 1 if is_buy else -1
+                atr = r['atr'] if not np.isnan(r['atr']) else r['close'] * 0.005
+                distance = max(atr, r['close'] * 0.005) * dashboard.MIN_ATR_MULTIPLIER
+                costs = r['close'] * (dashboard.FEE_RATE + dashboard.SLIPPAGE)
+                entry = r['close'] * (1 + side * dashboard.SLIPPAGE)
+                if side == 1:
+                    target, stop = r['close'] * (1 + dashboard.TARGET_MOVE) - costs, r['close'] - distance
+                else:
+                    target, stop = r['close'] * (1 - dashboard.TARGET_MOVE) + costs, r['close'] + distance
+                position = (side, capital / entry, entry, target, stop)
+                # Valorisée à la clôture dès l'entrée: le slippage d'entrée apparaît dans le drawdown
+                equity[i], exposed[i] = capital + side * position[1] * (r['close'] - entry), True
+            i += 1
+            continue
+        side, units, entry, target, stop = position
+        stopped = r['low'] <= stop if side == 1 else r['high'] >= stop
+        reached = r['high'] >= target if side == 1 else r['low'] <= target
+        opposite = (r['rsi'] > 65 and r['macd'] < r['macd_signal'] and r['stoch_k'] > 70 and r['volume'] > r['volume_ema']) if side == 1 \
+            else (r['rsi'] < 35 and r['macd'] > r['macd_signal'] and r['stoch_k'] < 30 and r['volume'] > r['volume_ema'])
+        if stopped:
+            exit_price = (min(stop, r['open']) if side == 1 else max(stop, r['open'])) * (1 - side * dashboard.SLIPPAGE)
+        elif reached:
+            exit_price = max(target, r['open']) if side == 1 else min(target, r['open'])
+        elif opposite:
+            exit_price = r['close'] * (1 - side * dashboard.SLIPPAGE)
+        else:
+            equity[i], exposed[i] = capital + side * units * (r['close'] - entry), True
+            i += 1
+            continue
+        profit = side * units * (exit_price - entry) - capital * dashboard.FEE_RATE * 2
+        trades.append(profit)
+        capital += profit
+        equity[i:] = [capital] * (n - i)
+        position = None
+        i += 1
+    peak = np.maximum.accumulate(equity)
+    return {'final_capital': capital, 'trades': trades, 'max_drawdown': float(np.max((peak - np.array(equity)) / peak)),
+            'exposure': float(np.mean(exposed[START:]))}
+
+def assert_matches_reference(df):
+    expected = reference_backtest(df)
+    result = dashboard.backtest_frame(df)
+    assert result['num_trades'] == len(expected['trades'])
+    assert result['final_capital'] == pytest.approx(round(expected['final_capital'], 2), abs=0.01)
+    assert result['max_drawdown'] == pytest.approx(round(expected['max_drawdown'], 4), abs=1e-4)
+    assert result['exposure'] == pytest.approx(round(expected['exposure'], 2), abs=0.01)
+    return result, expected
+
+# TP et SL touchés sur la même bougie: le stop est exécuté
+def test_stop_wins_when_tp_and_sl_hit_same_bar():
+    df = frame(bars={30: BUY, 31: {'high': 103.0, 'low': 97.0}})
+    result, expected = assert_matches_reference(df)
+    entry = 100 * (1 + dashboard.SLIPPAGE)
+    stop = (100 - 1.0 * dashboard.MIN_ATR_MULTIPLIER) * (1 - dashboard.SLIPPAGE)
+    profit = 10000 / entry * (stop - entry) - 10000 * dashboard.FEE_RATE * 2
+    assert expected['trades'] == [pytest.approx(profit)]
+    assert result['final_capital'] == round(10000 + profit, 2)
+
+# Gap d'ouverture au-delà du stop: sortie à l'open
+def test_gap_through_stop_fills_at_open():
+    df = frame(bars={30: BUY, 31: {'open': 95.0, 'high': 96.0, 'low': 94.0, 'close': 95.5}})
+    _, expected = assert_matches_reference(df)
+    entry = 100 * (1 + dashboard.SLIPPAGE)
+    assert expected['trades'] == [pytest.approx(10000 / entry * (95.0 * (1 - dashboard.SLIPPAGE) - entry) - 20)]
+
+# Aucune sortie avant la fin des données: pas de trade compté, position valorisée au marché
+def test_open_position_at_end_is_not_a_trade():
+    df = frame(bars={30: BUY, 35: {'close': 99.0}, 39: {'close': 99.5}})
+    result, _ = assert_matches_reference(df)
+    assert result['num_trades'] == 0
+    assert result['final_capital'] == 10000
+    assert result['exposure'] == round(10 / (40 - START), 2)
+    assert result['max_drawdown'] > 0
+
+# Short: entrée sur signal de vente, objectif touché par le low
+def test_short_take_profit():
+    df = frame(bars={30: SELL, 33: {'low': 97.0}})
+    result, expected = assert_matches_reference(df)
+    entry = 100 * (1 - dashboard.SLIPPAGE)
+    target = 100 * (1 - dashboard.TARGET_MOVE) + 100 * (dashboard.FEE_RATE + dashboard.SLIPPAGE)
+    assert expected['trades'] == [pytest.approx(10000 / entry * (entry - target) - 20)]
+    assert result['win_rate'] == 1
+
+# Short stoppé par le high, puis long fermé par le signal opposé
+def test_short_stop_then_long_closed_by_sell_signal():
+    df = frame(bars={28: SELL, 29: {'high': 102.5}, 31: BUY, 34: {**SELL, 'close': 100.8}})
+    result, expected = assert_matches_reference(df)
+    assert result['num_trades'] == 2
+    assert expected['trades'][0] < 0 < expected['trades'][1] + 20
+
+# Séries aléatoires avec signaux fréquents dans les deux sens: mêmes fills que la boucle scalaire
+@pytest.mark.parametrize('seed', range(20))
+def test_random_frames_match_reference(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate([[100.0], close[:-1]]) * (1 + rng.normal(0, 0.003, n))
+    df = pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + rng.random(n) * 0.02),
+        'low': np.minimum(open_, close) * (1 - rng.random(n) * 0.02),
+        'close': close,
+        'rsi': rng.uniform(20, 80, n),
+        'macd': rng.normal(0, 1, n),
+        'macd_signal': rng.normal(0, 1, n),
+        'stoch_k': rng.uniform(0, 100, n),
+        'volume': rng.uniform(0, 2, n),
+        'volume_ema': np.ones(n),
+        'atr': np.where(rng.random(n) < 0.05, np.nan, close * rng.uniform(0.001, 0.01, n))
+    })
+    assert_matches_reference(df)
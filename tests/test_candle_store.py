@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import crypto_trading_dashboard as dashboard
+
+H = 3600 * 1000
+T0 = 1_700_000_000_000 // H * H
+
+# Bougie k de la série; la bougie en cours (pas encore close) a un close provisoire
+def candle(k, partial=False):
+    return [T0 + k * H, 100.0 + k, 101.0 + k, 99.0 + k, 100.5 + k + (0.25 if partial else 0), 10.0 + k]
+
+# Exchange factice 1h: `bars` bougies closes puis la bougie en cours; `cap` dernières bougies servies au plus
+# (720 chez Kraken, quel que soit since), `overlap` bougies renvoyées avant since
+class StubExchange:
+    def __init__(self, bars, cap=None, overlap=0):
+        self.bars, self.cap, self.overlap = bars, cap, overlap
+        self.calls = []
+        self.last_http_response = b''
+
+    def parse_timeframe(self, timeframe):
+        return 3600
+
+    def milliseconds(self):
+        return T0 + self.bars * H + H // 2
+
+    def fetch_ohlcv(self, pair, timeframe, limit=None, since=None):
+        self.calls.append(since)
+        candles = [candle(k) for k in range(self.bars)] + [candle(self.bars, partial=True)]
+        if self.cap:
+            candles = candles[-self.cap:]
+        if since is None:
+            return candles[-limit:]
+        first = max((since - T0) // H - self.overlap, 0)
+        return [c for c in candles if c[0] >= T0 + first * H][:limit]
+
+@pytest.fixture
+def exchange(monkeypatch, tmp_path):
+    stub = StubExchange(100)
+    monkeypatch.setattr(dashboard, 'CANDLE_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(dashboard, 'CANDLE_STORE_ENABLED', True)
+    monkeypatch.setattr(dashboard, 'get_exchange', lambda name: stub)
+    return stub
+
+def fetch(limit):
+    return dashboard.fetch_ohlcv_incremental('stub', 'X/USD', '1h', limit)
+
+def stored():
+    columns, _ = dashboard.load_candles('stub', 'X/USD', '1h')
+    return columns[0].tolist()
+
+# Résultat attendu: les `limit` dernières bougies, bougie en cours comprise
+def expected(bars, limit):
+    return ([candle(k) for k in range(bars)] + [candle(bars, partial=True)])[-limit:]
+
+# Premier run: fetch intégral, seules les bougies closes sont stockées
+def test_first_fetch_stores_closed_candles(exchange):
+    assert fetch(50) == expected(100, 50)
+    assert exchange.calls == [None]
+    assert stored() == [T0 + k * H for k in range(51, 100)]
+
+# Runs suivants: seules les nouvelles bougies sont demandées et ajoutées au stock, sans réécrire l'existant
+def test_incremental_fetch_appends(exchange):
+    fetch(50)
+    path = dashboard._candle_store_path('stub', 'X/USD', '1h')
+    head = open(f'{path}/close.bin', 'rb').read()
+    exchange.bars = 103
+    assert fetch(50) == expected(103, 50)
+    assert exchange.calls == [None, T0 + 100 * H]
+    assert open(f'{path}/close.bin', 'rb').read().startswith(head)
+    assert stored() == [T0 + k * H for k in range(51, 103)]
+    # La bougie en cours du run précédent est reprise close, pas figée à sa valeur provisoire
+    columns, _ = dashboard.load_candles('stub', 'X/USD', '1h')
+    assert columns[4][-3] == candle(100)[4]
+
+# Exchange qui renvoie des bougies déjà stockées: ni doublon dans le stock, ni dans le résultat
+def test_overlapping_response_is_deduplicated(exchange):
+    fetch(50)
+    exchange.bars, exchange.overlap = 105, 4
+    result = fetch(50)
+    assert result == expected(105, 50)
+    assert np.all(np.diff(stored()) == H)
+    assert len({c[0] for c in result}) == len(result)
+
+# Rien de nouveau depuis le dernier run: stock inchangé, bougie en cours renvoyée
+def test_no_new_candles(exchange):
+    fetch(50)
+    assert fetch(50) == expected(100, 50)
+    assert stored() == [T0 + k * H for k in range(51, 100)]
+
+# Historique demandé plus long que le stock: fetch intégral et réécriture
+def test_longer_limit_refetches(exchange):
+    fetch(20)
+    assert fetch(60) == expected(100, 60)
+    assert exchange.calls == [None, None]
+    assert stored() == [T0 + k * H for k in range(41, 100)]
+
+# Cap de 720 bougies: la réponse incrémentale commence après la bougie attendue, le trou n'est pas recousu
+# et le plan repasse en fetch intégral
+def test_capped_exchange_gap_triggers_full_refetch(exchange):
+    exchange.cap = 720
+    fetch(1000)
+    exchange.bars = 100 + 800
+    result = fetch(1000)
+    assert exchange.calls == [None, T0 + 100 * H, None]
+    assert result == expected(900, 720)
+    assert stored() == [T0 + k * H for k in range(181, 900)]
+    assert np.all(np.diff(stored()) == H)
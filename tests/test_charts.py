@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+import crypto_benchmark as benchmark
+import crypto_trading_dashboard as dashboard
+
+@pytest.fixture
+def frame():
+    return dashboard.calculate_indicators(benchmark.synthetic_ohlcv(300, 'random_walk', 1, '1h'))
+
+@pytest.fixture(autouse=True)
+def chart_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(dashboard, 'CHART_DIR', str(tmp_path))
+    return tmp_path
+
+# CHART_FORMAT=none: aucun rendu ni fichier, chemin None
+def test_none_format_is_a_no_op(frame, chart_dir, monkeypatch):
+    assert dashboard.render_chart(frame, 'X/USD', 'none') is None
+    assert dashboard.submit_chart(frame, 'X/USD', 'none') == (None, None)
+    monkeypatch.setattr(dashboard, 'CHART_FORMAT', 'none')
+    assert dashboard.render_chart(frame, 'X/USD') is None
+    assert dashboard.submit_chart(frame, 'X/USD') == (None, None)
+    assert list(chart_dir.iterdir()) == []
+
+# La commande chart ne fetche rien quand les graphiques sont désactivés
+def test_run_chart_with_charts_disabled(monkeypatch):
+    monkeypatch.setattr(dashboard, 'CHART_FORMAT', 'none')
+    monkeypatch.setattr(dashboard, 'fetch_timeframes', lambda *args: pytest.fail('fetch inutile'))
+    pair = dashboard.pairs[0]
+    assert dashboard.run_chart(pair) == {'type': 'chart', 'pair': pair, 'path': None}
+
+def test_unknown_format_raises(frame):
+    with pytest.raises(ValueError):
+        dashboard.render_chart(frame, 'X/USD', 'svg')
+
+def test_json_chart_is_cached(frame):
+    path = dashboard.render_chart(frame, 'X/USD', 'json')
+    with open(path) as f:
+        data = json.load(f)
+    assert data['pair'] == 'X/USD'
+    assert data['series']['close'] == frame['close'].tolist()
+    assert dashboard.submit_chart(frame, 'X/USD', 'json') == (path, None)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import crypto_trading_dashboard as dashboard
+
+DAY_MS = 24 * 3600 * 1000
+N = dashboard.CORR_WINDOW
+
+# Rendements de corrélation d'échantillon connue: combinaisons de vecteurs centrés orthonormés
+@pytest.fixture(scope='module')
+def basis():
+    rng = np.random.default_rng(3)
+    z = rng.normal(size=(N, 10))
+    q, _ = np.linalg.qr(z - z.mean(axis=0))
+    return q.T
+
+def mix(rho, base, noise):
+    return rho * base + np.sqrt(1 - rho ** 2) * noise
+
+# Bougies journalières dont les rendements log valent returns (volatilité ~2%/jour)
+def daily(returns, start=0):
+    close = 100 * np.exp(np.concatenate([[0], np.cumsum(returns * 0.2)]))
+    return pd.DataFrame({'timestamp': (np.arange(start, start + len(close))) * DAY_MS, 'close': close})
+
+@pytest.fixture(scope='module')
+def universe(basis):
+    q = basis
+    b2 = mix(0.9, q[2], q[3])
+    returns = {
+        'A/USD': q[0], 'A2/USD': mix(0.95, q[0], q[1]),
+        # B3 n'est corrélé qu'à B2 (0.85), à B seulement à 0.9 * 0.85 < seuil: même cluster par transitivité
+        'B/USD': q[2], 'B2/USD': b2, 'B3/USD': mix(0.85, b2, q[4]),
+        'C/USD': q[5],
+        'D/USD': q[6], 'D2/USD': mix(0.79, q[6], q[7])
+    }
+    return {pair: daily(r) for pair, r in returns.items()}
+
+def test_correlation_matrix_recovers_known_correlation(universe):
+    pairs, corr = dashboard.correlation_matrix(universe)
+    assert pairs == list(universe)
+    c = pd.DataFrame(corr, index=pairs, columns=pairs)
+    assert c.loc['A/USD', 'A2/USD'] == pytest.approx(0.95)
+    assert c.loc['B/USD', 'B2/USD'] == pytest.approx(0.9)
+    assert c.loc['B2/USD', 'B3/USD'] == pytest.approx(0.85)
+    assert c.loc['B/USD', 'B3/USD'] == pytest.approx(0.765)
+    assert c.loc['D/USD', 'D2/USD'] == pytest.approx(0.79)
+    assert c.loc['A/USD', 'C/USD'] == pytest.approx(0, abs=1e-9)
+
+def test_clusters_group_correlated_pairs(universe):
+    index = dashboard.correlation_clusters(*dashboard.correlation_matrix(universe))
+    clusters = index['clusters']
+    groups = {}
+    for pair, root in clusters.items():
+        groups.setdefault(root, set()).add(pair)
+    assert sorted(map(sorted, groups.values())) == [['A/USD', 'A2/USD'], ['B/USD', 'B2/USD', 'B3/USD'], ['C/USD'], ['D/USD'], ['D2/USD']]
+    assert {pair: dashboard.has_correlated_peers(index, pair) for pair in universe} == {
+        'A/USD': True, 'A2/USD': True, 'B/USD': True, 'B2/USD': True, 'B3/USD': True,
+        'C/USD': False, 'D/USD': False, 'D2/USD': False
+    }
+
+# Seuil strict: une corrélation égale au seuil ne regroupe pas, D2 (0.79) rejoint D sous un seuil de 0.78
+def test_threshold_boundary(universe):
+    corr = np.array([[1.0, 0.8, 0.0], [0.8, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    index = dashboard.correlation_clusters(['X', 'Y', 'Z'], corr, threshold=0.8)
+    assert not dashboard.has_correlated_peers(index, 'X')
+    index = dashboard.correlation_clusters(['X', 'Y', 'Z'], corr, threshold=0.7999)
+    assert index['clusters']['X'] == index['clusters']['Y'] != index['clusters']['Z']
+    index = dashboard.correlation_clusters(*dashboard.correlation_matrix(universe), threshold=0.78)
+    assert dashboard.has_correlated_peers(index, 'D2/USD')
+
+# Paire sans historique complet sur la fenêtre: exclue de la matrice, donc sans pair corrélé
+def test_short_history_is_excluded(universe, basis):
+    dfs = {**universe, 'E/USD': daily(basis[0][:N // 2], start=N // 2)}
+    pairs, _ = dashboard.correlation_matrix(dfs)
+    assert 'E/USD' not in pairs
+    assert not dashboard.has_correlated_peers(dashboard.correlation_clusters(*dashboard.correlation_matrix(dfs)), 'E/USD')
+
+# Index persisté par jour: relu tel quel, recalculé si le seuil ou l'univers change
+def test_index_is_cached_per_day(universe, monkeypatch, tmp_path):
+    monkeypatch.setattr(dashboard, 'CORR_CACHE_DIR', str(tmp_path))
+    index = dashboard.load_correlation_index(universe)
+    assert dashboard.has_correlated_peers(index, 'A/USD')
+    computed = []
+    matrix = dashboard.correlation_matrix
+    monkeypatch.setattr(dashboard, 'correlation_matrix', lambda dfs: computed.append(len(dfs)) or matrix(dfs))
+    assert dashboard.load_correlation_index(universe) == index
+    assert computed == []
+    dashboard.load_correlation_index(universe, threshold=0.78)
+    smaller = {p: df for p, df in universe.items() if p != 'C/USD'}
+    dashboard.load_correlation_index(smaller)
+    assert computed == [len(universe), len(smaller)]
@@ -0,0 +1,8 @@
+import crypto_trading_dashboard as dashboard
+
+# Import du module sous IMPORT_BUDGET, sans charger torch/sklearn/matplotlib/ccxt (chemin analyze à froid).
+# Premier import hors mesure: compilation des .pyc et cache disque
+def test_import_time_within_budget():
+    dashboard.check_import_time()
+    result = dashboard.check_import_time()
+    assert result['ok'], result
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import crypto_benchmark as benchmark
+import crypto_trading_dashboard as dashboard
+
+SEEDS = range(60)
+FLAT_SEEDS = range(200)
+
+# Sans réseau ni LSTM: signaux externes fixes, pas de prédiction ML
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(dashboard, 'get_sentiment', lambda pair: 0.1)
+    monkeypatch.setattr(dashboard, 'get_news_impact', lambda pair: 1.0)
+    monkeypatch.setattr(dashboard, 'lstm_prediction', lambda pair, df_1h, seq_length=50: None)
+
+# Marche aléatoire 1h/4h/1d, 4h et 1d recalés sur le dernier prix 1h (niveaux proches, signaux possibles)
+def random_walk(seed):
+    raw = {}
+    for k, tf in enumerate(dashboard.TIMEFRAMES):
+        rng = np.random.default_rng(seed * 3 + k)
+        close = 100 * np.exp(np.cumsum(rng.normal((seed % 5 - 2) * 0.001, 0.01, 1000)))
+        raw[tf] = pd.DataFrame({
+            'timestamp': np.arange(1000) * dashboard.parse_timeframe(tf) * 1000,
+            'open': close,
+            'high': close * (1 + rng.random(1000) * 0.01),
+            'low': close * (1 - rng.random(1000) * 0.01),
+            'close': close,
+            'volume': rng.random(1000) * 100
+        })
+    for tf in ['4h', '1d']:
+        ratio = raw['1h']['close'].iloc[-1] / raw[tf]['close'].iloc[-1]
+        raw[tf][['open', 'high', 'low', 'close']] *= ratio
+    return raw
+
+# Série plate de stablecoin (USDC/USDT/DAI): indicateurs quasi égaux entre eux et au prix
+def flat(seed):
+    return {tf: benchmark.synthetic_ohlcv(1000, 'flat', seed, tf) for tf in dashboard.TIMEFRAMES}
+
+# Sorties de generate_signals, analyze_trade et force_trade sur un jeu de séries
+def decisions(universe):
+    out, fallback_data = [], []
+    for i, raw in enumerate(universe):
+        pair = f'P{i}/USD'
+        dfs = {tf: dashboard.calculate_indicators(df) for tf, df in raw.items()}
+        signals, fallback = dashboard.generate_signals(dfs['1h'], dfs['4h'], dfs['1d'], pair, external_signals=(0.1, 1.0))
+        out.append((signals, fallback))
+        out.append(dashboard.analyze_trade(pair, dfs['1h']['close'].iloc[-1], 'ACHAT' if i % 2 else 'VENTE', dfs['1h'], dfs['4h'], dfs['1d']))
+        fallback_data.append((fallback, dfs['1h'], dfs['4h'], dfs['1d']))
+    out.append(dashboard.force_trade(fallback_data))
+    for fallback, *_ in fallback_data:
+        fallback['score'] = max(fallback['score'], 51)
+    out.append(dashboard.force_trade(fallback_data))
+    return json.dumps(out, default=str, sort_keys=True)
+
+# Le stockage compact des indicateurs (float32) ne change aucune décision par rapport au float64
+@pytest.mark.parametrize('series', [random_walk, flat])
+def test_compact_indicators_keep_decisions(series, monkeypatch):
+    universe = [series(seed) for seed in (SEEDS if series is random_walk else FLAT_SEEDS)]
+    compact = decisions(universe)
+    monkeypatch.setattr(dashboard, 'INDICATOR_DTYPE', np.float64)
+    assert compact == decisions(universe)
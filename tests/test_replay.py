@@ -0,0 +1,156 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import crypto_replay as replay
+
+CLOCK = 1_700_000_000_000
+MARKETS = {'BTC/USD': {'symbol': 'BTC/USD'}}
+
+# Client ccxt factice: réponses successives différentes pour des appels identiques, erreur sur fetch_ticker
+class StubClient:
+    def __init__(self):
+        self.markets = None
+        self.last_http_response = None
+        self.ohlcv_calls = 0
+
+    def milliseconds(self):
+        return CLOCK
+
+    def parse_timeframe(self, timeframe):
+        return 3600
+
+    def set_markets(self, markets):
+        self.markets = markets
+
+    def load_markets(self):
+        self.last_http_response = '{"markets"}'
+        self.markets = MARKETS
+        return MARKETS
+
+    def fetch_ohlcv(self, pair, timeframe, limit=None, since=None):
+        self.ohlcv_calls += 1
+        self.last_http_response = b'[...]'
+        return [[CLOCK + self.ohlcv_calls, 1.0, 2.0, 0.5, 1.5, 10.0 * self.ohlcv_calls]][:limit]
+
+    def fetch_ticker(self, pair):
+        raise ConnectionError('exchange injoignable')
+
+# Client du rejeu: aucune requête réseau ne doit l'atteindre
+class OfflineClient(StubClient):
+    def milliseconds(self):
+        raise AssertionError('horloge réelle lue au rejeu')
+
+    def load_markets(self):
+        raise AssertionError('requête réseau au rejeu')
+
+    fetch_ohlcv = fetch_ticker = load_markets
+
+class AsyncStubClient(StubClient):
+    async def fetch_ohlcv(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return StubClient.fetch_ohlcv(self, *args, **kwargs)
+
+    async def fetch_ticker(self, pair):
+        raise ConnectionError('exchange injoignable')
+
+def record_session(proxy):
+    results = [proxy.load_markets(), proxy.fetch_ohlcv('BTC/USD', '1h', limit=1), proxy.fetch_ohlcv('BTC/USD', '1h', limit=1),
+               proxy.fetch_ohlcv('BTC/USD', '4h', since=CLOCK, limit=1)]
+    with pytest.raises(ConnectionError):
+        proxy.fetch_ticker('BTC/USD')
+    return results
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'scan.json.gz')
+
+def test_round_trip(path):
+    archive = replay.Archive(path, replaying=False)
+    client = StubClient()
+    recorded = record_session(replay.ExchangeProxy('kraken', client, archive))
+    archive.save()
+
+    proxy = replay.ExchangeProxy('kraken', OfflineClient(), replay.Archive(path, replaying=True, latency='0'))
+    assert proxy.milliseconds() == CLOCK
+    assert proxy.load_markets() == MARKETS and proxy.markets == MARKETS
+    # Appels identiques rejoués dans l'ordre, la dernière réponse répétée au-delà
+    first, second = recorded[1], recorded[2]
+    assert first != second
+    assert [proxy.fetch_ohlcv('BTC/USD', '1h', limit=1) for _ in range(3)] == [first, second, second]
+    # Ordre des kwargs sans effet sur la clé
+    assert proxy.fetch_ohlcv('BTC/USD', '4h', limit=1, since=CLOCK) == recorded[3]
+    assert proxy.parse_timeframe('1h') == 3600
+    with pytest.raises(replay.ReplayError, match='ConnectionError: exchange injoignable'):
+        proxy.fetch_ticker('BTC/USD')
+
+# Requête jamais enregistrée: ReplayMiss, quels que soient la méthode ou les arguments qui diffèrent
+def test_unrecorded_call_raises(path):
+    archive = replay.Archive(path, replaying=False)
+    record_session(replay.ExchangeProxy('kraken', StubClient(), archive))
+    archive.save()
+    proxy = replay.ExchangeProxy('kraken', OfflineClient(), replay.Archive(path, replaying=True, latency='0'))
+    with pytest.raises(replay.ReplayMiss):
+        proxy.fetch_ohlcv('BTC/USD', '1h', limit=2)
+    with pytest.raises(replay.ReplayMiss):
+        proxy.fetch_balance()
+    other = replay.ExchangeProxy('coinbase', OfflineClient(), proxy._archive)
+    with pytest.raises(replay.ReplayMiss):
+        other.load_markets()
+
+def test_async_round_trip(path):
+    archive = replay.Archive(path, replaying=False)
+    proxy = replay.AsyncExchangeProxy('kraken', AsyncStubClient(), archive)
+
+    async def session(proxy):
+        results = [await proxy.fetch_ohlcv('BTC/USD', '1h', limit=1), await proxy.fetch_ohlcv('BTC/USD', '1h', limit=1)]
+        with pytest.raises((ConnectionError, replay.ReplayError)):
+            await proxy.fetch_ticker('BTC/USD')
+        return results
+
+    recorded = asyncio.run(session(proxy))
+    archive.save()
+    proxy = replay.AsyncExchangeProxy('kraken', OfflineClient(), replay.Archive(path, replaying=True, latency='0'))
+    assert asyncio.run(session(proxy)) == recorded
+    with pytest.raises(replay.ReplayMiss):
+        asyncio.run(proxy.fetch_ohlcv('ETH/USD', '1h', limit=1))
+
+# Latence 'recorded': chaque réponse servie après la durée mesurée à l'enregistrement
+def test_recorded_latency(path, monkeypatch):
+    archive = replay.Archive(path, replaying=False)
+    archive.record(replay.call_key('kraken', 'fetch_ohlcv', ('BTC/USD',), {}), [[1]], 0.25)
+    archive.save()
+    delays = []
+    monkeypatch.setattr(replay.time, 'sleep', delays.append)
+    proxy = replay.ExchangeProxy('kraken', OfflineClient(), replay.Archive(path, replaying=True, latency='recorded'))
+    assert proxy.fetch_ohlcv('BTC/USD') == [[1]]
+    assert delays == [0.25]
+
+def test_unsupported_version(path):
+    with gzip.open(path, 'wt') as f:
+        json.dump({'version': replay.ARCHIVE_VERSION + 1, 'clocks': {}, 'calls': {}}, f)
+    with pytest.raises(ValueError):
+        replay.Archive(path, replaying=True)
+
+# requests.get enregistré puis rejoué: statut, corps et erreurs HTTP restitués
+def test_http_round_trip(path, monkeypatch):
+    class Response:
+        def __init__(self, status_code, text):
+            self.status_code, self.text = status_code, text
+
+    responses = {'https://api/fng': Response(200, '{"data": [{"value": "55"}]}'), 'https://api/down': Response(503, 'busy')}
+    monkeypatch.setattr(replay.requests, 'get', lambda url, **kwargs: responses[url])
+    monkeypatch.setattr(replay, '_archive', replay.Archive(path, replaying=False))
+    replay.http_get('https://api/fng', timeout=5)
+    replay.http_get('https://api/down', timeout=5)
+    replay._archive.save()
+
+    monkeypatch.setattr(replay.requests, 'get', None)
+    monkeypatch.setattr(replay, '_archive', replay.Archive(path, replaying=True, latency='0'))
+    assert replay.http_get('https://api/fng', timeout=1).json()['data'][0]['value'] == '55'
+    with pytest.raises(replay.requests.HTTPError):
+        replay.http_get('https://api/down').raise_for_status()
+    with pytest.raises(replay.ReplayMiss):
+        replay.http_get('https://api/other')
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import crypto_benchmark as benchmark
+import crypto_trading_dashboard as dashboard
+
+ROWS = 3000
+
+# Lignes aléatoires autour d'un prix de 100: chaque indicateur tombe de part et d'autre des seuils de score, ~5% de NaN
+def random_rows(rng, n):
+    price = np.full(n, 100.0)
+    ema_slow = price * (1 + rng.normal(0, 0.02, n))
+    columns = {
+        'close': price,
+        'rsi': rng.uniform(0, 100, n),
+        'sma': price * (1 + rng.normal(0, 0.02, n)),
+        'lower_bb': price * (1 + rng.normal(-0.01, 0.02, n)),
+        'upper_bb': price * (1 + rng.normal(0.01, 0.02, n)),
+        'ema_fast': ema_slow * (1 + rng.normal(0, 0.01, n)),
+        'ema_slow': ema_slow,
+        'atr': rng.uniform(0, 2, n),
+        'macd': rng.normal(0, 1, n),
+        'macd_signal': rng.normal(0, 1, n),
+        'momentum': rng.normal(0, 1, n),
+        'stoch_k': rng.uniform(0, 100, n),
+        'stoch_d': rng.uniform(0, 100, n),
+        'volume': rng.uniform(0, 200, n),
+        'volume_ema': rng.uniform(50, 100, n),
+        'support': price * (1 - rng.uniform(0, 0.03, n)),
+        'resistance': price * (1 + rng.uniform(0, 0.03, n))
+    }
+    columns.update({level: price * (1 + rng.normal(0, 0.05, n)) for level in dashboard.FIB_LEVELS})
+    values = np.column_stack([columns[col] for col in dashboard.SCORE_COLUMNS])
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[:, 0] = price
+    return values
+
+# Confirmations: RSI extrêmes et tendances alignées assez fréquents pour compter 0, 1 ou 2 timeframes
+def random_higher(rng, n):
+    values = random_rows(rng, n)
+    rsi = dashboard.SCORE_COLUMNS.index('rsi')
+    values[:, rsi] = rng.choice([20.0, 50.0, 80.0, np.nan], n)
+    return values
+
+# Le moteur vectorisé applique les règles du score scalaire ligne par ligne
+@pytest.mark.parametrize('with_ml', [False, True])
+def test_score_rows_matches_calculate_score(with_ml):
+    rng = np.random.default_rng(42 + with_ml)
+    values = random_rows(rng, ROWS)
+    higher = [random_higher(rng, ROWS), random_higher(rng, ROWS)]
+    ml = 100 * (1 + rng.normal(0, 0.04, ROWS)) if with_ml else None
+    sentiment = rng.uniform(-1, 1, ROWS)
+    news_impact = rng.uniform(-5, 5, ROWS)
+    scores = dashboard.score_rows(values, higher, ml, sentiment, news_impact)
+    for i in range(ROWS):
+        row = pd.Series(values[i], index=dashboard.SCORE_COLUMNS)
+        higher_rows = [pd.Series(h[i], index=dashboard.SCORE_COLUMNS) for h in higher]
+        for j, side in enumerate(dashboard.SCORE_SIDES):
+            expected = dashboard.calculate_score(row, side, higher_rows, None if ml is None else ml[i], sentiment[i], news_impact[i])
+            assert scores[i, j] == expected, (i, side)
+
+# Scores par timeframe d'une paire: ligne 1h confirmée par 4h/1d, niveaux lus dans l'index de chaque frame
+def test_score_timeframes_matches_calculate_score():
+    frames = {tf: dashboard.calculate_indicators(benchmark.synthetic_ohlcv(1000, 'regime', k, tf))
+              for k, tf in enumerate(dashboard.TIMEFRAMES)}
+    scores = dashboard.score_timeframes(frames['1h'], frames['4h'], frames['1d'], 105.0, 0.2, 1.5)
+    for tf, df in frames.items():
+        higher = [frames['4h'].iloc[-1], frames['1d'].iloc[-1]] if tf == '1h' else None
+        for side in dashboard.SCORE_SIDES:
+            expected = dashboard.calculate_score(df.iloc[-1], side, higher, 105.0, 0.2, 1.5, dashboard.frame_levels(df))
+            assert scores[tf][side] == expected, (tf, side)
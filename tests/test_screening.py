@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import crypto_benchmark as benchmark
+import crypto_trading_dashboard as dashboard
+
+PAIRS = 40
+
+# Enregistrements de l'étape 1 du scan: fins de frames d'indicateurs (RECORD_TAILS) de séries variées
+@pytest.fixture(scope='module')
+def records():
+    out = []
+    for i in range(PAIRS):
+        kind = benchmark.KINDS[i % len(benchmark.KINDS)]
+        frames = {tf: dashboard.calculate_indicators(benchmark.synthetic_ohlcv(1000, kind, i * 3 + k, tf), tail=dashboard.RECORD_TAILS[tf])
+                  for k, tf in enumerate(dashboard.TIMEFRAMES)}
+        out.append({'pair': f'P{i}/USD', 'frames': frames})
+    return out
+
+# Classement paire par paire avec les fonctions de generate_signals: (condition remplie, meilleur score)
+def reference_ranking(records):
+    ranking = {}
+    for record in records:
+        df_1h, df_4h, df_1d = (record['frames'][tf] for tf in dashboard.TIMEFRAMES)
+        last_row_1h = df_1h.iloc[-1]
+        price = last_row_1h['close']
+        levels_1d = dashboard.frame_levels(df_1d)
+        conditions = dashboard.signal_conditions(last_row_1h, levels_1d.nearest_support(price), levels_1d.nearest_resistance(price))
+        scores = dashboard.score_timeframes(df_1h, df_4h, df_1d)
+        fallback = scores['1h']['ACHAT' if last_row_1h['rsi'] < 50 else 'VENTE']
+        ranking[record['pair']] = (any(conditions.values()), max(dashboard.weighted_score(scores, 'ACHAT'),
+                                                                 dashboard.weighted_score(scores, 'VENTE'), fallback))
+    return ranking
+
+# Les top_k meilleures paires (conditions d'abord, puis score), rendues dans l'ordre de l'univers
+@pytest.mark.parametrize('top_k', [1, 5, 12])
+def test_screen_pairs_selects_top_k(records, top_k):
+    ranking = reference_ranking(records)
+    best = sorted(ranking, key=ranking.get, reverse=True)[:top_k]
+    selected = dashboard.screen_pairs(records, top_k)
+    assert len(selected) == top_k
+    assert set(selected) == set(best)
+    universe = [record['pair'] for record in records]
+    assert selected == sorted(selected, key=universe.index)
+    # Aucune paire écartée ne classe devant une paire retenue
+    assert min(ranking[p] for p in selected) >= max(ranking[p] for p in universe if p not in selected)
+
+# Une condition de signal remplie passe devant tout score: la paire la moins bien notée, seule marquée, est retenue
+def test_screen_pairs_ranks_conditions_first(records, monkeypatch):
+    ranking = reference_ranking(records)
+    worst = min(ranking, key=ranking.get)
+    volume = next(r for r in records if r['pair'] == worst)['frames']['1h']['volume'].iloc[-1]
+    monkeypatch.setattr(dashboard, 'signal_conditions', lambda row, support, resistance: {'buy_strict': row['volume'] == volume})
+    assert dashboard.screen_pairs(records, 1) == [worst]
+
+@pytest.mark.parametrize('top_k', [0, PAIRS, PAIRS + 5])
+def test_screen_pairs_keeps_all(records, top_k):
+    assert dashboard.screen_pairs(records, top_k) == [record['pair'] for record in records]
+
+def test_screen_pairs_empty():
+    assert dashboard.screen_pairs([]) == []
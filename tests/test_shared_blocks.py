@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import crypto_benchmark as benchmark
+import crypto_trading_dashboard as dashboard
+
+@pytest.fixture
+def blocks(monkeypatch):
+    monkeypatch.setattr(dashboard, '_shared_blocks', {})
+    created = []
+    yield created
+    for shm in created:
+        shm.close()
+        shm.unlink()
+
+# Worker du Pool du démon servant plusieurs scans: au plus SHARED_BLOCKS_PER_WORKER blocs attachés,
+# les plus anciens détachés sans affecter les frames déjà copiées
+def test_worker_detaches_blocks_of_previous_scans(blocks):
+    frames = []
+    for scan in range(4):
+        df = benchmark.synthetic_ohlcv(50, 'random_walk', scan, '1h')
+        shm, index = dashboard.share_ohlcv({'X/USD': df})
+        blocks.append(shm)
+        frames.append((df, dashboard.shared_frame(index['X/USD'])))
+        assert len(dashboard._shared_blocks) == min(scan + 1, dashboard.SHARED_BLOCKS_PER_WORKER)
+        assert list(dashboard._shared_blocks)[-1] == shm.name
+    for df, local in frames:
+        assert local['timestamp'].dtype == np.int64
+        assert np.array_equal(local.to_numpy(dtype=np.float64), df[dashboard.OHLCV_COLUMNS].to_numpy(dtype=np.float64))
@@ -0,0 +1,90 @@
+import json
+import os
+import time
+
+import pytest
+
+import crypto_trading_dashboard as dashboard
+
+TTL = 900
+
+# Cache de signaux dans un répertoire propre au test; fetch factice qui compte ses appels
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(dashboard, 'SIGNAL_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+class Source:
+    def __init__(self, value=42, error=None):
+        self.value, self.error, self.calls = value, error, 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.value
+
+def write_entry(key, **entry):
+    dashboard._write_signal(key, entry)
+
+# Attend la fin d'une revalidation en arrière-plan (verrou relâché)
+def wait_refresh(key):
+    deadline = time.time() + 5
+    while os.path.exists(dashboard._signal_cache_path(key) + '.lock') and time.time() < deadline:
+        time.sleep(0.01)
+
+def test_miss_fetches_and_writes():
+    source = Source()
+    assert dashboard.cached_signal('fng', TTL, source) == 42
+    assert source.calls == 1
+    assert dashboard._read_signal('fng')['value'] == 42
+    # Deuxième appel servi par le disque
+    assert dashboard.cached_signal('fng', TTL, source) == 42
+    assert source.calls == 1
+
+def test_fresh_hit_skips_fetch():
+    write_entry('fng', value=7, fetched_at=time.time() - TTL + 60)
+    source = Source()
+    assert dashboard.cached_signal('fng', TTL, source) == 7
+    assert source.calls == 0
+
+# Périmé mais dans SIGNAL_STALE_TTL: ancienne valeur servie, revalidation en arrière-plan
+def test_stale_serves_old_value_and_revalidates():
+    write_entry('fng', value=7, fetched_at=time.time() - TTL - 60)
+    source = Source()
+    assert dashboard.cached_signal('fng', TTL, source) == 7
+    wait_refresh('fng')
+    assert source.calls == 1
+    entry = dashboard._read_signal('fng')
+    assert entry['value'] == 42 and time.time() - entry['fetched_at'] < TTL
+
+# Au-delà de TTL + SIGNAL_STALE_TTL: la valeur n'est plus servie, fetch synchrone
+def test_expired_fetches_synchronously():
+    write_entry('fng', value=7, fetched_at=time.time() - TTL - dashboard.SIGNAL_STALE_TTL - 1)
+    source = Source()
+    assert dashboard.cached_signal('fng', TTL, source) == 42
+    assert source.calls == 1
+
+# Fichier tronqué ou illisible: traité comme absent puis réécrit
+@pytest.mark.parametrize('content', ['{"value": 7, "fetc', '', 'not json'])
+def test_corrupt_file_is_a_miss(cache_dir, content):
+    (cache_dir / 'fng.json').write_text(content)
+    source = Source()
+    assert dashboard.cached_signal('fng', TTL, source) == 42
+    assert source.calls == 1
+    assert json.loads((cache_dir / 'fng.json').read_text())['value'] == 42
+
+# Échec de la source: cache négatif, pas de nouvelle requête pendant SIGNAL_NEGATIVE_TTL
+def test_failure_is_negatively_cached():
+    source = Source(error=ValueError('down'))
+    assert dashboard.cached_signal('fng', TTL, source) is None
+    assert dashboard.cached_signal('fng', TTL, source) is None
+    assert source.calls == 1
+    assert 'failed_at' in dashboard._read_signal('fng')
+
+# Échec sur une valeur expirée mais encore dans la fenêtre de péremption: l'ancienne valeur reste servie
+def test_failure_keeps_stale_value():
+    write_entry('fng', value=7, fetched_at=time.time() - TTL - 60, failed_at=time.time() - 10)
+    source = Source()
+    assert dashboard.cached_signal('fng', TTL, source) == 7
+    assert source.calls == 0
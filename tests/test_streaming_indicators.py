@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import crypto_benchmark as benchmark
+import crypto_trading_dashboard as dashboard
+
+KINDS = ['random_walk', 'regime', 'gaps', 'flat']
+
+@pytest.fixture(autouse=True)
+def fresh_streams(monkeypatch):
+    monkeypatch.setattr(dashboard, '_indicator_streams', {})
+
+def assert_same_levels(stream, batch):
+    np.testing.assert_array_equal(stream.attrs['levels'].supports, batch.attrs['levels'].supports)
+    np.testing.assert_array_equal(stream.attrs['levels'].resistances, batch.attrs['levels'].resistances)
+    np.testing.assert_array_equal([stream.attrs['support'], stream.attrs['resistance']],
+                                  [batch.attrs['support'], batch.attrs['resistance']])
+
+# Même séquence de bougies: frame identique au calcul complet, dtypes compris
+@pytest.mark.parametrize('kind', KINDS)
+def test_stream_frame_matches_batch(kind):
+    df = benchmark.synthetic_ohlcv(1000, kind, 7, '1h')
+    stream = dashboard.stream_frame('X/USD', '1h', df, dashboard.STREAM_ROWS)
+    batch = dashboard.calculate_indicators(df, tail=dashboard.STREAM_ROWS)
+    pd.testing.assert_frame_equal(stream, batch, check_exact=True)
+    assert_same_levels(stream, batch)
+
+# Fenêtre glissante avec bougie en cours réécrite: niveaux de la seule fenêtre, valeurs à l'arrondi près
+# (sommes glissantes et EWM portent un historique plus long que la frame)
+@pytest.mark.parametrize('kind', KINDS)
+def test_stream_frame_follows_sliding_window(kind):
+    full = benchmark.synthetic_ohlcv(1300, kind, 11, '1h')
+    dashboard.stream_frame('X/USD', '1h', full.iloc[:1000])
+    in_progress = full.iloc[1:1001].copy()
+    in_progress.loc[in_progress.index[-1], 'close'] *= 1.001
+    dashboard.stream_frame('X/USD', '1h', in_progress)
+    for end in range(1001, 1300, 37):
+        window = full.iloc[end - 1000:end]
+        stream = dashboard.stream_frame('X/USD', '1h', window, dashboard.STREAM_ROWS)
+        batch = dashboard.calculate_indicators(window, tail=dashboard.STREAM_ROWS)
+        pd.testing.assert_frame_equal(stream, batch, rtol=1e-9, atol=1e-9)
+        assert_same_levels(stream, batch)
+
+# Bougies manquantes entre l'état et la frame: état reconstruit plutôt que recousu
+def test_stream_rebuilt_after_gap():
+    full = benchmark.synthetic_ohlcv(2500, 'random_walk', 3, '1h')
+    dashboard.stream_frame('X/USD', '1h', full.iloc[:1000])
+    window = full.iloc[1500:2500]
+    stream = dashboard.stream_frame('X/USD', '1h', window)
+    pd.testing.assert_frame_equal(stream, dashboard.calculate_indicators(window, tail=1), check_exact=True)
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+import crypto_benchmark as benchmark
+import crypto_trading_dashboard as dashboard
+
+LIMIT = 60
+DAY_MS = 24 * 3600 * 1000
+
+# Bougies 1h synthétiques consécutives
+def hourly(n):
+    return benchmark.synthetic_ohlcv(n, 'random_walk', 5, '1h').values.tolist()
+
+# Exchange factice: au plus `available` bougies 1h, timeframes supérieurs servis en direct; appels enregistrés
+class StubExchange:
+    def __init__(self):
+        self.available = 0
+        self.calls = []
+
+    def fetch_ohlcv(self, pair, timeframe, limit, preferred_exchange='kraken'):
+        self.calls.append((timeframe, limit))
+        if timeframe == '1h':
+            return hourly(min(limit, self.available))
+        return benchmark.synthetic_ohlcv(limit, 'random_walk', 9, timeframe).values.tolist()
+
+@pytest.fixture
+def exchange(monkeypatch):
+    stub = StubExchange()
+    monkeypatch.setattr(dashboard, 'fetch_ohlcv', stub.fetch_ohlcv)
+    monkeypatch.setattr(dashboard.time, 'sleep', lambda s: None)
+    return stub
+
+def test_base_fetch_covers_limit_of_each_timeframe():
+    assert dashboard._base_fetch_limit(LIMIT) == LIMIT * 24
+
+# Historique 1h complet: 4h et 1d agrégés sur `limit` bougies, sans fetch supplémentaire
+def test_derives_when_history_covers_limit(exchange):
+    exchange.available = LIMIT * 24
+    dfs = dashboard.fetch_timeframes('X/USD', LIMIT)
+    assert exchange.calls == [('1h', LIMIT * 24)]
+    assert {tf: len(df) for tf, df in dfs.items()} == {'1h': LIMIT, '4h': LIMIT, '1d': LIMIT}
+    # Dernier bucket journalier UTC (en cours, comme la bougie du jour d'un exchange)
+    base = pd.DataFrame(hourly(LIMIT * 24), columns=dashboard.OHLCV_COLUMNS)
+    start = base['timestamp'].iloc[-1] // DAY_MS * DAY_MS
+    day = base[base['timestamp'] >= start]
+    assert dfs['1d'].iloc[-1].tolist() == pytest.approx([start, day['open'].iloc[0], day['high'].max(),
+                                                         day['low'].min(), day['close'].iloc[-1], day['volume'].sum()])
+
+# Historique 1h plus court que la fenêtre d'un timeframe: timeframe fetché plutôt qu'agrégé sur moins de bougies
+def test_fetches_timeframes_not_covered(exchange):
+    exchange.available = LIMIT * 6
+    dfs = dashboard.fetch_timeframes('X/USD', LIMIT)
+    assert exchange.calls == [('1h', LIMIT * 24), ('1d', LIMIT)]
+    assert len(dfs['4h']) == LIMIT
+    assert dfs['1d']['timestamp'].diff().iloc[1:].eq(DAY_MS).all()
+
+# Cap de 720 bougies de Kraken: ni 4h (180 bougies) ni 1d (30) ne sont agrégés
+def test_fetches_both_with_kraken_cap(exchange):
+    exchange.available = 720
+    dfs = dashboard.fetch_timeframes('X/USD', dashboard.LIMIT)
+    assert exchange.calls == [('1h', dashboard.LIMIT * 24), ('4h', dashboard.LIMIT), ('1d', dashboard.LIMIT)]
+    assert len(dfs['1h']) == 720